@@ -0,0 +1,80 @@
+"""
+Size and load time of the pipeline artifacts, the float64 layout the pipeline used to write against
+the float32 schema dtypes.
+
+For the ingestion split the benchmark compares a csv read with the 'na' sentinel against the
+float32 feather file of save_dataframe. For the transformed arrays it compares one float64
+np.c_[features, target] file read in full against separate float32 feature and target files
+mapped with mmap_mode. Run from the repository root:
+
+    python -m benchmarks.artifact_load --rows 60000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from sensor.utils.main_utils import (load_dataframe, load_numpy_array_data, save_dataframe,
+                                     save_numpy_array_data)
+
+from benchmarks.synthetic import make_sensor_frame
+
+
+def timed(function, repeats: int):
+    """
+    This function is responsible for the best wall time of repeats calls and the last result
+    """
+    timings = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings), result
+
+
+def report(name: str, file_paths: list, seconds: float, in_memory_bytes: int) -> None:
+    file_mb = sum(os.path.getsize(file_path) for file_path in file_paths) / 1024 ** 2
+    print(f"{name:<36}{file_mb:>10.1f} MB on disk{seconds * 1000:>10.1f} ms{in_memory_bytes / 1024 ** 2:>10.1f} MB loaded")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=60000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_sensor_frame(args.rows)
+    features = df.drop(columns=[TARGET_COLUMN]).to_numpy(dtype=np.float32)
+    target = (df[TARGET_COLUMN] == 'pos').to_numpy(dtype=np.int64)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file_path = os.path.join(tmp_dir, "train.csv")
+        df.to_csv(csv_file_path, index=False, na_rep='na')
+        seconds, frame = timed(lambda: pd.read_csv(csv_file_path, na_values=['na']), args.repeats)
+        report("split, csv float64", [csv_file_path], seconds, frame.memory_usage(deep=True).sum())
+
+        feather_file_path = os.path.join(tmp_dir, "train.feather")
+        save_dataframe(feather_file_path, df, SCHEMA_FILE_PATH)
+        seconds, frame = timed(lambda: load_dataframe(feather_file_path), args.repeats)
+        report("split, feather float32", [feather_file_path], seconds, frame.memory_usage(deep=True).sum())
+
+        combined_file_path = os.path.join(tmp_dir, "train.npy")
+        save_numpy_array_data(combined_file_path, np.c_[features, target])
+        seconds, array = timed(lambda: load_numpy_array_data(combined_file_path)[:, :-1], args.repeats)
+        report("transformed, np.c_ float64", [combined_file_path], seconds, array.base.nbytes)
+
+        feature_file_path = os.path.join(tmp_dir, "train_features.npy")
+        target_file_path = os.path.join(tmp_dir, "train_target.npy")
+        save_numpy_array_data(feature_file_path, features)
+        save_numpy_array_data(target_file_path, target)
+        seconds, _ = timed(lambda: (load_numpy_array_data(feature_file_path, mmap_mode='r'),
+                                    load_numpy_array_data(target_file_path, mmap_mode='r')), args.repeats)
+        report("transformed, float32 memmap", [feature_file_path, target_file_path], seconds, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Export throughput of the MongoDB feature store export, in rows per second.
+
+A synthetic APS shaped csv is bulk loaded into a scratch collection, then exported once with the
+single cursor export and once per worker count with the partitioned parallel export.
+Needs MONGO_DB_URL, run from the repository root:
+
+    python -m benchmarks.export_throughput --rows 200000 --workers 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.data_access.sensor_data import SensorData
+from sensor.utils.main_utils import read_yaml_file
+
+from benchmarks.synthetic import make_sensor_frame
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--collection", default="benchmark_export")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch collection")
+    args = parser.parse_args()
+
+    sensor_data = SensorData()
+    collection = sensor_data.get_collection(args.collection)
+    collection.drop()
+    drop_columns = read_yaml_file(SCHEMA_FILE_PATH)['drop_columns']
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "aps.csv")
+            make_sensor_frame(args.rows).to_csv(file_path, index=False, na_rep='na')
+            start_time = time.perf_counter()
+            sensor_data.export_csv_as_collection(file_path, args.collection, resume=False)
+            elapsed = time.perf_counter() - start_time
+            os.remove(sensor_data.get_checkpoint_file_path(file_path, args.collection))
+            print(f"{'bulk load':<24}{args.rows / elapsed:>12.0f} rows/sec")
+
+        start_time = time.perf_counter()
+        df = sensor_data.export_collection_as_dataframe(args.collection, batch_size=args.batch_size,
+                                                        drop_columns=drop_columns)
+        elapsed = time.perf_counter() - start_time
+        print(f"{'export, 1 cursor':<24}{len(df) / elapsed:>12.0f} rows/sec")
+
+        for n_workers in args.workers:
+            start_time = time.perf_counter()
+            df = sensor_data.export_collection_as_dataframe_parallel(args.collection, n_workers=n_workers,
+                                                                     batch_size=args.batch_size,
+                                                                     drop_columns=drop_columns)
+            elapsed = time.perf_counter() - start_time
+            print(f"{f'export, {n_workers} workers':<24}{len(df) / elapsed:>12.0f} rows/sec")
+
+    finally:
+        if not args.keep:
+            collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Runtime and F1 of every resampling strategy of the transformation stage.
+
+The data is split 80/20 with stratification and preprocessed like the pipeline does. Only the train
+split is resampled, a booster is trained on it (with the positive class weight for class_weight)
+and scored on the untouched test split. Pass the APS training csv with --csv, otherwise a synthetic
+frame is used. Run from the repository root:
+
+    python -m benchmarks.resampling_backends --csv aps_failure_training_set.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from sensor.components.data_transformation import DataTransformation
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from sensor.ml.metric.classification_metric import get_classification_score, get_misclassification_cost
+from sensor.ml.model.estimater import TargetValueMapping
+from sensor.ml.model.training_engine import train_booster
+from sensor.ml.sampling.resampler import RESAMPLING_STRATEGIES, resample
+from sensor.utils.main_utils import read_yaml_file
+
+from benchmarks.synthetic import make_sensor_frame
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="APS csv with the 'na' sentinel, a synthetic frame when left out")
+    parser.add_argument("--rows", type=int, default=60000, help="rows of the synthetic frame")
+    parser.add_argument("--strategies", nargs="+", default=RESAMPLING_STRATEGIES, choices=RESAMPLING_STRATEGIES)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--random-state", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.csv is not None:
+        df = pd.read_csv(args.csv, na_values=['na'])
+    else:
+        df = make_sensor_frame(args.rows, seed=args.random_state)
+    df = df.drop(columns=read_yaml_file(SCHEMA_FILE_PATH)['drop_columns'], errors='ignore')
+    features = df.drop(columns=[TARGET_COLUMN])
+    target = df[TARGET_COLUMN].map(TargetValueMapping().to_dict()).to_numpy(dtype=np.int64)
+
+    x_train, x_test, y_train, y_test = train_test_split(features, target, test_size=0.2, stratify=target,
+                                                        random_state=args.random_state)
+    preprocessor = DataTransformation.get_data_transformer_object().fit(x_train)
+    x_train = preprocessor.transform(x_train).astype(np.float32)
+    x_test = preprocessor.transform(x_test).astype(np.float32)
+    print(f"train {x_train.shape}, {int(y_train.sum())} positive, test {x_test.shape}, {int(y_test.sum())} positive")
+    print(f"{'strategy':<26}{'resample s':>12}{'train rows':>12}{'fit s':>8}{'f1':>8}{'cost':>10}")
+
+    for strategy in args.strategies:
+        start_time = time.perf_counter()
+        x_resampled, y_resampled = resample(x_train, y_train, strategy, n_jobs=args.n_jobs,
+                                            random_state=args.random_state)
+        resample_seconds = time.perf_counter() - start_time
+
+        params = {}
+        if strategy == 'class_weight':
+            n_positive = max(int(np.sum(y_train == 1)), 1)
+            params["scale_pos_weight"] = (len(y_train) - n_positive) / n_positive
+        start_time = time.perf_counter()
+        model, _ = train_booster(np.ascontiguousarray(x_resampled, dtype=np.float32), y_resampled, params,
+                                 nthread=0, random_state=args.random_state)
+        fit_seconds = time.perf_counter() - start_time
+
+        y_pred = np.asarray(model.predict(x_test))
+        f1 = get_classification_score(y_true=y_test, y_pred=y_pred).f1_score
+        cost = get_misclassification_cost(y_test, y_pred)
+        print(f"{strategy:<26}{resample_seconds:>12.2f}{len(y_resampled):>12}{fit_seconds:>8.2f}{f1:>8.3f}{cost:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+from sensor.utils.main_utils import read_yaml_file
+
+
+def get_feature_columns() -> list:
+    """
+    This function is responsible for listing the numeric schema columns followed by the schema drop columns,
+    the same columns a document of the sensor collection holds besides the target
+    """
+    schema = read_yaml_file(SCHEMA_FILE_PATH)
+    columns = [list(data.keys())[0] for data in schema['columns'] if list(data.values())[0] != 'category']
+    return columns + list(schema['drop_columns'])
+
+
+def make_sensor_frame(n_rows: int, positive_ratio: float = 0.02, missing_ratio: float = 0.05,
+                      seed: int = 0) -> pd.DataFrame:
+    """
+    This function is responsible for a frame shaped like the APS data, integer readings with missing values
+    and a rare positive class whose readings are shifted so models have something to learn
+    """
+    rng = np.random.default_rng(seed)
+    columns = get_feature_columns()
+    is_positive = rng.random(n_rows) < positive_ratio
+    values = rng.gamma(2.0, 500.0, size=(n_rows, len(columns)))
+    values[is_positive] *= 1.5
+    values = np.round(values)
+    values[rng.random(values.shape) < missing_ratio] = np.nan
+
+    df = pd.DataFrame(values, columns=columns)
+    df.insert(0, TARGET_COLUMN, np.where(is_positive, 'pos', 'neg'))
+    return df
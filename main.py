@@ -1,20 +1,26 @@
 from sensor.configuration.mongo_db_connection import MongoDBClient
 from sensor.exception import SensorException
 import os , sys
+from typing import Optional
 from sensor.logger import logging
 
 from sensor.entity.artifact_entity import DataTransformationArtifact
 from sensor.pipeline.training_pipeline import TrainPipeline
-from sensor.utils.main_utils import load_object, read_yaml_file, get_latest_preprocessor_path
-from sensor.ml.model.estimater import ModelResolver,TargetValueMapping
+from sensor.pipeline.training_job import TrainingJobManager
+from sensor.ml.model.model_cache import ModelCache
+from sensor.pipeline.prediction_pipeline import PredictionPipeline
+from sensor.pipeline.micro_batcher import MicroBatcher
+from sensor.utils.executor import ServingExecutors
+from sensor.utils.payload_utils import get_payload_format, read_payload, write_payload
 from sensor.pipeline import training_pipeline
 from sensor.constant.training_pipeline import SAVED_MODEL_DIR
 
 from  fastapi import FastAPI
-from sensor.constant.application import APP_HOST, APP_PORT
+from sensor.constant.application import (APP_HOST, APP_PORT, PREDICTION_FILE_NAME, MICRO_BATCH_MAX_REQUEST_ROWS,
+                                         PAYLOAD_FORMAT_CSV, PAYLOAD_MEDIA_TYPES)
 from starlette.responses import RedirectResponse
 from uvicorn import run as app_run
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI, File, UploadFile, Response
 import pandas as pd
@@ -23,6 +29,16 @@ import numpy as np
 
 app = FastAPI()
 
+model_cache = ModelCache()
+
+
+def predict_with_cached_model(df: pd.DataFrame):
+    return model_cache.get().model.predict(df)
+
+
+executors = ServingExecutors()
+training_job_manager = TrainingJobManager()
+micro_batcher = MicroBatcher(predict_fn=predict_with_cached_model, executor=executors.inference.executor)
 
 
 origins = ["*"]
@@ -36,6 +52,19 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def start_serving():
+    model_cache.start()
+    await micro_batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_serving():
+    await micro_batcher.stop()
+    model_cache.stop()
+    executors.shutdown()
+
+
 @app.get("/",tags=["authentication"])
 async def  index():
     return RedirectResponse(url="/docs")
@@ -44,88 +73,123 @@ async def  index():
 @app.get("/train")
 async def train():
     try:
+        # the pipeline runs in a separate worker process, callers poll the returned job
+        job = training_job_manager.submit()
+        return JSONResponse(content=job, status_code=202)
+    except Exception as e:
+        return Response(f"Error Occurred! {e}", status_code=500)
 
-        training_pipeline = TrainPipeline()
 
-        if training_pipeline.is_pipeline_running:
-            return Response("Training pipeline is already running.")
-        
-        training_pipeline.run_pipeline()
-        return Response("Training successfully completed!")
+@app.get("/train/jobs")
+async def list_training_jobs():
+    try:
+        return JSONResponse(content=training_job_manager.list_jobs())
+    except Exception as e:
+        return Response(f"Error Occurred! {e}", status_code=500)
+
+
+@app.get("/train/{job_id}")
+async def training_job_status(job_id: str):
+    try:
+        job = training_job_manager.get_job(job_id)
+        if job is None:
+            return Response(f"Training job not found: {job_id}", status_code=404)
+        return JSONResponse(content=job)
+    except Exception as e:
+        return Response(f"Error Occurred! {e}", status_code=500)
+
+
+@app.get("/train/{job_id}/progress")
+async def training_job_progress(job_id: str):
+    try:
+        progress = training_job_manager.get_progress(job_id)
+        if progress is None:
+            return Response(f"Training job not found: {job_id}", status_code=404)
+        return JSONResponse(content=progress)
     except Exception as e:
-        return Response(f"Error Occurred! {e}")
+        return Response(f"Error Occurred! {e}", status_code=500)
         
 
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)) -> Response:
+async def predict(file: UploadFile = File(...), response_format: Optional[str] = None) -> Response:
     try:
-        logging.info("reading csv file")
-        df = pd.read_csv(file.file)
+        # model, preprocessor and schema columns are served from memory
+        loaded_model = model_cache.get()
+        if loaded_model is None:
+            logging.info("Model is not available")
+            return Response("Model is not available")
 
-        if df.empty:
-            logging.error("Uploaded file is empty")
-            return Response("Uploaded file is empty", status_code=400)\
-        
-        # replcaing na with np.nan
-        df.replace('na', np.nan, inplace=True)
+        prediction_pipeline = PredictionPipeline(loaded_model=loaded_model)
 
-        # get required columns
-        logging.info("reading schema file")
-        schema_file_path = os.path.join("config", "schema.yaml")
-        schema = read_yaml_file(schema_file_path)
+        payload_format = get_payload_format(file.content_type, file.filename)
+        response_format = response_format or payload_format
+        if response_format not in PAYLOAD_MEDIA_TYPES:
+            return Response(f"Unsupported response format: {response_format}", status_code=400)
 
-        # Extract column names from schema
-        logging.info("extracting required columns")
-        schema_columns = schema.get('columns', [])
-        logging.info(f"Schema columns: {schema_columns}")
-        required_columns = [list(data.keys())[0] for data in schema_columns if list(data.values())[0] != 'category']
-        logging.info(f"Required columns: {required_columns}")
+        logging.info(f"reading {payload_format} payload")
+        content = await file.read()
+        # the pyarrow csv reader and the columnar readers release the GIL, payloads are parsed on the thread pool
+        df = await executors.inference.run(read_payload, content, payload_format, loaded_model.required_columns)
+
+        if df.empty:
+            logging.error("Uploaded file is empty")
+            return Response("Uploaded file is empty", status_code=400)
 
         logging.info("checking missing columns")
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = prediction_pipeline.get_missing_columns(df.columns)
         if missing_columns:
             logging.error(f"Missing columns in input file: {missing_columns}")
             return Response(f"Missing columns in input file: {missing_columns}", status_code=400)
 
-        logging.info("filtering required columns")
-        df = df[required_columns]
+        logging.info("predicting data")
+        if len(df) <= MICRO_BATCH_MAX_REQUEST_ROWS:
+            # small requests share one model call with concurrent requests
+            df = await executors.inference.run(prediction_pipeline.prepare_dataframe, df)
+            y_pred = await micro_batcher.submit(df)
+            df = prediction_pipeline.attach_predictions(df, y_pred)
+        else:
+            df = await executors.inference.run(prediction_pipeline.predict_dataframe, df)
+
+        logging.info(f"converting dataframe to {response_format}")
+        content = await executors.inference.run(write_payload, df, response_format)
+        return Response(
+            content=content,
+            media_type=PAYLOAD_MEDIA_TYPES[response_format],
+            headers={"Content-Disposition": f"attachment;filename={PREDICTION_FILE_NAME}.{response_format}"}
+        )
+
+    except  Exception as e:
+        return Response(f"Error Occurred: {e}", status_code=500)
 
-        # Get the preprocessor path
-        preprocessor_path = get_latest_preprocessor_path()
-        if not os.path.exists(preprocessor_path):
-            logging.error("Preprocessor is not available")
-            return Response("Preprocessor is not available", status_code=500)
 
-        # Load the model
-        logging.info("loading model")
-        Model_resolver = ModelResolver(model_dir=SAVED_MODEL_DIR)
-        if not Model_resolver.is_model_exists():
+@app.post("/predict/stream")
+async def predict_stream(file: UploadFile = File(...)) -> Response:
+    try:
+        loaded_model = model_cache.get()
+        if loaded_model is None:
             logging.info("Model is not available")
             return Response("Model is not available")
-        
-        logging.info("loading preprocessor and transforming data")
-        preprocessor = load_object(file_path=preprocessor_path)
-        df_transformed = preprocessor.transform(df)
 
-        logging.info("loading model")
-        best_model_path = Model_resolver.get_best_model_path()
-        model= load_object(file_path=best_model_path)
+        prediction_pipeline = PredictionPipeline(loaded_model=loaded_model)
 
-        logging.info("mapping target values")
-        target_mapping = TargetValueMapping().reverse_mapping()
+        logging.info("reading csv file in chunks")
+        chunks = prediction_pipeline.read_csv_chunks(file.file)
+        first_chunk = await executors.inference.run(next, chunks, None)
 
-        logging.info("predicting data")
-        y_pred=model.predict(df_transformed)
-        logging.info(f'Prediction done and y_pred is {y_pred}')
-        df['predicted_column'] = y_pred
+        if first_chunk is None or first_chunk.empty:
+            logging.error("Uploaded file is empty")
+            return Response("Uploaded file is empty", status_code=400)
 
-        logging.info("mapping predicted values")
-        df['predicted_column'] = df['predicted_column'].map(target_mapping)
+        missing_columns = prediction_pipeline.get_missing_columns(first_chunk.columns)
+        if missing_columns:
+            logging.error(f"Missing columns in input file: {missing_columns}")
+            return Response(f"Missing columns in input file: {missing_columns}", status_code=400)
 
-        # Convert DataFrame to CSV and return as response
-        logging.info("converting dataframe to csv")
-        response_df = df.to_csv(index=False)
-        return Response(content=response_df, media_type="text/csv", headers={"Content-Disposition": "attachment;filename=predictions.csv"})
+        return StreamingResponse(
+            prediction_pipeline.stream_csv(first_chunk, chunks),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment;filename={PREDICTION_FILE_NAME}.{PAYLOAD_FORMAT_CSV}"}
+        )
 
     except  Exception as e:
         return Response(f"Error Occurred: {e}", status_code=500)
@@ -1,20 +1,151 @@
 from sensor.exception import SensorException
 from sensor.logger import  logging
 import os
+import shutil
 import sys
 from pandas import DataFrame
 from sensor.entity.config_entity import DataIngestionConfig
 from sensor.entity.artifact_entity import DataIngestionArtifact
 from sensor.data_access.sensor_data import SensorData
-from sklearn.model_selection import train_test_split
-from sensor.utils.main_utils import read_yaml_file
-from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.utils.main_utils import (read_yaml_file, write_yaml_file, save_dataframe, load_dataframe, append_dataframe,
+                                     get_test_split_mask)
+from sensor.constant.training_pipeline import (SCHEMA_FILE_PATH, DATA_INGESTION_PARTITION_FILE_PREFIX,
+                                               DATA_INGESTION_PARTITION_FILE_EXTENSION, DATA_INGESTION_ID_COLUMN)
+from datetime import datetime, timedelta
+from typing import Optional
 
 class DataIngestion:
     def __init__(self, config: DataIngestionConfig) -> None:
         self.config = config
         self.sensor_data = SensorData()
         self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+        self.delta_file_path: Optional[str] = None
+
+    def read_watermark(self) -> dict:
+        if not os.path.exists(self.config.watermark_file_path):
+            return {"partitions": [], "rows": 0}
+        return read_yaml_file(self.config.watermark_file_path)
+
+
+    def get_exported_ids(self, watermark: dict) -> set:
+        """
+        This method is responsible for the _id of every row in the partitions written within the safety window
+        of the watermark, the rows export_delta_as_dataframe reads again
+        """
+        last_ingested_at = SensorData.decode_watermark(watermark)
+        if last_ingested_at is None:
+            return set()
+
+        lower_bound = last_ingested_at - timedelta(seconds=self.config.watermark_safety_seconds)
+        exported_ids = set()
+        for partition, ingested_at in watermark.get("partition_ingested_at", {}).items():
+            if datetime.fromisoformat(ingested_at) > lower_bound:
+                partition_file_path = os.path.join(self.config.feature_store_dir, partition)
+                exported_ids.update(load_dataframe(partition_file_path, columns=[DATA_INGESTION_ID_COLUMN])
+                                    [DATA_INGESTION_ID_COLUMN].tolist())
+        return exported_ids
+
+
+    def export_delta_into_feature_store(self) -> Optional[str]:
+        """
+        This method is responsible for appending the documents stamped since the last run
+        to the persistent feature store as a new partition, and returns that partition's path.
+        The first run exports the whole collection as the first partition.
+        The watermark lists the committed partitions and is only moved after the partition is on disk,
+        so a partition left behind by a failed run is never read and is overwritten by the next one.
+        """
+        try:
+            watermark = self.read_watermark()
+            last_ingested_at = SensorData.decode_watermark(watermark)
+            logging.info(f"Exporting documents stamped after watermark: {last_ingested_at}")
+
+            delta_df, max_ingested_at = self.sensor_data.export_delta_as_dataframe(
+                self.config.collection_name,
+                last_ingested_at=last_ingested_at,
+                exported_ids=self.get_exported_ids(watermark),
+                n_workers=self.config.export_workers,
+                batch_size=self.config.export_batch_size,
+                drop_columns=self._schema_config['drop_columns'],
+                safety_seconds=self.config.watermark_safety_seconds
+            )
+            if len(delta_df) == 0:
+                return None
+
+            partitions = watermark.get("partitions", [])
+            partition_file_name = (f"{DATA_INGESTION_PARTITION_FILE_PREFIX}-{len(partitions) + 1:05d}"
+                                   f"{DATA_INGESTION_PARTITION_FILE_EXTENSION}")
+            partition_file_path = os.path.join(self.config.feature_store_dir, partition_file_name)
+            save_dataframe(partition_file_path, delta_df, SCHEMA_FILE_PATH)
+            previous_split_files = watermark.get("split_files", {})
+            split_files = self.append_delta_to_splits(delta_df, previous_split_files, len(partitions) + 1)
+
+            watermark = {
+                **SensorData.encode_watermark(max_ingested_at),
+                "partitions": partitions + [partition_file_name],
+                "partition_ingested_at": {**watermark.get("partition_ingested_at", {}),
+                                          partition_file_name: max_ingested_at.isoformat()},
+                "split_files": split_files,
+                "rows": watermark.get("rows", 0) + len(delta_df),
+            }
+            write_yaml_file(self.config.watermark_file_path, watermark, atomic=True)
+            for split_file in previous_split_files.values():
+                os.remove(os.path.join(self.config.feature_store_dir, split_file))
+            logging.info(f"Appended {len(delta_df)} rows to feature store partition: {partition_file_path}")
+            return partition_file_path
+
+        except Exception as e:
+            logging.error(f"Error while exporting new data into feature store: {str(e)}")
+            raise SensorException(f"Error while exporting new data into feature store: {str(e)}", sys)
+
+
+    def append_delta_to_splits(self, delta_df: DataFrame, split_files: dict, partition_number: int) -> dict:
+        """
+        This method is responsible for splitting only the new rows, by a hash of their _id, and appending them
+        to the train and test files of the feature store. Every row keeps the split it got when it was exported.
+        New split files are written next to the current ones, which stay valid until the watermark moves.
+        """
+        try:
+            is_test = get_test_split_mask(delta_df[DATA_INGESTION_ID_COLUMN], self.config.train_test_split_ratio)
+            delta_df = delta_df.drop(columns=[DATA_INGESTION_ID_COLUMN])
+
+            new_split_files = {}
+            for split, rows in (("train", delta_df[~is_test]), ("test", delta_df[is_test])):
+                new_split_files[split] = f"{split}-{partition_number:05d}{DATA_INGESTION_PARTITION_FILE_EXTENSION}"
+                source_file_path = (os.path.join(self.config.feature_store_dir, split_files[split])
+                                    if split in split_files else None)
+                n_rows = append_dataframe(os.path.join(self.config.feature_store_dir, new_split_files[split]), rows,
+                                          source_file_path=source_file_path, schema_file_path=SCHEMA_FILE_PATH)
+                logging.info(f"Appended {len(rows)} new rows to the {split} split, {n_rows} rows in total")
+            return new_split_files
+
+        except Exception as e:
+            raise SensorException(f"Error while appending new data to the feature store splits: {str(e)}", sys)
+
+
+    def save_feature_store_splits(self) -> None:
+        """
+        This method is responsible for placing the current train and test files of the feature store
+        at the ingested file paths of this run, hard linked when possible since committed files never change
+        """
+        try:
+            split_files = self.read_watermark().get("split_files", {})
+            if len(split_files) == 0:
+                raise ValueError(f"Feature store is empty: {self.config.feature_store_dir}")
+
+            for split, file_path in (("train", self.config.training_file_path), ("test", self.config.testing_file_path)):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                split_file_path = os.path.join(self.config.feature_store_dir, split_files[split])
+                try:
+                    os.link(split_file_path, file_path)
+                except OSError:
+                    shutil.copyfile(split_file_path, file_path)
+                logging.info(f"Saved {split} data at: {file_path}")
+
+        except Exception as e:
+            raise SensorException(f"Error while saving feature store splits: {str(e)}", sys)
+
 
     def export_data_into_feature_store(self)->DataFrame:
         """
@@ -24,13 +155,22 @@ class DataIngestion:
         try:
             logging.info("Exporting data from MongoDB into feature store")
 
-            sensor_data = SensorData()
-            df = sensor_data.export_collection_as_dataframe(self.config.collection_name)
+            # the schema drop columns are excluded by the Mongo projection
+            if self.config.export_workers > 1:
+                df = self.sensor_data.export_collection_as_dataframe_parallel(
+                    self.config.collection_name,
+                    n_workers=self.config.export_workers,
+                    batch_size=self.config.export_batch_size,
+                    drop_columns=self._schema_config['drop_columns']
+                )
+            else:
+                df = self.sensor_data.export_collection_as_dataframe(
+                    self.config.collection_name,
+                    batch_size=self.config.export_batch_size,
+                    drop_columns=self._schema_config['drop_columns']
+                )
 
-            feature_store_file_path = self.config.feature_store_file_path
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            df.to_csv(feature_store_file_path, index=False, header=True)
+            save_dataframe(self.config.feature_store_file_path, df, SCHEMA_FILE_PATH)
             return df
 
         except SensorException as e:
@@ -39,22 +179,21 @@ class DataIngestion:
 
 
     def split_data_as_train_test(self, dataframe: DataFrame):
+        """
+        This method is responsible for splitting the rows by a hash of their _id, the split incremental runs use
+        """
         try:
-            train_set, test_set = train_test_split(dataframe, test_size=self.config.train_test_split_ratio, random_state=42) 
-            
-            logging.info(f"Splitting data into train and test set with ratio: {self.config.train_test_split_ratio}")
+            is_test = get_test_split_mask(dataframe[DATA_INGESTION_ID_COLUMN], self.config.train_test_split_ratio)
+            dataframe = dataframe.drop(columns=[DATA_INGESTION_ID_COLUMN])
+            train_set, test_set = dataframe[~is_test], dataframe[is_test]
 
-            train_dir_path = os.path.dirname(self.config.training_file_path)
-            test_dir_path = os.path.dirname(self.config.testing_file_path)
-
-            os.makedirs(train_dir_path, exist_ok=True)
-            os.makedirs(test_dir_path, exist_ok=True)
+            logging.info(f"Splitting data into train and test set with ratio: {self.config.train_test_split_ratio}")
 
             logging.info(f"Saving train data at: {self.config.training_file_path}")
             logging.info(f"Saving test data at: {self.config.testing_file_path}")
 
-            train_set.to_csv(self.config.training_file_path, index=False, header=True)
-            test_set.to_csv(self.config.testing_file_path, index=False, header=True)
+            save_dataframe(self.config.training_file_path, train_set, SCHEMA_FILE_PATH)
+            save_dataframe(self.config.testing_file_path, test_set, SCHEMA_FILE_PATH)
 
             logging.info("Data split and saved successfully")
         
@@ -69,11 +208,18 @@ class DataIngestion:
         """
         try:
             logging.info("Initiating data ingestion process")
-            df = self.export_data_into_feature_store()
-            df = df.drop(columns=self._schema_config['drop_columns'], axis=1)  
-            self.split_data_as_train_test(df)
+            if self.config.incremental:
+                self.delta_file_path = self.export_delta_into_feature_store()
+                self.save_feature_store_splits()
+            else:
+                df = self.export_data_into_feature_store()
+                logging.info(f"Feature store frame: {df.shape} using {df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+                df = df.drop(columns=self._schema_config['drop_columns'], errors='ignore')
+                self.split_data_as_train_test(df)
             logging.info("Data ingestion process completed successfully")
-            return DataIngestionArtifact(train_data_file_path=self.config.training_file_path, test_data_file_path=self.config.testing_file_path)
+            return DataIngestionArtifact(train_data_file_path=self.config.training_file_path,
+                                         test_data_file_path=self.config.testing_file_path,
+                                         delta_file_path=self.delta_file_path)
         
         except SensorException as e:
             logging.error(f"Error while initiating data ingestion: {str(e)}")
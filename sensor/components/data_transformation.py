@@ -1,18 +1,24 @@
+import os
 import sys
+import time
+from typing import List
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTETomek
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import RobustScaler
 from sklearn.pipeline import Pipeline
 
 from sensor.entity.artifact_entity import DataValidationArtifact, DataTransformationArtifact
-from sensor.constant.training_pipeline import TARGET_COLUMN
+from sensor.constant.training_pipeline import TARGET_COLUMN, FEATURE_DTYPE, DATA_TRANSFORMATION_IMPUTER_FILL_VALUE
 from sensor.entity.config_entity import DataTransformationConfig
 from sensor.exception import SensorException
 from sensor.logger import logging
 from sensor.ml.model.estimater import TargetValueMapping
-from sensor.utils.main_utils import save_numpy_array_data, load_numpy_array_data, save_object
+from sensor.ml.metric.quantile_sketch import QuantileSketch
+from sensor.ml.sampling.resampler import resample
+from sensor.utils.main_utils import (save_numpy_array_data, load_numpy_array_data, save_object, load_dataframe, read_yaml_file,
+                                     get_dataframe_columns, get_dataframe_num_rows, iter_dataframe_chunks,
+                                     get_peak_memory_mb)
 
 
 class DataTransformation:
@@ -32,18 +38,35 @@ class DataTransformation:
     @staticmethod    
     def read_data(file_path)-> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return load_dataframe(file_path)
         
         except Exception as e:
             raise SensorException(e, sys)
 
 
+    @staticmethod
+    def save_feature_and_target(features, target, feature_file_path: str, target_file_path: str)-> None:
+        """
+        This method is responsible for saving features and target as two contiguous FEATURE_DTYPE arrays.
+        Nothing is stacked, so the trainer can map both files and hand them to the model without a slice copy.
+        """
+        try:
+            features = np.ascontiguousarray(features, dtype=FEATURE_DTYPE)
+            save_numpy_array_data(feature_file_path, features)
+            save_numpy_array_data(target_file_path, np.asarray(target, dtype=FEATURE_DTYPE))
+            logging.info(f"Saved features {features.shape} {features.dtype} "
+                         f"({features.nbytes / 1024 ** 2:.1f} MB) to: {feature_file_path}")
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
     @classmethod
     def get_data_transformer_object(cls)-> Pipeline:
 
         try:
             robust_scaler = RobustScaler()
-            simple_imputer = SimpleImputer(strategy='constant', fill_value=0)
+            simple_imputer = SimpleImputer(strategy='constant', fill_value=DATA_TRANSFORMATION_IMPUTER_FILL_VALUE)
             preprocessor = Pipeline(steps=[
                 ('Imputer', simple_imputer),
                 ('RobustScaler', robust_scaler)
@@ -55,60 +78,239 @@ class DataTransformation:
             raise SensorException(e, sys) from e 
 
 
-    def initiate_data_transformation(self)-> DataTransformationArtifact:
+    @staticmethod
+    def set_scaler_quantiles(preprocessor: Pipeline, lower, median, upper)-> Pipeline:
+        """
+        This method is responsible for setting the RobustScaler centre and scale of a fitted pipeline
+        from the quantiles of the imputed columns, with the same zero handling as RobustScaler
+        """
+        try:
+            robust_scaler = preprocessor.steps[-1][1]
+            dtype = robust_scaler.center_.dtype
+
+            scale = np.asarray(upper, dtype=np.float64) - np.asarray(lower, dtype=np.float64)
+            scale = scale.astype(dtype)
+            # constant columns are not scaled
+            scale[scale < 10 * np.finfo(dtype).eps] = 1.0
+
+            robust_scaler.center_ = np.asarray(median, dtype=np.float64).astype(dtype)
+            robust_scaler.scale_ = scale
+            return preprocessor
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
 
+    def fit_preprocessor(self, preprocessor: Pipeline, input_feature_df: pd.DataFrame)-> Pipeline:
+        """
+        This method is responsible for fitting the preprocessor from the column profile written by validation.
+        The pipeline is fitted on two rows only to set sklearn's fitted attributes, then the RobustScaler
+        centre and scale are replaced with the profiled quantiles of the imputed columns, which are the
+        values a full fit computes. Without a matching profile the pipeline is fitted on the full frame.
+        """
+        try:
+            profile_file_path = self.data_validation_artifact.column_profile_file_path
+            profile = read_yaml_file(profile_file_path) if profile_file_path else None
+
+            if profile is None or profile["rows"] != len(input_feature_df) \
+                    or profile["numeric_columns"] != list(input_feature_df.columns) \
+                    or profile["fill_value"] != DATA_TRANSFORMATION_IMPUTER_FILL_VALUE:
+                logging.info("No matching column profile, fitting preprocessor on the full train frame")
+                return preprocessor.fit(input_feature_df)
+
+            # the imputer drops columns missing in every row it is fitted on, the two rows are filled first
+            preprocessor.fit(input_feature_df.iloc[:2].fillna(DATA_TRANSFORMATION_IMPUTER_FILL_VALUE))
+            robust_scaler = preprocessor.steps[-1][1]
+            q_min, q_max = [q / 100 for q in robust_scaler.quantile_range]
+            quantiles = profile["scaler_quantiles"]
+            self.set_scaler_quantiles(preprocessor, quantiles[str(q_min)], quantiles["0.5"], quantiles[str(q_max)])
+            logging.info("Fitted preprocessor from the column profile")
+            return preprocessor
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
+    def fit_preprocessor_streaming(self, preprocessor: Pipeline, file_path: str, feature_columns: List[str])-> Pipeline:
+        """
+        This method is responsible for fitting the preprocessor without loading the train split.
+        Chunks are imputed with the constant fill value and folded into a QuantileSketch, whose quantiles
+        (values kept within sketch_relative_accuracy) set the RobustScaler centre and scale.
+        The constant imputer has nothing to learn, so the pipeline is fitted on two rows for sklearn's attributes.
+        """
+        try:
+            fill_value = np.dtype(FEATURE_DTYPE).type(DATA_TRANSFORMATION_IMPUTER_FILL_VALUE)
+            sketch = QuantileSketch(feature_columns, relative_accuracy=self.data_transformation_config.sketch_relative_accuracy)
+            first_rows = None
+            for chunk in iter_dataframe_chunks(file_path, self.data_transformation_config.chunk_rows, columns=feature_columns):
+                if first_rows is None:
+                    first_rows = chunk.iloc[:2]
+                values = chunk.to_numpy(dtype=FEATURE_DTYPE)
+                sketch.update(np.where(np.isnan(values), fill_value, values))
+
+            preprocessor.fit(first_rows.fillna(DATA_TRANSFORMATION_IMPUTER_FILL_VALUE))
+            robust_scaler = preprocessor.steps[-1][1]
+            q_min, q_max = [q / 100 for q in robust_scaler.quantile_range]
+            self.set_scaler_quantiles(preprocessor, *sketch.quantiles([q_min, 0.5, q_max]))
+            logging.info(f"Fitted preprocessor from a sketch of {int(sketch.count[0]) if len(feature_columns) else 0} rows")
+            return preprocessor
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
+    def transform_to_memmap(self, preprocessor: Pipeline, file_path: str, feature_columns: List[str],
+                            feature_file_path: str, target_file_path: str):
+        """
+        This method is responsible for transforming a split chunk by chunk straight into memory mapped .npy files
+        of features and target, so neither the input frame nor the output arrays are ever fully in memory
+        """
+        try:
+            n_rows = get_dataframe_num_rows(file_path)
+            os.makedirs(os.path.dirname(feature_file_path), exist_ok=True)
+            features = np.lib.format.open_memmap(feature_file_path, mode='w+', dtype=FEATURE_DTYPE,
+                                                 shape=(n_rows, len(feature_columns)))
+            target = np.lib.format.open_memmap(target_file_path, mode='w+', dtype=FEATURE_DTYPE, shape=(n_rows,))
+            start = 0
+            for chunk in iter_dataframe_chunks(file_path, self.data_transformation_config.chunk_rows,
+                                               columns=feature_columns + [TARGET_COLUMN]):
+                stop = start + len(chunk)
+                features[start:stop] = preprocessor.transform(chunk[feature_columns])
+                target[start:stop] = chunk[TARGET_COLUMN].map(TargetValueMapping().to_dict())
+                start = stop
+            features.flush()
+            target.flush()
+            return features, target
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
+    def initiate_in_memory_data_transformation(self, preprocessor: Pipeline)-> Pipeline:
+        """
+        This method is responsible for the in memory fit mode, both splits are loaded and transformed at once
+        """
         try:
             train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
 
             test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
 
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
 
             target_feature_train_df = train_df[TARGET_COLUMN]
 
-            target_feature_train_df = target_feature_train_df.replace(TargetValueMapping().to_dict())
+            target_feature_train_df = target_feature_train_df.map(TargetValueMapping().to_dict())
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
 
             target_feature_test_df = test_df[TARGET_COLUMN]
 
-            target_feature_test_df = target_feature_test_df.replace(TargetValueMapping().to_dict())
+            target_feature_test_df = target_feature_test_df.map(TargetValueMapping().to_dict())
 
-            preprocessor = self.get_data_transformer_object()
-
-            preprocessor_object = preprocessor.fit(input_feature_train_df)
+            preprocessor_object = self.fit_preprocessor(preprocessor, input_feature_train_df)
 
             transformed_input_train_feature = preprocessor_object.transform(input_feature_train_df)
 
             transformed_input_test_feature = preprocessor_object.transform(input_feature_test_df)
 
-            smt = SMOTETomek(sampling_strategy='minority')
-
-            input_feature_train_final, target_feature_train_final = smt.fit_resample(
-                transformed_input_train_feature, target_feature_train_df
+            # the test split keeps its real class balance so metrics stay comparable
+            config = self.data_transformation_config
+            start_time = time.perf_counter()
+            input_feature_train_final, target_feature_train_final = resample(
+                transformed_input_train_feature, target_feature_train_df.to_numpy(),
+                strategy=config.resampling_strategy,
+                n_jobs=config.resampling_workers,
+                random_state=config.random_state,
+                chunk_mb=config.resampling_chunk_mb
             )
+            logging.info(f"Resampled train split with {config.resampling_strategy} in "
+                         f"{time.perf_counter() - start_time:.2f}s: {len(target_feature_train_df)} -> "
+                         f"{len(target_feature_train_final)} rows, "
+                         f"classes {np.bincount(np.asarray(target_feature_train_final, dtype=np.int64)).tolist()}")
+             
+            DataTransformation.save_feature_and_target(input_feature_train_final, target_feature_train_final,
+                                                       config.transformed_train_file_path,
+                                                       config.transformed_train_target_file_path)
+            DataTransformation.save_feature_and_target(transformed_input_test_feature, target_feature_test_df,
+                                                       config.transformed_test_file_path,
+                                                       config.transformed_test_target_file_path)
+
+            return preprocessor_object
 
-            input_feature_test_final, target_feature_test_final = smt.fit_resample(
-                transformed_input_test_feature, target_feature_test_df
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
+    def initiate_streaming_data_transformation(self, preprocessor: Pipeline)-> Pipeline:
+        """
+        This method is responsible for the streaming fit mode, memory is bounded by the chunk size
+        except when the configured resampling needs the whole train matrix
+        """
+        try:
+            config = self.data_transformation_config
+            train_file_path = self.data_validation_artifact.valid_train_file_path
+            feature_columns = [column for column in get_dataframe_columns(train_file_path) if column != TARGET_COLUMN]
+
+            preprocessor_object = self.fit_preprocessor_streaming(preprocessor, train_file_path, feature_columns)
+            self.transform_to_memmap(preprocessor_object, self.data_validation_artifact.valid_test_file_path,
+                                     feature_columns, config.transformed_test_file_path,
+                                     config.transformed_test_target_file_path)
+            train_features, train_target = self.transform_to_memmap(
+                preprocessor_object, train_file_path, feature_columns,
+                config.transformed_train_file_path, config.transformed_train_target_file_path
             )
-             
-            train_arr = np.c_[input_feature_train_final, np.array(target_feature_train_final)]
-            test_arr = np.c_[input_feature_test_final, np.array(target_feature_test_final)]
 
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, test_arr)
+            if config.resampling_strategy not in ('class_weight', 'none'):
+                start_time = time.perf_counter()
+                input_feature_train_final, target_feature_train_final = resample(
+                    train_features, train_target.astype(np.int64),
+                    strategy=config.resampling_strategy,
+                    n_jobs=config.resampling_workers,
+                    random_state=config.random_state,
+                    chunk_mb=config.resampling_chunk_mb
+                )
+                logging.info(f"Resampled train split with {config.resampling_strategy} in "
+                             f"{time.perf_counter() - start_time:.2f}s: {len(train_target)} -> "
+                             f"{len(target_feature_train_final)} rows")
+                del train_features, train_target
+                # written next to the mapped files and renamed over them, the mappings are never truncated
+                DataTransformation.save_feature_and_target(
+                    input_feature_train_final, target_feature_train_final,
+                    config.transformed_train_file_path + ".tmp", config.transformed_train_target_file_path + ".tmp"
+                )
+                os.replace(config.transformed_train_file_path + ".tmp", config.transformed_train_file_path)
+                os.replace(config.transformed_train_target_file_path + ".tmp", config.transformed_train_target_file_path)
+
+            return preprocessor_object
+
+        except Exception as e:
+            raise SensorException(e, sys)
+
+
+    def initiate_data_transformation(self)-> DataTransformationArtifact:
+
+        try:
+            preprocessor = self.get_data_transformer_object()
+            if self.data_transformation_config.fit_mode == 'streaming':
+                preprocessor_object = self.initiate_streaming_data_transformation(preprocessor)
+            else:
+                preprocessor_object = self.initiate_in_memory_data_transformation(preprocessor)
 
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
 
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                resampling_strategy=self.data_transformation_config.resampling_strategy,
+                transformed_train_target_file_path=self.data_transformation_config.transformed_train_target_file_path,
+                transformed_test_target_file_path=self.data_transformation_config.transformed_test_target_file_path
             )
 
             logging.info(f"Data Transformation Artifact: {data_transformation_artifact}")
+            logging.info(f"Peak memory after data transformation: {get_peak_memory_mb():.1f} MB")
 
             return data_transformation_artifact
         
         except Exception as e:
-            SensorException(e, sys)
+            raise SensorException(e, sys)
@@ -1,15 +1,23 @@
 from distutils import dir_util
-from sensor.constant.training_pipeline import TARGET_COLUMN
-from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.constant.training_pipeline import TARGET_COLUMN, FEATURE_DTYPE, DATA_TRANSFORMATION_IMPUTER_FILL_VALUE
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, DATA_VALIDATION_INVALID_REASON_COLUMN
+from sensor.constant.training_pipeline import DATA_INGESTION_UNPARSEABLE_COLUMN, DATA_VALIDATION_BASELINE_PROFILE_SUFFIX
 from sensor.entity.artifact_entity import DataIngestionArtifact
 from sensor.entity.artifact_entity import DataValidationArtifact
 from sensor.entity.config_entity import DataValidationConfig
 from sensor.exception import SensorException
 from sensor.logger import logging
-from sensor.utils.main_utils import read_yaml_file, write_yaml_file
-from scipy.stats import ks_2samp
+from sensor.utils.main_utils import (read_yaml_file, write_yaml_file, load_dataframe, get_dataframe_columns,
+                                     iter_dataframe_chunks, DataFrameChunkWriter)
+from sensor.ml.model.estimater import TargetValueMapping
+from sensor.ml.metric.column_profile import get_zero_variance_columns, profile_dataframe
+from sensor.ml.metric.drift_metric import compute_drift
+from sensor.ml.metric.quantile_sketch import (QuantileSketch, SKETCH_UPDATE_CHUNK_ROWS, compare_sketches,
+                                              merge_sketches)
+import numpy as np
 import pandas as pd
-import os, sys
+import os, sys, time
+from typing import List, Optional, Tuple
 
 
 class DataValidation:
@@ -26,13 +34,15 @@ class DataValidation:
             raise SensorException(f"Error while initializing DataValidation: {str(e)}", sys)
         
 
-    def drop_zero_variance_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+    def drop_zero_variance_columns(self, df: pd.DataFrame, profile: Optional[dict] = None) -> pd.DataFrame:
         """
-        This method is responsible for dropping columns with zero variance
+        This method is responsible for dropping columns with zero variance, read from the column profile of df
         """
         try:
             logging.info("Dropping columns with zero variance")
-            return df.loc[:, df.apply(pd.Series.nunique) != 1]
+            if profile is None:
+                profile = profile_dataframe(df)
+            return df.drop(columns=get_zero_variance_columns(profile))
 
         except Exception as e:
             logging.error(f"Error while dropping columns with zero variance: {str(e)}")
@@ -82,49 +92,187 @@ class DataValidation:
         
 
     @staticmethod
-    def read_data(file_path: str) -> pd.DataFrame:
+    def read_data(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         This method is responsible for reading data
         """
         try:
             logging.info("Reading data")
-            return pd.read_csv(file_path)
+            return load_dataframe(file_path, columns=columns)
         
         except Exception as e:
             logging.error(f"Error while reading data: {str(e)}")
             raise SensorException(f"Error while reading data: {str(e)}", sys)
         
     
-    def validate_dataset_drift(self, df1: pd.DataFrame, df2: pd.DataFrame, threshold=0.05) -> bool:
+    @staticmethod
+    def get_drift_columns(df1: pd.DataFrame, df2: pd.DataFrame) -> List[str]:
+        return [
+            column for column in df1.columns
+            if column in df2.columns and pd.api.types.is_numeric_dtype(df1[column])
+            and pd.api.types.is_numeric_dtype(df2[column])
+        ]
+
+
+    @staticmethod
+    def build_sketch(df: pd.DataFrame, columns: List[str]) -> QuantileSketch:
+        """
+        This method is responsible for sketching the columns in one streaming pass over row slices,
+        only one slice is converted to an array at a time
+        """
+        try:
+            sketch = QuantileSketch(columns)
+            for start in range(0, len(df), SKETCH_UPDATE_CHUNK_ROWS):
+                sketch.update(df[columns].iloc[start:start + SKETCH_UPDATE_CHUNK_ROWS].to_numpy(dtype=FEATURE_DTYPE))
+            return sketch
+
+        except Exception as e:
+            logging.error(f"Error while building sketch: {str(e)}")
+            raise SensorException(f"Error while building sketch: {str(e)}", sys)
+
+
+    def get_drift_report(self, metrics: dict, columns: List[str], threshold: float) -> dict:
+        """
+        This method is responsible for deciding drift per column with the configured method
+        and shaping the metrics into a column wise report
+        """
+        method = self.data_validation_config.drift_method
+        if method == 'ks':
+            is_drift = metrics["p_value"] < threshold
+        elif method == 'psi':
+            is_drift = metrics["psi"] > threshold
+        elif method == 'js':
+            is_drift = metrics["js_distance"] > threshold
+        else:
+            raise ValueError(f"Unsupported drift method: {method}")
+
+        report = {
+            "method": method,
+            "threshold": float(threshold),
+            "drifted_columns": [column for column, drift in zip(columns, is_drift) if drift],
+            "columns": columns,
+            "drift": [bool(drift) for drift in is_drift],
+        }
+        report.update({metric: np.round(values.astype(float), 6).tolist() for metric, values in metrics.items()})
+        return report
+
+
+    def validate_historical_drift(self, new_data_sketch: QuantileSketch, is_new_data: bool = True) -> Optional[dict]:
         """
-        This method is responsible for validating dataset drift
+        This method is responsible for comparing the data of this run with the merged profiles
+        of the previous runs, then persisting its profile for the runs after it when it only covers new data.
+        Data that is not new (a full export) is only saved once, as the baseline, when there is no history,
+        so no row is counted twice. Work and memory do not depend on how much history is covered.
+        """
+        try:
+            profile_dir = self.data_validation_config.profile_dir
+            previous_profiles = sorted(
+                file_name for file_name in os.listdir(profile_dir) if file_name.endswith(".npz")
+            ) if os.path.isdir(profile_dir) else []
+            previous_profiles = previous_profiles[-self.data_validation_config.profile_window:]
+
+            report = None
+            history = merge_sketches([
+                QuantileSketch.load(os.path.join(profile_dir, file_name)) for file_name in previous_profiles
+            ])
+            if history is not None and new_data_sketch.count.sum() > 0:
+                current = new_data_sketch.select([column for column in history.columns if column in new_data_sketch.columns])
+                report = self.get_drift_report(
+                    compare_sketches(history.select(current.columns), current),
+                    current.columns,
+                    self.data_validation_config.drift_threshold
+                )
+                report["profiles"] = previous_profiles
+                logging.info(f"Historical drift against {len(previous_profiles)} profiles: "
+                             f"{len(report['drifted_columns'])} drifted columns")
+
+            if is_new_data:
+                new_data_sketch.save(self.data_validation_config.profile_file_path)
+                new_data_sketch.save(self.data_validation_config.history_profile_file_path)
+            elif history is None:
+                logging.info("No new data and no profile history, saving this run's data as the baseline profile")
+                new_data_sketch.save(self.data_validation_config.profile_file_path)
+                new_data_sketch.save(self.data_validation_config.history_profile_file_path.replace(
+                    ".npz", f"_{DATA_VALIDATION_BASELINE_PROFILE_SUFFIX}.npz"))
+            return report
+
+        except Exception as e:
+            logging.error(f"Error while validating historical drift: {str(e)}")
+            raise SensorException(f"Error while validating historical drift: {str(e)}", sys)
+
+
+    def validate_dataset_drift(self, df1: pd.DataFrame, df2: pd.DataFrame, threshold: Optional[float] = None) -> bool:
+        """
+        This method is responsible for validating dataset drift.
+        KS, PSI and Jensen-Shannon are computed for every numeric column, either from mergeable sketches
+        or exactly from the raw columns, the configured method decides which columns drifted.
+        The report is written column wise.
         """
         try:
             logging.info("Validating dataset drift")
-            drift = False
-            report = {}
-            for column in df1.columns:
-                is_drift = False
-                statistic, p_value = ks_2samp(df1[column], df2[column])
-                if p_value < threshold:
-                    logging.error(f"Drift detected for column: {column}")
-                    drift = True
-                    is_drift = True
-                report.update({column: {"statistic": statistic, "p_value": p_value, "drift": is_drift}})
-            
+            threshold = self.data_validation_config.drift_threshold if threshold is None else threshold
+            columns = self.get_drift_columns(df1, df2)
+            engine = self.data_validation_config.drift_engine
+            start_time = time.perf_counter()
+
+            if engine == 'sketch':
+                sketch1, sketch2 = self.build_sketch(df1, columns), self.build_sketch(df2, columns)
+                metrics = compare_sketches(sketch1, sketch2, n_bins=self.data_validation_config.drift_bins)
+            elif engine == 'exact':
+                metrics = compute_drift(
+                    df1[columns].to_numpy(dtype=FEATURE_DTYPE),
+                    df2[columns].to_numpy(dtype=FEATURE_DTYPE),
+                    n_bins=self.data_validation_config.drift_bins,
+                    n_workers=self.data_validation_config.drift_workers
+                )
+            else:
+                raise ValueError(f"Unsupported drift engine: {engine}")
+
+            report = self.get_drift_report(metrics, columns, threshold)
+            report["engine"] = engine
+            logging.info(f"Drift computed for {len(columns)} columns in {time.perf_counter() - start_time:.2f}s")
+            if report["drifted_columns"]:
+                logging.error(f"Drift detected for columns: {report['drifted_columns']}")
+
+            # the ingestion delta holds the new data, without one this run's data is compared but not saved again
+            delta_file_path = self.data_ingestion_artifact.delta_file_path
+            if delta_file_path is not None:
+                new_data_sketch = self.build_sketch(load_dataframe(delta_file_path, columns=columns), columns)
+            elif engine == 'sketch':
+                new_data_sketch = merge_sketches([sketch1, sketch2])
+            else:
+                new_data_sketch = merge_sketches([self.build_sketch(df1, columns), self.build_sketch(df2, columns)])
+            report["historical"] = self.validate_historical_drift(new_data_sketch, is_new_data=delta_file_path is not None)
+
             drift_report_file_path = self.data_validation_config.drift_report_file_path
 
             drift_report_dir_path = os.path.dirname(drift_report_file_path)
             os.makedirs(drift_report_dir_path, exist_ok=True)
             write_yaml_file(drift_report_file_path, report, replace=True)
             
-            return drift
+            return len(report["drifted_columns"]) > 0
 
         except Exception as e:
             logging.error(f"Error while validating dataset drift: {str(e)}")
             raise SensorException(f"Error while validating dataset drift: {str(e)}", sys) 
     
 
+    def write_column_profile(self, df: pd.DataFrame) -> dict:
+        """
+        This method is responsible for profiling the train split once and saving it for the later stages
+        """
+        try:
+            start_time = time.perf_counter()
+            profile = profile_dataframe(df, fill_value=DATA_TRANSFORMATION_IMPUTER_FILL_VALUE)
+            write_yaml_file(self.data_validation_config.column_profile_file_path, profile, replace=True)
+            logging.info(f"Profiled {len(profile['columns'])} columns in {time.perf_counter() - start_time:.2f}s")
+            return profile
+
+        except Exception as e:
+            logging.error(f"Error while writing column profile: {str(e)}")
+            raise SensorException(f"Error while writing column profile: {str(e)}", sys)
+
+
     def validate_target_column(self, df: pd.DataFrame) -> bool:
         """
         This method is responsible for validating target column
@@ -142,6 +290,85 @@ class DataValidation:
             raise SensorException(f"Error while validating target column: {str(e)}", sys)
     
     
+    def validate_rows(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        This method is responsible for checking every row of a chunk against the schema at once.
+        Text columns are parsed as numbers ('na' and blanks are missing values), rows the export could not parse
+        are flagged by DATA_INGESTION_UNPARSEABLE_COLUMN, numeric values must be finite
+        and fit the feature dtype, int columns must hold whole numbers and the target must be a known class.
+        Returns the chunk with parsed columns and the reason every row failed, an empty string for valid rows.
+        """
+        try:
+            schema_types = {list(data.keys())[0]: list(data.values())[0] for data in self._schema_config['columns']}
+            numeric_columns = [column for column, dtype in schema_types.items() if dtype != 'category' and column in df.columns]
+            int_columns = [column for column in numeric_columns if schema_types[column] == 'int']
+            checks = {}
+
+            unparseable = np.zeros(len(df), dtype=bool)
+            parsed_columns = {}
+            for column in numeric_columns:
+                if pd.api.types.is_numeric_dtype(df[column]):
+                    continue
+                text = df[column].astype('string').str.strip()
+                missing = (df[column].isna() | text.str.lower().isin(['na', ''])).to_numpy(dtype=bool)
+                parsed_columns[column] = pd.to_numeric(text.where(~missing), errors='coerce').astype(np.float64)
+                unparseable |= parsed_columns[column].isna().to_numpy() & ~missing
+            if parsed_columns:
+                df = df.assign(**parsed_columns)
+            if DATA_INGESTION_UNPARSEABLE_COLUMN in df.columns:
+                unparseable |= df[DATA_INGESTION_UNPARSEABLE_COLUMN].fillna(0).to_numpy() > 0
+                df = df.drop(columns=DATA_INGESTION_UNPARSEABLE_COLUMN)
+            checks["unparseable"] = unparseable
+
+            values = df[numeric_columns].to_numpy(dtype=np.float64)
+            finite = np.isfinite(values)
+            checks["non_finite"] = np.isinf(values).any(axis=1)
+            with np.errstate(invalid='ignore'):
+                checks["out_of_range"] = (finite & (np.abs(values) > np.finfo(FEATURE_DTYPE).max)).any(axis=1)
+                int_values = values[:, [numeric_columns.index(column) for column in int_columns]]
+                checks["non_integer"] = (np.isfinite(int_values) & (int_values != np.round(int_values))).any(axis=1)
+            checks["unknown_target"] = ~df[TARGET_COLUMN].isin(list(TargetValueMapping().to_dict().keys())).to_numpy()
+
+            reasons = np.full(len(df), "", dtype=object)
+            for check, failed in checks.items():
+                reasons[failed] = reasons[failed] + check + ";"
+            return df, reasons
+
+        except Exception as e:
+            logging.error(f"Error while validating rows: {str(e)}")
+            raise SensorException(f"Error while validating rows: {str(e)}", sys)
+
+
+    def split_valid_rows(self, file_path: str, valid_file_path: str, invalid_file_path: str) -> Tuple[int, int]:
+        """
+        This method is responsible for streaming a split through validate_rows chunk by chunk,
+        valid rows are written with the schema dtypes and invalid rows are quarantined as read
+        together with the reason they failed. Only one chunk is held in memory.
+        """
+        try:
+            logging.info(f"Validating rows of: {file_path}")
+            for stale_file_path in (valid_file_path, invalid_file_path):
+                if os.path.exists(stale_file_path):
+                    os.remove(stale_file_path)
+
+            with DataFrameChunkWriter(valid_file_path, SCHEMA_FILE_PATH) as valid_writer, \
+                    DataFrameChunkWriter(invalid_file_path) as invalid_writer:
+                for chunk in iter_dataframe_chunks(file_path, self.data_validation_config.chunk_rows):
+                    parsed_chunk, reasons = self.validate_rows(chunk)
+                    is_valid = reasons == ""
+                    if is_valid.any():
+                        valid_writer.write(parsed_chunk[is_valid])
+                    if not is_valid.all():
+                        invalid_writer.write(chunk[~is_valid].assign(**{DATA_VALIDATION_INVALID_REASON_COLUMN: reasons[~is_valid]}))
+
+            logging.info(f"Valid rows: {valid_writer.rows}, invalid rows: {invalid_writer.rows}")
+            return valid_writer.rows, invalid_writer.rows
+
+        except Exception as e:
+            logging.error(f"Error while splitting valid rows: {str(e)}")
+            raise SensorException(f"Error while splitting valid rows: {str(e)}", sys)
+
+
     def initiate_data_validation(self) -> DataValidationArtifact:
 
         """
@@ -152,8 +379,13 @@ class DataValidation:
     
             logging.info("Initiating data validation process")
 
-            train_df = self.read_data(self.data_ingestion_artifact.train_data_file_path)
-            test_df = self.read_data(self.data_ingestion_artifact.test_data_file_path)
+            # structure is checked from the file schema, no rows are read
+            train_df, test_df = (
+                pd.DataFrame(columns=[column for column in get_dataframe_columns(file_path)
+                                      if column != DATA_INGESTION_UNPARSEABLE_COLUMN])
+                for file_path in (self.data_ingestion_artifact.train_data_file_path,
+                                  self.data_ingestion_artifact.test_data_file_path)
+            )
 
             if not self.validate_number_of_columns(train_df):
                 error_message += "Number of columns in training data is not matching with schema\n"
@@ -176,23 +408,49 @@ class DataValidation:
 
             if len(error_message) > 0:
                 logging.error(f"Error while validating data: {error_message}")
-                raise SensorException(error_message, sys)
+                raise ValueError(error_message)
+
+            # rows failing the schema are quarantined, the run only fails when too many of them do
+            split_file_paths = {
+                "train": (self.data_ingestion_artifact.train_data_file_path,
+                          self.data_validation_config.valid_train_file_path,
+                          self.data_validation_config.invalid_train_file_path),
+                "test": (self.data_ingestion_artifact.test_data_file_path,
+                         self.data_validation_config.valid_test_file_path,
+                         self.data_validation_config.invalid_test_file_path),
+            }
+            invalid_file_paths = {}
+            for split, file_paths in split_file_paths.items():
+                n_valid, n_invalid = self.split_valid_rows(*file_paths)
+                invalid_ratio = n_invalid / max(n_valid + n_invalid, 1)
+                if n_valid == 0 or invalid_ratio > self.data_validation_config.max_invalid_ratio:
+                    error_message += f"{n_invalid} of {n_valid + n_invalid} rows in {split} data are invalid\n"
+                invalid_file_paths[split] = file_paths[2] if n_invalid > 0 else None
+
+            if len(error_message) > 0:
+                logging.error(f"Error while validating data: {error_message}")
+                raise ValueError(error_message)
+
+            train_df = self.read_data(self.data_validation_config.valid_train_file_path)
+            test_df = self.read_data(self.data_validation_config.valid_test_file_path)
             
+            self.write_column_profile(train_df)
             status = self.validate_dataset_drift(train_df, test_df)
 
             data_validation_artifact = DataValidationArtifact(
                 validation_status=status,
-                valid_train_file_path=self.data_ingestion_artifact.train_data_file_path, 
-                valid_test_file_path=self.data_ingestion_artifact.test_data_file_path,
-                invalid_train_file_path = None,
-                invalid_test_file_path = None,
-                drift_report_file_path = self.data_validation_config.drift_report_file_path
+                valid_train_file_path=self.data_validation_config.valid_train_file_path, 
+                valid_test_file_path=self.data_validation_config.valid_test_file_path,
+                invalid_train_file_path = invalid_file_paths["train"],
+                invalid_test_file_path = invalid_file_paths["test"],
+                drift_report_file_path = self.data_validation_config.drift_report_file_path,
+                column_profile_file_path = self.data_validation_config.column_profile_file_path
             ) 
 
             logging.info(f"Data validation artifact: {data_validation_artifact}")
 
             return data_validation_artifact
 
-        except SensorException as e:
+        except Exception as e:
             logging.error(f"Error while initiating data validation: {str(e)}")
             raise SensorException(f"Error while initiating data validation: {str(e)}", sys)
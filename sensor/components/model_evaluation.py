@@ -6,11 +6,12 @@ from sensor.entity.config_entity import ModelEvaluationConfig, ModelTrainerConfi
 
 from sensor.ml.metric.classification_metric import get_classification_score
 from sensor.ml.model.estimater import SensorModel, ModelResolver, TargetValueMapping
-from sensor.utils.main_utils import save_object, load_object, write_yaml_file
+from sensor.utils.main_utils import save_object, load_object, write_yaml_file, read_yaml_file, load_dataframe
 from sensor.constant.training_pipeline import TARGET_COLUMN
 
 import os, sys
 import pandas as pd
+from typing import List, Optional
 
 
 class ModelEvaluation:
@@ -19,22 +20,33 @@ class ModelEvaluation:
         self.model_trainer_artifact = model_trainer_artifact
         self.model_evaluation_config = model_evaluation_config
         self.data_validation_artifact = data_validation_artifact
-        
+
+
+    def get_required_columns(self, models: List[SensorModel]) -> Optional[List[str]]:
+        """
+        This method is responsible for listing the target and every feature column the models need.
+        For a model without fitted feature names the profiled train columns are used, None means all columns.
+        """
+        profile_file_path = self.data_validation_artifact.column_profile_file_path
+        profile_columns = read_yaml_file(profile_file_path)["columns"] if profile_file_path else None
+
+        columns = [TARGET_COLUMN]
+        for model in models:
+            feature_names = getattr(model.preprocesser, "feature_names_in_", None)
+            if feature_names is None:
+                feature_names = profile_columns
+            if feature_names is None:
+                return None
+            columns.extend(column for column in feature_names if column not in columns)
+        return columns
+
+
     def initiate_model_evaluation(self)-> ModelEvaluationArtifact:
         
         try:
             valid_train_file_path = self.data_validation_artifact.valid_train_file_path
             valid_test_file_path = self.data_validation_artifact.valid_test_file_path
 
-            train_df = pd.read_csv(valid_train_file_path)
-            test_df = pd.read_csv(valid_test_file_path)
-
-            df = pd.concat([train_df, test_df])
-            y_true = df[TARGET_COLUMN]
-            y_true.replace(TargetValueMapping().to_dict(), inplace=True)
-            
-            df.drop(columns=[TARGET_COLUMN], inplace=True, axis=1)
-
             train_model_file_path = self.model_trainer_artifact.trained_model_file_path
             model_resolver = ModelResolver()
             is_model_accepted = True
@@ -47,7 +59,8 @@ class ModelEvaluation:
                     best_model_path=None,
                     trained_model_path=train_model_file_path,
                     train_model_metric_artifact=self.model_trainer_artifact.train_metric_artifact,
-                    best_model_metric_artifact=None
+                    best_model_metric_artifact=None,
+                    training_report_file_path=self.model_trainer_artifact.training_report_file_path
                 )
 
                 logging.info(f"Model evaluation completed and artifact: {model_evaluation_artifact}")
@@ -57,6 +70,17 @@ class ModelEvaluation:
             latest_model = load_object(latest_model_path)
             train_model = load_object(train_model_file_path)
 
+            # only the target and the features the models were fitted on are read from the artifacts
+            columns = self.get_required_columns([train_model, latest_model])
+            train_df = load_dataframe(valid_train_file_path, columns=columns)
+            test_df = load_dataframe(valid_test_file_path, columns=columns)
+
+            df = pd.concat([train_df, test_df])
+            y_true = df[TARGET_COLUMN]
+            y_true = y_true.map(TargetValueMapping().to_dict())
+            
+            df.drop(columns=[TARGET_COLUMN], inplace=True)
+
             y_trained_pred = train_model.predict(df)
             y_latest_pred = latest_model.predict(df)
 
@@ -77,7 +101,8 @@ class ModelEvaluation:
                 best_model_path=latest_model_path,
                 trained_model_path=train_model_file_path,
                 train_model_metric_artifact=trained_metric,
-                best_model_metric_artifact=latest_metric
+                best_model_metric_artifact=latest_metric,
+                training_report_file_path=self.model_trainer_artifact.training_report_file_path
             )
 
             model_eval_report = model_evaluation_artifact.__dict__
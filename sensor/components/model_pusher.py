@@ -2,10 +2,17 @@ from sensor.entity.artifact_entity import ModelEvaluationArtifact, ModelPusherAr
 from sensor.entity.config_entity import ModelPusherConfig
 from sensor.exception import SensorException
 from sensor.logger import logging
+from sensor.ml.model.estimater import ModelResolver
+from sensor.utils.main_utils import load_object, write_yaml_file, read_yaml_file, get_file_hash
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, MODEL_FILE_NAME, SAVED_MODEL_DIR
 
+from dataclasses import asdict
+from datetime import datetime
 import shutil
 import os, sys
 
+MANIFEST_TRAINING_KEYS = ("mode", "params", "incremental_runs", "base_version", "partitions")
+
 
 class ModelPusher:
 
@@ -13,6 +20,45 @@ class ModelPusher:
         self.model_evaluation_artifact = model_evaluation_artifact
         self.model_pusher_config = model_pusher_config
 
+
+    def build_manifest(self, model_path: str) -> dict:
+        """
+        This method is responsible for describing a saved model bundle so serving can trust it on its own
+        """
+        try:
+            sensor_model = load_object(file_path=model_path)
+            preprocessor = sensor_model.preprocesser
+            columns = [str(col) for col in getattr(preprocessor, "feature_names_in_", [])]
+
+            metrics = {}
+            for name, metric_artifact in (("train", self.model_evaluation_artifact.train_model_metric_artifact),
+                                          ("previous_best", self.model_evaluation_artifact.best_model_metric_artifact)):
+                if metric_artifact is not None:
+                    metrics[name] = {key: float(value) for key, value in asdict(metric_artifact).items()}
+
+            # lineage the next run reads to decide between a warm start and a full retrain
+            training = {}
+            training_report_file_path = self.model_evaluation_artifact.training_report_file_path
+            if training_report_file_path is not None and os.path.exists(training_report_file_path):
+                training_report = read_yaml_file(training_report_file_path)
+                training = {key: training_report[key] for key in MANIFEST_TRAINING_KEYS if key in training_report}
+
+            return {
+                "version": self.model_pusher_config.model_version,
+                "created_at": datetime.now().isoformat(),
+                "model_file": MODEL_FILE_NAME,
+                "model_sha256": get_file_hash(model_path),
+                "schema_sha256": get_file_hash(SCHEMA_FILE_PATH),
+                "columns": columns,
+                "metrics": metrics,
+                "training": training,
+                "trained_model_path": self.model_evaluation_artifact.trained_model_path,
+            }
+
+        except Exception as e:
+            logging.error(f"Error while building model manifest: {str(e)}")
+            raise SensorException(f"Error while building model manifest: {str(e)}", sys)
+
     
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         try:
@@ -25,21 +71,30 @@ class ModelPusher:
 
             shutil.copy(src=trained_model_path, dst=model_file_path)
 
-            #saved model dir
+            #saved model bundle: model.pkl + manifest.yaml under saved_models/<version>
             saved_model_path = self.model_pusher_config.saved_model_path
 
             os.makedirs(os.path.dirname(saved_model_path),exist_ok=True)
 
             shutil.copy(src=trained_model_path, dst=saved_model_path)
 
+            manifest = self.build_manifest(saved_model_path)
+            write_yaml_file(self.model_pusher_config.saved_manifest_file_path, manifest, atomic=True)
+
+            #bundle is complete, make it the current version
+            ModelResolver(model_dir=SAVED_MODEL_DIR).register(self.model_pusher_config.model_version)
+            logging.info(f"Registered model version: {self.model_pusher_config.model_version}")
+
             #prepare artifact
             model_pusher_artifact = ModelPusherArtifact(
                 saved_model_path=saved_model_path,
-                model_file_path=model_file_path
+                model_file_path=model_file_path,
+                model_version=self.model_pusher_config.model_version,
+                manifest_file_path=self.model_pusher_config.saved_manifest_file_path
             )
 
             return model_pusher_artifact
     
         except Exception as e:
             logging.error(f"Error while pushing model: {str(e)}")
-            raise SensorException(f"Error while pushing model: {str(e)}", sys)
\ No newline at end of file
+            raise SensorException(f"Error while pushing model: {str(e)}", sys)
@@ -1,22 +1,29 @@
-from sensor.utils.main_utils import load_numpy_array_data
+from sensor.utils.main_utils import (load_numpy_array_data, get_peak_memory_mb, load_dataframe, read_yaml_file,
+                                     get_test_split_mask)
 from sensor.exception import SensorException
 from sensor.logger import logging
 from sensor.entity.artifact_entity import DataTransformationArtifact,ModelTrainerArtifact
 from sensor.entity.config_entity import ModelTrainerConfig
 import os,sys
+import numpy as np
+import pandas as pd
+from typing import List, Optional
 
 
-from xgboost import XGBClassifier
 from sensor.ml.metric.classification_metric import get_classification_score
-from sensor.ml.model.estimater import SensorModel
-from sensor.utils.main_utils import save_object,load_object
+from sensor.ml.model.estimater import SensorModel, ModelResolver, TargetValueMapping
+from sensor.ml.model.hyperparameter_search import SuccessiveHalvingSearch, get_available_cores
+from sensor.ml.model.model_zoo import ModelZoo
+from sensor.ml.model.training_engine import train_booster, update_booster, get_validation_split
+from sensor.utils.main_utils import save_object,load_object,write_yaml_file
+from sensor.constant.training_pipeline import TARGET_COLUMN, DATA_INGESTION_UNPARSEABLE_COLUMN, DATA_INGESTION_ID_COLUMN
 
 
 
 class ModelTrainer:
 
     def __init__(self,model_trainer_config:ModelTrainerConfig,
-        data_transformation_artifact:DataTransformationArtifact):
+        data_transformation_artifact:Optional[DataTransformationArtifact]=None):
 
         try:
             self.model_trainer_config=model_trainer_config
@@ -26,69 +33,399 @@ class ModelTrainer:
         except Exception as e:
             raise SensorException(e,sys)
 
-    def perform_hyper_paramter_tuning(self):...
+    def perform_hyper_paramter_tuning(self,positive_weight:Optional[float]=None)->dict:
+        """
+        This method is responsible for the successive halving search over the configured search space,
+        trials weight the positive class like the final model does.
+        Returns the best parameters and the boosting rounds kept by early stopping
+        """
+        try:
+            config = self.model_trainer_config
+            search = SuccessiveHalvingSearch(
+                search_space=config.search_space,
+                trials_dir=config.search_dir,
+                n_trials=config.search_trials,
+                eta=config.search_eta,
+                min_rounds=config.search_min_rounds,
+                max_rounds=config.search_max_rounds,
+                early_stopping_rounds=config.early_stopping_rounds,
+                validation_ratio=config.validation_ratio,
+                n_workers=config.search_workers,
+                random_state=config.random_state
+            )
+            return search.run(self.data_transformation_artifact.transformed_train_file_path,
+                              self.data_transformation_artifact.transformed_train_target_file_path,
+                              positive_weight=positive_weight)
+
+        except Exception as e:
+            raise SensorException(f"Error while tuning hyperparameters: {str(e)}", sys)
     
 
-    def train_model(self,x_train,y_train):
+    def get_positive_weight(self,y_train)->Optional[float]:
+        """
+        This method is responsible for the weight of the positive class, with class_weight the train split
+        is not resampled and the positive class is weighted instead
+        """
+        if self.data_transformation_artifact.resampling_strategy != 'class_weight':
+            return None
+        n_positive = max(int(np.sum(y_train == 1)), 1)
+        positive_weight = (len(y_train) - n_positive) / n_positive
+        logging.info(f"Training with positive class weight: {positive_weight:.2f}")
+        return positive_weight
+
 
+    def train_model_zoo(self,y_train,lineage:Optional[dict]=None):
+        """
+        This method is responsible for training every configured candidate side by side and keeping the one
+        with the lowest APS cost on a validation fold of the train split within the latency budget,
+        tuned xgboost candidates take the searched parameters
+        """
         try:
-            xgb_clf = XGBClassifier()
-            xgb_clf.fit(x_train,y_train)
-            return xgb_clf
+            config = self.model_trainer_config
+            positive_weight = self.get_positive_weight(y_train)
+            tuned_params = {}
+            if config.hyperparameter_search:
+                tuned_params = self.perform_hyper_paramter_tuning(positive_weight)["params"]
+            candidates = [
+                {**candidate, "params": {**(candidate.get("params") or {}), **tuned_params}}
+                if candidate.get("tuned") else candidate
+                for candidate in config.candidates
+            ]
+
+            model_zoo = ModelZoo(
+                candidates=candidates,
+                models_dir=config.model_zoo_dir,
+                latency_budget_us=config.latency_budget_us,
+                false_positive_cost=config.false_positive_cost,
+                false_negative_cost=config.false_negative_cost,
+                n_workers=config.model_zoo_workers,
+                validation_ratio=config.validation_ratio,
+                engine_settings={
+                    "num_boost_round": config.num_boost_round,
+                    "early_stopping_rounds": config.early_stopping_rounds,
+                    "validation_ratio": config.validation_ratio,
+                    "mode": config.training_mode,
+                    "max_bin": config.max_bin,
+                    "batch_rows": config.batch_rows,
+                    "cache_dir": config.cache_dir,
+                },
+                random_state=config.random_state
+            )
+            ranked = model_zoo.run(
+                self.data_transformation_artifact.transformed_train_file_path,
+                self.data_transformation_artifact.transformed_train_target_file_path,
+                positive_weight=positive_weight,
+                report_file_path=config.model_zoo_report_file_path
+            )
+
+            selected = ranked[0]
+            report = {
+                "mode": "model_zoo",
+                "candidate": selected["name"],
+                "estimator": selected["estimator"],
+                "cost": selected["cost"],
+                "latency_us_per_row": selected["latency_us_per_row"],
+                "params": selected["params"],
+                **(lineage or {}),
+            }
+            write_yaml_file(config.training_report_file_path, report, replace=True)
+            return load_object(file_path=selected["model_file_path"])
+
+        except Exception as e:
+            raise SensorException(f"Error while training model zoo: {str(e)}", sys)
+
+
+    def train_model(self,x_train,y_train,lineage:Optional[dict]=None):
+        """
+        This method is responsible for training the booster with the configured engine, tuned parameters
+        when the search is enabled, and writing the training report with the lineage of the model
+        """
+        try:
+            config = self.model_trainer_config
+            params = {}
+            positive_weight = self.get_positive_weight(y_train)
+            if config.hyperparameter_search:
+                params.update(self.perform_hyper_paramter_tuning(positive_weight)["params"])
+            if positive_weight is not None:
+                params["scale_pos_weight"] = positive_weight
+
+            model, report = train_booster(
+                x_train, y_train, params,
+                num_boost_round=config.num_boost_round,
+                early_stopping_rounds=config.early_stopping_rounds,
+                validation_ratio=config.validation_ratio,
+                mode=config.training_mode,
+                nthread=config.nthread if config.nthread > 0 else get_available_cores(),
+                max_bin=config.max_bin,
+                batch_rows=config.batch_rows,
+                cache_dir=config.cache_dir,
+                random_state=config.random_state
+            )
+            report["params"] = params
+            report.update(lineage or {})
+            write_yaml_file(config.training_report_file_path, report, replace=True)
+            return model
         
         except Exception as e:
             raise e
     
-    def initiate_model_trainer(self)->ModelTrainerArtifact:
+    def get_feature_store_partitions(self)->List[str]:
+        """
+        This method is responsible for listing the committed feature store partitions, the data a model trained now has seen
+        """
+        if not os.path.exists(self.model_trainer_config.watermark_file_path):
+            return []
+        return read_yaml_file(self.model_trainer_config.watermark_file_path).get("partitions", [])
 
+
+    def get_incremental_base(self, partitions:List[str])->Optional[dict]:
+        """
+        This method is responsible for deciding whether this run warm starts from the production model.
+        It does when the production manifest records the partitions and parameters the model was trained with,
+        fewer than max_incremental_runs incremental runs led to it and the feature store has partitions it has not seen.
+        Returns the production model path, its training lineage and the unseen partitions, None for a full retrain.
+        """
         try:
-            train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            test_file_path = self.data_transformation_artifact.transformed_test_file_path
-
-            #loading training array and testing array
-            train_arr = load_numpy_array_data(train_file_path)
-            test_arr = load_numpy_array_data(test_file_path)
-
-            x_train, y_train, x_test, y_test = (
-                train_arr[:, :-1],
-                train_arr[:, -1],
-                test_arr[:, :-1],
-                test_arr[:, -1],
+            config = self.model_trainer_config
+            if not config.incremental:
+                return None
+
+            model_resolver = ModelResolver()
+            if not model_resolver.is_model_exists():
+                logging.info("No production model to warm start from, training from scratch")
+                return None
+
+            model_path = model_resolver.get_best_model_path()
+            training = (model_resolver.get_manifest(model_path) or {}).get("training") or {}
+            if "partitions" not in training or "params" not in training:
+                logging.info("Production model has no training lineage, training from scratch")
+                return None
+
+            incremental_runs = int(training.get("incremental_runs", 0))
+            if incremental_runs >= config.max_incremental_runs:
+                logging.info(f"Production model is {incremental_runs} incremental runs old, training from scratch")
+                return None
+
+            if any(partition not in partitions for partition in training["partitions"]):
+                logging.info("Feature store does not hold the partitions of the production model, training from scratch")
+                return None
+
+            new_partitions = [partition for partition in partitions if partition not in training["partitions"]]
+            if len(new_partitions) == 0:
+                logging.info("No feature store partitions newer than the production model, training from scratch")
+                return None
+
+            return {
+                "model_path": model_path,
+                "version": model_resolver.get_current_version(),
+                "training": training,
+                "new_partitions": new_partitions,
+            }
+
+        except Exception as e:
+            raise SensorException(f"Error while resolving incremental training base: {str(e)}", sys)
+
+
+    def load_incremental_data(self, preprocessor, partitions:List[str]):
+        """
+        This method is responsible for the train split rows of partitions transformed with the production preprocessor.
+        Rows are split by the hash of their _id like data ingestion does, so the rows that went to the test split
+        model evaluation scores on are never trained on.
+        Rows without a known target, with values the export could not parse or with non finite features are left out
+        """
+        try:
+            feature_columns = [str(column) for column in preprocessor.feature_names_in_]
+            df = pd.concat([
+                load_dataframe(os.path.join(self.model_trainer_config.feature_store_dir, partition),
+                               columns=feature_columns + [TARGET_COLUMN, DATA_INGESTION_UNPARSEABLE_COLUMN,
+                                                          DATA_INGESTION_ID_COLUMN])
+                for partition in partitions
+            ], ignore_index=True)
+
+            is_test = get_test_split_mask(df[DATA_INGESTION_ID_COLUMN], self.model_trainer_config.train_test_split_ratio)
+            df = df[~is_test
+                    & df[TARGET_COLUMN].isin(list(TargetValueMapping().to_dict().keys()))
+                    & (df[DATA_INGESTION_UNPARSEABLE_COLUMN] == 0)]
+            features = np.asarray(preprocessor.transform(df[feature_columns]), dtype=np.float32)
+            target = df[TARGET_COLUMN].map(TargetValueMapping().to_dict()).to_numpy(dtype=np.int64)
+
+            finite = np.isfinite(features).all(axis=1)
+            logging.info(f"Incremental data: {int(finite.sum())} train split rows from {len(partitions)} partitions, "
+                         f"{int(is_test.sum())} test split rows and {int((~finite).sum())} non finite rows left out")
+            return features[finite], target[finite]
+
+        except Exception as e:
+            raise SensorException(f"Error while loading incremental data: {str(e)}", sys)
+
+
+    def get_model_rejection_reason(self, classification_train_metric, classification_test_metric)->Optional[str]:
+        if classification_train_metric.f1_score<=self.model_trainer_config.expected_accuracy:
+            return "Trained model is not good to provide expected accuracy"
+
+        #Overfitting and Underfitting
+        diff = abs(classification_train_metric.f1_score-classification_test_metric.f1_score)
+        if diff>self.model_trainer_config.overfitting_underfitting_threshold:
+            return "Model is not good try to do more experimentation."
+        return None
+
+
+    def train_incremental_model(self, base:dict, partitions:List[str]):
+        """
+        This method is responsible for warm starting the production booster on the train split rows of the partitions
+        it has not seen. The production preprocessor is kept, so the new trees see the features as the old ones did.
+        Train and test metrics are taken on the train and validation folds of those rows.
+        Returns the model with its metrics, None when the new rows cannot support an incremental update.
+        """
+        try:
+            config = self.model_trainer_config
+            production_model = load_object(file_path=base["model_path"])
+            if not hasattr(production_model.model, "get_booster"):
+                logging.info(f"Production model {type(production_model.model).__name__} cannot be warm started, "
+                             "training from scratch")
+                return None
+            features, target = self.load_incremental_data(production_model.preprocesser, base["new_partitions"])
+
+            # both classes must reach the validation fold for early stopping and the metrics to mean anything
+            if min(np.bincount(target, minlength=2)) * config.validation_ratio < 1:
+                logging.info(f"New rows hold too few of each class: {np.bincount(target, minlength=2).tolist()}, "
+                             "training from scratch")
+                return None
+
+            params = dict(base["training"]["params"])
+            model, report = update_booster(
+                production_model.model.get_booster(), features, target, params,
+                strategy=config.incremental_strategy,
+                num_boost_round=config.incremental_rounds,
+                early_stopping_rounds=config.early_stopping_rounds,
+                validation_ratio=config.validation_ratio,
+                nthread=config.nthread if config.nthread > 0 else get_available_cores(),
+                max_bin=config.max_bin,
+                batch_rows=config.batch_rows,
+                random_state=config.random_state
             )
 
-            model = self.train_model(x_train, y_train)
+            # the same folds update_booster trained and early stopped on
+            train_index, validation_index = get_validation_split(target, config.validation_ratio, config.random_state)
+            classification_train_metric = get_classification_score(
+                y_true=target[train_index], y_pred=model.predict(features[train_index]))
+            classification_test_metric = get_classification_score(
+                y_true=target[validation_index], y_pred=model.predict(features[validation_index]))
 
-            y_train_pred = model.predict(x_train)
+            rejection_reason = self.get_model_rejection_reason(classification_train_metric, classification_test_metric)
+            if rejection_reason is not None:
+                logging.info(f"Incremental model rejected: {rejection_reason} Training from scratch")
+                return None
+
+            report.update({
+                "params": params,
+                "incremental_runs": int(base["training"].get("incremental_runs", 0)) + 1,
+                "base_version": base["version"],
+                "partitions": partitions,
+            })
+            write_yaml_file(config.training_report_file_path, report, replace=True)
+
+            sensor_model = SensorModel(preprocessor=production_model.preprocesser, model=model)
+            return sensor_model, classification_train_metric, classification_test_metric
+
+        except Exception as e:
+            raise SensorException(f"Error while training incremental model: {str(e)}", sys)
 
+
+    def train_full_model(self, partitions:List[str]):
+        """
+        This method is responsible for training from scratch on the transformed train split,
+        with the preprocessor fitted by data transformation
+        """
+        try:
+            # features and target are separate contiguous files, mapped instead of read and never sliced
+            x_train = load_numpy_array_data(self.data_transformation_artifact.transformed_train_file_path, mmap_mode='r')
+            y_train = load_numpy_array_data(self.data_transformation_artifact.transformed_train_target_file_path, mmap_mode='r')
+            x_test = load_numpy_array_data(self.data_transformation_artifact.transformed_test_file_path, mmap_mode='r')
+            y_test = load_numpy_array_data(self.data_transformation_artifact.transformed_test_target_file_path, mmap_mode='r')
+
+            lineage = {"incremental_runs": 0, "base_version": None, "partitions": partitions}
+            if self.model_trainer_config.model_zoo:
+                model = self.train_model_zoo(y_train, lineage=lineage)
+            else:
+                model = self.train_model(x_train, y_train, lineage=lineage)
+
+            y_train_pred = model.predict(x_train)
             classification_train_metric =  get_classification_score(y_true=y_train, y_pred=y_train_pred)
-            
-            if classification_train_metric.f1_score<=self.model_trainer_config.expected_accuracy:
-                raise Exception("Trained model is not good to provide expected accuracy")
-            
-            y_test_pred = model.predict(x_test)
 
+            y_test_pred = model.predict(x_test)
             classification_test_metric = get_classification_score(y_true=y_test, y_pred=y_test_pred)
 
-
-            #Overfitting and Underfitting
-            diff = abs(classification_train_metric.f1_score-classification_test_metric.f1_score)
-            if diff>self.model_trainer_config.overfitting_underfitting_threshold:
-                raise Exception("Model is not good try to do more experimentation.")
+            rejection_reason = self.get_model_rejection_reason(classification_train_metric, classification_test_metric)
+            if rejection_reason is not None:
+                raise Exception(rejection_reason)
 
             preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
-            
-            model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
-            os.makedirs(model_dir_path,exist_ok=True)
             sensor_model = SensorModel(preprocessor=preprocessor,model=model)
-            save_object(self.model_trainer_config.trained_model_file_path, obj=sensor_model)
+            return sensor_model, classification_train_metric, classification_test_metric
+
+        except Exception as e:
+            raise SensorException(f"Error while training full model: {str(e)}", sys)
+
+
+    def save_model_trainer_artifact(self, sensor_model:SensorModel, classification_train_metric,
+                                    classification_test_metric, model_zoo_report_file_path:Optional[str]=None
+                                    )->ModelTrainerArtifact:
+        """
+        This method is responsible for saving the trained model and returning the model trainer artifact
+        """
+        # the fused kernel is checked against the sklearn preprocessor once here, serving reuses it as saved
+        if sensor_model.compile():
+            logging.info("Saving model with the fused preprocessing kernel")
+
+        model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
+        os.makedirs(model_dir_path,exist_ok=True)
+        save_object(self.model_trainer_config.trained_model_file_path, obj=sensor_model)
+
+        model_trainer_artifact = ModelTrainerArtifact(
+            trained_model_file_path=self.model_trainer_config.trained_model_file_path, 
+            train_metric_artifact=classification_train_metric,
+            test_metric_artifact=classification_test_metric,
+            training_report_file_path=self.model_trainer_config.training_report_file_path,
+            model_zoo_report_file_path=model_zoo_report_file_path
+        )
+        logging.info(f"Model trainer artifact: {model_trainer_artifact}")
+        logging.info(f"Peak memory after model training: {get_peak_memory_mb():.1f} MB")
+        return model_trainer_artifact
+
+
+    def initiate_incremental_model_trainer(self)->Optional[ModelTrainerArtifact]:
+        """
+        This method is responsible for warm starting the production model on the new feature store partitions.
+        It needs no data transformation artifact, returns None when the run has to train from scratch.
+        """
+        try:
+            partitions = self.get_feature_store_partitions()
+            base = self.get_incremental_base(partitions)
+            if base is None:
+                return None
+
+            incremental_model = self.train_incremental_model(base, partitions)
+            if incremental_model is None:
+                return None
+            return self.save_model_trainer_artifact(*incremental_model)
+
+        except Exception as e:
+            raise SensorException(f"Error while initiating incremental model trainer: {str(e)}", sys)
+
+
+    def initiate_model_trainer(self)->ModelTrainerArtifact:
+        """
+        This method is responsible for training from scratch on the data transformation artifact
+        """
+        try:
+            partitions = self.get_feature_store_partitions()
+            sensor_model, classification_train_metric, classification_test_metric = self.train_full_model(partitions)
 
-            model_trainer_artifact = ModelTrainerArtifact(
-                trained_model_file_path=self.model_trainer_config.trained_model_file_path, 
-                train_metric_artifact=classification_train_metric,
-                test_metric_artifact=classification_test_metric
+            return self.save_model_trainer_artifact(
+                sensor_model, classification_train_metric, classification_test_metric,
+                model_zoo_report_file_path=self.model_trainer_config.model_zoo_report_file_path
+                if self.model_trainer_config.model_zoo else None
             )
-            logging.info(f"Model trainer artifact: {model_trainer_artifact}")
-            return model_trainer_artifact
         
         except Exception as e:
-            raise SensorException(f"Error while initiating model trainer: {str(e)}", sys)
\ No newline at end of file
+            raise SensorException(f"Error while initiating model trainer: {str(e)}", sys)
@@ -1,2 +1,65 @@
+import os
+
 APP_HOST = '0.0.0.0'
-APP_PORT = 8080
\ No newline at end of file
+APP_PORT = 8080
+
+# Model cache related constant values starts with MODEL_CACHE
+
+MODEL_CACHE_REFRESH_INTERVAL_SECONDS: int = 30
+
+
+# Prediction related constant values starts with PREDICTION
+
+PREDICTION_CHUNK_SIZE: int = 10000
+PREDICTION_FILE_NAME: str = "predictions"
+PREDICTION_COLUMN_NAME: str = "predicted_column"
+
+
+# Micro batching related constant values starts with MICRO_BATCH
+
+MICRO_BATCH_MAX_BATCH_ROWS: int = 2048
+MICRO_BATCH_MAX_WAIT_MS: float = 5.0
+MICRO_BATCH_MAX_REQUEST_ROWS: int = 50
+
+
+# Executor related constant values starts with EXECUTOR
+
+EXECUTOR_INFERENCE_THREADS: int = os.cpu_count() or 1
+EXECUTOR_MAX_QUEUE_SIZE: int = 64
+
+
+# Payload format related constant values starts with PAYLOAD
+
+PAYLOAD_FORMAT_CSV: str = "csv"
+PAYLOAD_FORMAT_ARROW: str = "arrow"
+PAYLOAD_FORMAT_PARQUET: str = "parquet"
+PAYLOAD_FORMAT_NPY: str = "npy"
+PAYLOAD_FORMAT_NPZ: str = "npz"
+
+PAYLOAD_CONTENT_TYPES: dict = {
+    "text/csv": PAYLOAD_FORMAT_CSV,
+    "application/vnd.apache.arrow.stream": PAYLOAD_FORMAT_ARROW,
+    "application/vnd.apache.arrow.file": PAYLOAD_FORMAT_ARROW,
+    "application/vnd.apache.parquet": PAYLOAD_FORMAT_PARQUET,
+    "application/x-parquet": PAYLOAD_FORMAT_PARQUET,
+    "application/x-npy": PAYLOAD_FORMAT_NPY,
+    "application/x-npz": PAYLOAD_FORMAT_NPZ,
+}
+
+PAYLOAD_FILE_EXTENSIONS: dict = {
+    ".csv": PAYLOAD_FORMAT_CSV,
+    ".arrow": PAYLOAD_FORMAT_ARROW,
+    ".arrows": PAYLOAD_FORMAT_ARROW,
+    ".feather": PAYLOAD_FORMAT_ARROW,
+    ".parquet": PAYLOAD_FORMAT_PARQUET,
+    ".npy": PAYLOAD_FORMAT_NPY,
+    ".npz": PAYLOAD_FORMAT_NPZ,
+}
+
+PAYLOAD_MEDIA_TYPES: dict = {
+    PAYLOAD_FORMAT_CSV: "text/csv",
+    PAYLOAD_FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    PAYLOAD_FORMAT_PARQUET: "application/vnd.apache.parquet",
+    PAYLOAD_FORMAT_NPY: "application/x-npy",
+    PAYLOAD_FORMAT_NPZ: "application/x-npz",
+}
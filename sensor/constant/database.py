@@ -1,2 +1,12 @@
 DATABASE_NAME = "APS"
-COLLECTION_NAME = "sensor"
\ No newline at end of file
+COLLECTION_NAME = "sensor"
+# stamped with the server time by the incremental export the first time it sees a document
+INGESTED_AT_FIELD = "_ingested_at"
+
+# Bulk loader related constant values starts with BULK_LOAD
+
+BULK_LOAD_CHUNK_SIZE: int = 5000
+BULK_LOAD_WRITERS: int = 4
+BULK_LOAD_CHECKPOINT_DIR: str = "bulk_load_checkpoints"
+# error code of a write that hits an existing _id, a bulk load rewriting its own documents
+DUPLICATE_KEY_ERROR_CODE: int = 11000
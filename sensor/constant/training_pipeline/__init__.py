@@ -3,17 +3,25 @@ import os
 TARGET_COLUMN = 'class'
 PIPELINE_NAME = 'sensor'
 ARTIFACT_DIR = 'artifact'
-FILE_NAME = 'sensor.csv'
+FILE_NAME = 'sensor.feather'
 
 SAVED_MODEL_DIR = 'saved_models'
+TRAINING_JOB_DIR = 'training_jobs'
+FEATURE_STORE_DIR = 'feature_store'
+DRIFT_PROFILE_DIR = 'drift_profiles'
+HYPERPARAMETER_SEARCH_DIR = 'hyperparameter_search'
 
-TRAINING_DATA_FILE:str = 'train.csv'
-TESTING_DATA_FILE: str = 'test.csv'
+TRAINING_DATA_FILE:str = 'train.feather'
+TESTING_DATA_FILE: str = 'test.feather'
 
 PREPROCESSING_OBJECT_FILE_NAME = 'preprocessing.pkl'
 MODEL_FILE_NAME = 'model.pkl'
+MODEL_MANIFEST_FILE_NAME = 'manifest.yaml'
+MODEL_REGISTRY_FILE_NAME = 'registry.yaml'
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 SCHEMA_DROP_COLS = "drop_columns"
+# every non category schema column is held as float32, 'na' becomes NaN while reading
+FEATURE_DTYPE: str = 'float32'
 
 
 # data ingestion related constant values starts eith DATA_INGESTION
@@ -24,6 +32,17 @@ DATA_INGESTION_DIR_NAME: str = 'data_ingestion'
 DATA_INGESTION_FEATURE_STORE_DIR: str = 'feature_store'
 DATA_INGESTION_INGESTED_DIR: str = 'ingested'
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATION: float = 0.2
+DATA_INGESTION_EXPORT_BATCH_SIZE: int = 10000
+DATA_INGESTION_EXPORT_WORKERS: int = 4
+DATA_INGESTION_INCREMENTAL: bool = True
+DATA_INGESTION_WATERMARK_FILE_NAME: str = '_watermark.yaml'
+# documents stamped this long before the watermark are read again and deduplicated by _id
+DATA_INGESTION_WATERMARK_SAFETY_SECONDS: int = 300
+DATA_INGESTION_PARTITION_FILE_PREFIX: str = 'part'
+DATA_INGESTION_PARTITION_FILE_EXTENSION: str = '.feather'
+# number of values per row that were neither numbers nor 'na', validation quarantines those rows
+DATA_INGESTION_UNPARSEABLE_COLUMN: str = 'unparseable_values'
+DATA_INGESTION_ID_COLUMN: str = '_id'
 
 
 # Data Validation related constant values starts with DATA_VALIDATION
@@ -33,6 +52,23 @@ DATA_VALIDATION_VALID_DIR: str = 'valid'
 DATA_VALIDATION_INVALID_DIR: str = 'invalid'
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = 'drift_report'
 DATA_VALIDATION_DRIFT_REPORT_FILE: str = 'report.yaml'
+# column drift is decided by one of: ks (p-value below threshold), psi or js (value above threshold)
+DATA_VALIDATION_DRIFT_METHOD: str = 'ks'
+DATA_VALIDATION_DRIFT_THRESHOLDS: dict = {'ks': 0.05, 'psi': 0.2, 'js': 0.1}
+DATA_VALIDATION_DRIFT_BINS: int = 10
+DATA_VALIDATION_DRIFT_WORKERS: int = 1
+# sketch compares mergeable quantile sketches, exact compares the raw columns
+DATA_VALIDATION_DRIFT_ENGINE: str = 'sketch'
+# number of previous run profiles merged into the historical reference
+DATA_VALIDATION_PROFILE_WINDOW: int = 30
+DATA_VALIDATION_PROFILE_FILE_NAME: str = 'profile.npz'
+# marks the profile saved from a full export when no history exists yet
+DATA_VALIDATION_BASELINE_PROFILE_SUFFIX: str = 'baseline'
+DATA_VALIDATION_COLUMN_PROFILE_FILE_NAME: str = 'column_profile.yaml'
+# rows are checked against the schema in chunks, failing rows go to the invalid files with their reasons
+DATA_VALIDATION_CHUNK_ROWS: int = 50000
+DATA_VALIDATION_MAX_INVALID_RATIO: float = 0.1
+DATA_VALIDATION_INVALID_REASON_COLUMN: str = 'invalid_reason'
 
 
 # Data Transformation related constant values starts with DATA_TRANSFORMATION
@@ -40,6 +76,18 @@ DATA_VALIDATION_DRIFT_REPORT_FILE: str = 'report.yaml'
 DATA_TRANSFORMATION_DIR_NAME: str = 'data_transformation'
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = 'transformed_data'
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = 'transformed_object'
+DATA_TRANSFORMATION_IMPUTER_FILL_VALUE: float = 0
+# features and target are saved as separate contiguous arrays, the target file gets this suffix
+DATA_TRANSFORMATION_TARGET_FILE_SUFFIX: str = '_target'
+# smote_tomek | chunked_smote_tomek | approximate_smote_tomek | class_weight | none, only the train split is resampled
+DATA_TRANSFORMATION_RESAMPLING_STRATEGY: str = 'approximate_smote_tomek'
+DATA_TRANSFORMATION_RESAMPLING_WORKERS: int = -1
+DATA_TRANSFORMATION_RESAMPLING_CHUNK_MB: int = 64
+DATA_TRANSFORMATION_RANDOM_STATE: int = 42
+# in_memory fits on the loaded train split, streaming fits from a quantile sketch and transforms chunk by chunk
+DATA_TRANSFORMATION_FIT_MODE: str = 'in_memory'
+DATA_TRANSFORMATION_CHUNK_ROWS: int = 50000
+DATA_TRANSFORMATION_SKETCH_RELATIVE_ACCURACY: float = 0.005
 
 
 # Model Trainer related constant values starts with MODEL_TRAINER
@@ -49,6 +97,60 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = 'trained_model'
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = 'model.pkl'
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODER_TRAINER_UNDER_FITTING_OVER_FITTING_THRESHOLD: float = 0.05
+# successive halving over the search space, trials are kept in HYPERPARAMETER_SEARCH_DIR to resume a search
+MODEL_TRAINER_HYPERPARAMETER_SEARCH: bool = False
+MODEL_TRAINER_SEARCH_SPACE: dict = {
+    'max_depth': [3, 4, 6, 8],
+    'learning_rate': [0.05, 0.1, 0.2, 0.3],
+    'subsample': [0.7, 0.85, 1.0],
+    'colsample_bytree': [0.5, 0.75, 1.0],
+    'min_child_weight': [1, 5, 10],
+    'reg_lambda': [1.0, 5.0],
+}
+MODEL_TRAINER_SEARCH_TRIALS: int = 27
+MODEL_TRAINER_SEARCH_ETA: int = 3
+MODEL_TRAINER_SEARCH_MIN_ROUNDS: int = 25
+MODEL_TRAINER_SEARCH_MAX_ROUNDS: int = 225
+# 0 uses every available core, the threads per trial are the cores left per worker
+MODEL_TRAINER_SEARCH_WORKERS: int = 0
+MODEL_TRAINER_EARLY_STOPPING_ROUNDS: int = 20
+MODEL_TRAINER_VALIDATION_RATIO: float = 0.2
+MODEL_TRAINER_RANDOM_STATE: int = 42
+# in_memory quantises batches into a QuantileDMatrix, external_memory streams batches into an on disk DMatrix
+MODEL_TRAINER_TRAINING_MODE: str = 'in_memory'
+MODEL_TRAINER_NUM_BOOST_ROUND: int = 500
+MODEL_TRAINER_MAX_BIN: int = 256
+# 0 uses every available core
+MODEL_TRAINER_NTHREAD: int = 0
+MODEL_TRAINER_BATCH_ROWS: int = 100000
+MODEL_TRAINER_CACHE_DIR: str = 'xgboost_cache'
+MODEL_TRAINER_REPORT_FILE_NAME: str = 'training_report.yaml'
+# warm start from the production booster on the feature store partitions it has not seen,
+# continue adds boosting rounds, refresh only refits the leaf values of the existing trees
+MODEL_TRAINER_INCREMENTAL: bool = True
+MODEL_TRAINER_INCREMENTAL_STRATEGY: str = 'continue'
+MODEL_TRAINER_INCREMENTAL_ROUNDS: int = 50
+# incremental runs in a row before the next run retrains from scratch on the full history
+MODEL_TRAINER_MAX_INCREMENTAL_RUNS: int = 7
+# candidates trained side by side on a process pool, ranked by APS cost on a validation fold of the train split
+# and per row latency, the selected one is refitted on the whole train split.
+# tuned xgboost candidates take the parameters found by the hyperparameter search
+MODEL_TRAINER_MODEL_ZOO: bool = True
+MODEL_TRAINER_MODEL_ZOO_DIR: str = 'model_zoo'
+MODEL_TRAINER_MODEL_ZOO_REPORT_FILE_NAME: str = 'model_zoo_report.yaml'
+MODEL_TRAINER_CANDIDATES: list = [
+    {'name': 'xgboost_tuned', 'estimator': 'xgboost', 'params': {}, 'tuned': True},
+    {'name': 'xgboost_shallow', 'estimator': 'xgboost', 'params': {'max_depth': 3, 'learning_rate': 0.1}},
+    {'name': 'hist_gradient_boosting', 'estimator': 'hist_gradient_boosting',
+     'params': {'max_iter': 200, 'learning_rate': 0.1, 'early_stopping': True}},
+    {'name': 'logistic_regression', 'estimator': 'logistic_regression', 'params': {'C': 1.0, 'max_iter': 1000}},
+]
+# 0 uses every available core, the threads per candidate are the cores left per worker
+MODEL_TRAINER_MODEL_ZOO_WORKERS: int = 0
+MODEL_TRAINER_LATENCY_BUDGET_US: float = 100.0
+# APS challenge costs: a false alarm costs a check, a missed failure costs a breakdown
+MODEL_TRAINER_FALSE_POSITIVE_COST: float = 10
+MODEL_TRAINER_FALSE_NEGATIVE_COST: float = 500
 
 
 # Model Evaluation related constant values starts with MODEL_EVALUATION
@@ -61,4 +163,18 @@ MODEL_EVALUATION_REPORT_NAME: str = 'report.yaml'
 # Model Pusher related constant values starts with MODEL_PUSHER
 
 MODEL_PUSHER_DIR_NAME: str = 'model_pusher'
-MODEL_PUSHER_SAVED_MODEL_DIR: str = SAVED_MODEL_DIR
\ No newline at end of file
+MODEL_PUSHER_SAVED_MODEL_DIR: str = SAVED_MODEL_DIR
+
+
+# Training job related constant values starts with TRAINING_JOB
+
+TRAINING_JOB_LOCK_FILE_NAME: str = 'training.lock'
+TRAINING_JOB_STATUS_QUEUED: str = 'queued'
+TRAINING_JOB_STATUS_RUNNING: str = 'running'
+TRAINING_JOB_STATUS_SUCCEEDED: str = 'succeeded'
+TRAINING_JOB_STATUS_FAILED: str = 'failed'
+TRAINING_JOB_STATUS_REJECTED: str = 'rejected'
+TRAINING_PIPELINE_STAGES: list = [
+    'data_ingestion', 'data_validation', 'data_transformation',
+    'model_trainer', 'model_evaluation', 'model_pusher', 's3_sync'
+]
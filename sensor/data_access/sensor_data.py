@@ -1,12 +1,24 @@
+import math
+import os
 import sys
-from typing import Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-import json
+from pymongo.errors import BulkWriteError
 from sensor.configuration.mongo_db_connection import MongoDBClient
-from sensor.constant.database import DATABASE_NAME
+from sensor.constant.database import (BULK_LOAD_CHECKPOINT_DIR, BULK_LOAD_CHUNK_SIZE, BULK_LOAD_WRITERS, DATABASE_NAME,
+                                      DUPLICATE_KEY_ERROR_CODE, INGESTED_AT_FIELD)
+from sensor.constant.training_pipeline import (DATA_INGESTION_EXPORT_BATCH_SIZE, DATA_INGESTION_EXPORT_WORKERS,
+                                               DATA_INGESTION_ID_COLUMN, DATA_INGESTION_UNPARSEABLE_COLUMN,
+                                               DATA_INGESTION_WATERMARK_SAFETY_SECONDS, FEATURE_DTYPE,
+                                               SCHEMA_FILE_PATH)
 from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.utils.main_utils import get_file_hash, read_yaml_file, write_yaml_file
 
 
 class SensorData:
@@ -24,43 +36,450 @@ class SensorData:
             raise SensorException(f"Error while connecting to MongoDB: {str(e)}", sys)
         
     
-    def export_csv_as_collection(self, file_path, collection_name, database_name : Optional [str] = None):
+    def get_checkpoint_file_path(self, file_path, collection_name, database_name : Optional [str] = None) -> str:
+        database_name = database_name or self.mongo_client.database_name
+        file_name = os.path.basename(file_path)
+        return os.path.join(BULK_LOAD_CHECKPOINT_DIR, f"{database_name}.{collection_name}.{file_name}.yaml")
+
+
+    @staticmethod
+    def get_source_key(file_hash: str) -> str:
+        """
+        This method is responsible for a short key of the csv file from the sha256 of its content,
+        it prefixes the _id of every document loaded from it, so a changed file never reuses the ids of another one
+        """
+        return file_hash[:16]
+
+
+    @staticmethod
+    def chunk_to_documents(chunk: pd.DataFrame, source_key: str) -> List[dict]:
+        """
+        This method is responsible for turning a csv chunk into documents without a json round trip,
+        missing values are stored with the 'na' sentinel used by the source data.
+        The _id is the source key and the row number in the file, so writing a chunk again cannot duplicate it.
         """
-        This method is responsible for export data from CSV file to mongoDB
+        documents = chunk.astype(object).where(chunk.notna(), 'na').to_dict(orient='records')
+        for row_number, document in zip(chunk.index, documents):
+            document["_id"] = f"{source_key}-{row_number:012d}"
+        return documents
+
+
+    def export_csv_as_collection(self, file_path, collection_name, database_name : Optional [str] = None,
+                                 chunk_size: int = BULK_LOAD_CHUNK_SIZE, n_writers: int = BULK_LOAD_WRITERS,
+                                 resume: bool = True):
+        """
+        This method is responsible for export data from CSV file to mongoDB.
+        The file is streamed in chunks that are written by n_writers concurrent unordered insert_many calls.
+        Committed chunk numbers are checkpointed, so a rerun with resume=True skips them;
+        chunks that were in flight when a run died are written again and their stored rows are kept once
+        as every document has a deterministic _id.
         """
         try: 
-            df = pd.read_csv(file_path)
-            df.reset_index(inplace=True, drop=True)
-            records = list(json.loads(df.T.to_json()).values())
+            collection = self.get_collection(collection_name, database_name)
+            checkpoint_file_path = self.get_checkpoint_file_path(file_path, collection_name, database_name)
+            file_hash = get_file_hash(file_path)
+            source = {"file_path": os.path.abspath(file_path), "file_size": os.path.getsize(file_path),
+                      "file_hash": file_hash, "chunk_size": chunk_size}
+            source_key = self.get_source_key(file_hash)
+
+            committed_chunks = set()
+            if resume and os.path.exists(checkpoint_file_path):
+                checkpoint = read_yaml_file(checkpoint_file_path)
+                if checkpoint.get("source") == source:
+                    committed_chunks = set(checkpoint.get("committed_chunks", []))
+                    logging.info(f"Resuming bulk load, skipping {len(committed_chunks)} committed chunks")
+
+            def write_chunk(documents: List[dict]) -> int:
+                try:
+                    collection.insert_many(documents, ordered=False)
+                except BulkWriteError as e:
+                    # rows already stored by a run that died with this chunk in flight
+                    write_errors = e.details.get("writeErrors", [])
+                    if e.details.get("writeConcernErrors") or any(
+                            error.get("code") != DUPLICATE_KEY_ERROR_CODE for error in write_errors):
+                        raise
+                    logging.info(f"Skipped {len(write_errors)} rows that were already loaded")
+                return len(documents)
+
+            inserted = 0
+            errors = []
+            pending = {}
+
+            def collect(done) -> None:
+                nonlocal inserted
+                for future in done:
+                    chunk_number = pending.pop(future)
+                    try:
+                        inserted += future.result()
+                        committed_chunks.add(chunk_number)
+                    except Exception as e:
+                        errors.append(e)
+                write_yaml_file(checkpoint_file_path,
+                                {"source": source, "committed_chunks": sorted(committed_chunks)}, atomic=True)
+
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n_writers, thread_name_prefix="bulk-load") as executor:
+                reader = pd.read_csv(file_path, chunksize=chunk_size, na_values=['na'])
+                for chunk_number, chunk in enumerate(reader):
+                    if chunk_number in committed_chunks:
+                        continue
+
+                    # keep at most two chunks per writer in memory
+                    while len(pending) >= 2 * n_writers:
+                        collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                    if errors:
+                        break
+
+                    pending[executor.submit(write_chunk, self.chunk_to_documents(chunk, source_key))] = chunk_number
+
+                # chunks already handed to writers are still checkpointed when another chunk failed
+                while pending:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+
+            if errors:
+                raise errors[0]
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(f"Loaded {inserted} rows from {file_path} into {collection_name} "
+                         f"in {elapsed:.2f}s ({inserted / max(elapsed, 1e-9):.0f} rows/sec)")
+            return inserted
 
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client.client[database_name][collection_name]
-            collection.insert_many(records) 
-            return len(records)
         except Exception as e:
             raise SensorException(f"Error while exporting data to MongoDB: {str(e)}", sys)
-    
 
-    def export_collection_as_dataframe(self, collection_name, database_name : Optional [str] = None)-> pd.DataFrame:
+
+    def get_collection(self, collection_name, database_name : Optional [str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+
+    @staticmethod
+    def get_projection(drop_columns: Optional[List[str]] = None) -> dict:
         """
-        This method is responsible for exporting entire MongoDB data to pandas DataFrame
+        This method is responsible for excluding the ingestion stamp and the schema drop columns on the server side,
+        _id is kept so exported rows can be deduplicated by it
         """
-        try:
-            if database_name is None:
-                collection = self.mongo_client.database[collection_name]
-            else:
-                collection = self.mongo_client.client[database_name][collection_name]
-            cursor = collection.find()
-            df = pd.DataFrame(list(cursor))
+        projection = {INGESTED_AT_FIELD: 0}
+        for column in drop_columns or []:
+            projection[column] = 0
+        return projection
 
-            if '_id' in df.columns:
-                df.drop(columns=['_id'], inplace=True)
 
-            df.replace({'na': np.nan}, inplace=True)
+    @staticmethod
+    def batch_to_columns(batch: List[dict], columns: List[str], categorical_columns: List[str]) -> dict:
+        """
+        This method is responsible for converting a batch of documents into typed column arrays.
+        Missing values and the 'na' sentinel become NaN, any other value that is not a number is counted
+        per row under DATA_INGESTION_UNPARSEABLE_COLUMN instead of being imputed silently. _id is kept as text.
+        """
+        frame = pd.DataFrame.from_records(batch, columns=columns)
+        values = {}
+        unparseable = np.zeros(len(frame), dtype=np.int32)
+        for column in columns:
+            if column == DATA_INGESTION_ID_COLUMN:
+                values[column] = frame[column].astype(str).to_numpy(dtype=object)
+                continue
+            if column in categorical_columns:
+                values[column] = frame[column].to_numpy(dtype=object)
+                continue
+
+            parsed = pd.to_numeric(frame[column], errors='coerce')
+            coerced = parsed.isna().to_numpy()
+            if coerced.any():
+                missing = (frame[column].isna() | (frame[column] == 'na')).to_numpy(dtype=bool)
+                unparseable += coerced & ~missing
+            values[column] = parsed.to_numpy(dtype=FEATURE_DTYPE)
+        values[DATA_INGESTION_UNPARSEABLE_COLUMN] = unparseable
+        return values
+
+
+    def iter_collection_batches(self, collection_name, database_name : Optional [str] = None,
+                                batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                drop_columns: Optional[List[str]] = None,
+                                query: Optional[dict] = None, sort_by_id: bool = False) -> Iterator[List[dict]]:
+        """
+        This method is responsible for iterating the collection cursor in lists of batch_size documents
+        """
+        collection = self.get_collection(collection_name, database_name)
+        cursor = collection.find(query or {}, projection=self.get_projection(drop_columns), batch_size=batch_size)
+        if sort_by_id:
+            cursor = cursor.sort("_id", 1)
+
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+    def export_query_as_columns(self, collection_name, database_name : Optional [str] = None,
+                                batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                drop_columns: Optional[List[str]] = None, query: Optional[dict] = None,
+                                sort_by_id: bool = False) -> Tuple[List[str], dict]:
+        """
+        This method is responsible for streaming the documents matching query into preallocated typed column buffers,
+        the returned columns end with DATA_INGESTION_UNPARSEABLE_COLUMN
+        """
+        categorical_columns = self.get_categorical_columns()
+        text_columns = categorical_columns + [DATA_INGESTION_ID_COLUMN]
+        collection = self.get_collection(collection_name, database_name)
+        n_rows = collection.count_documents(query or {})
+
+        columns: List[str] = []
+        buffers = {}
+        row = 0
 
+        for batch in self.iter_collection_batches(collection_name, database_name, batch_size, drop_columns,
+                                                  query=query, sort_by_id=sort_by_id):
+            if not columns:
+                columns = list(batch[0].keys())
+                buffers = {
+                    column: np.empty(n_rows, dtype=object if column in text_columns else FEATURE_DTYPE)
+                    for column in columns
+                }
+                buffers[DATA_INGESTION_UNPARSEABLE_COLUMN] = np.empty(n_rows, dtype=np.int32)
+                columns.append(DATA_INGESTION_UNPARSEABLE_COLUMN)
+
+            if row + len(batch) > n_rows:
+                # documents inserted while exporting
+                n_rows = row + len(batch)
+                for column in columns:
+                    buffers[column] = np.resize(buffers[column], n_rows)
+
+            for column, values in self.batch_to_columns(batch, columns[:-1], categorical_columns).items():
+                buffers[column][row:row + len(batch)] = values
+            row += len(batch)
+
+        if columns:
+            n_unparseable = int(np.count_nonzero(buffers[DATA_INGESTION_UNPARSEABLE_COLUMN][:row]))
+            if n_unparseable > 0:
+                logging.warning(f"{n_unparseable} of {row} documents hold values that are not numbers, "
+                                "they are kept for validation to quarantine")
+        return columns, {column: buffers[column][:row] for column in columns}
+
+
+    def export_collection_as_dataframe(self, collection_name, database_name : Optional [str] = None,
+                                       batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                       drop_columns: Optional[List[str]] = None)-> pd.DataFrame:
+        """
+        This method is responsible for exporting entire MongoDB data to pandas DataFrame.
+        Documents are streamed in batches into preallocated typed column buffers,
+        so memory stays close to the size of the final frame.
+        """
+        try:
+            start_time = time.perf_counter()
+            columns, values = self.export_query_as_columns(collection_name, database_name, batch_size, drop_columns)
+            df = pd.DataFrame(values, columns=columns)
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(f"Exported {len(df)} documents from collection: {collection_name} "
+                         f"in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/sec)")
             return df
         
         except Exception as e:
-            raise SensorException(f"Error while exporting data to DataFrame: {str(e)}", sys)
\ No newline at end of file
+            raise SensorException(f"Error while exporting data to DataFrame: {str(e)}", sys)
+
+
+    def get_id_partitions(self, collection_name, database_name : Optional [str] = None,
+                          n_partitions: int = DATA_INGESTION_EXPORT_WORKERS, query: Optional[dict] = None) -> List[dict]:
+        """
+        This method is responsible for splitting the documents matching query into contiguous _id ranges
+        of similar size. The last range is closed at the largest _id seen now, so documents inserted
+        during the export are left out.
+        """
+        try:
+            query = query or {}
+            collection = self.get_collection(collection_name, database_name)
+            n_rows = collection.count_documents(query)
+            if n_rows == 0:
+                return []
+
+            step = math.ceil(n_rows / n_partitions)
+            boundaries = []
+            for k in range(1, n_partitions):
+                if k * step >= n_rows:
+                    break
+                document = next(collection.find(query, {"_id": 1}).sort("_id", 1).skip(k * step).limit(1))
+                boundaries.append(document["_id"])
+            last_id = next(collection.find(query, {"_id": 1}).sort("_id", -1).limit(1))["_id"]
+
+            lower_bounds = [None] + boundaries
+            upper_bounds = boundaries + [None]
+            queries = []
+            for lower, upper in zip(lower_bounds, upper_bounds):
+                id_filter = {"$lt": upper} if upper is not None else {"$lte": last_id}
+                if lower is not None:
+                    id_filter["$gte"] = lower
+                queries.append({**query, "_id": id_filter})
+            return queries
+
+        except Exception as e:
+            raise SensorException(f"Error while partitioning collection: {str(e)}", sys)
+
+
+    def export_collection_as_dataframe_parallel(self, collection_name, database_name : Optional [str] = None,
+                                                n_workers: int = DATA_INGESTION_EXPORT_WORKERS,
+                                                batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                                drop_columns: Optional[List[str]] = None,
+                                                query: Optional[dict] = None) -> pd.DataFrame:
+        """
+        This method is responsible for exporting _id range partitions of the documents matching query
+        concurrently over the pooled client.
+        Partitions are merged in _id order, so the result does not depend on which worker finished first.
+        """
+        try:
+            start_time = time.perf_counter()
+            queries = self.get_id_partitions(collection_name, database_name, n_partitions=n_workers, query=query)
+            if len(queries) == 0:
+                return pd.DataFrame()
+
+            with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="export") as executor:
+                partitions = list(executor.map(
+                    lambda query: self.export_query_as_columns(collection_name, database_name, batch_size,
+                                                               drop_columns, query=query, sort_by_id=True),
+                    queries
+                ))
+
+            columns = next((columns for columns, _ in partitions if columns), [])
+            df = pd.DataFrame({
+                column: np.concatenate([values[column] for _, values in partitions if len(values)])
+                for column in columns
+            }, columns=columns)
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(f"Exported {len(df)} documents from collection: {collection_name} with {len(queries)} "
+                         f"partitions in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/sec)")
+            return df
+
+        except Exception as e:
+            raise SensorException(f"Error while exporting partitioned data to DataFrame: {str(e)}", sys)
+
+
+    def stamp_new_documents(self, collection_name, database_name : Optional [str] = None) -> int:
+        """
+        This method is responsible for stamping every document without INGESTED_AT_FIELD with the server time,
+        whichever client wrote it. The first run stamps the whole collection once.
+        """
+        collection = self.get_collection(collection_name, database_name)
+        collection.create_index(INGESTED_AT_FIELD)
+        result = collection.update_many({INGESTED_AT_FIELD: {"$exists": False}},
+                                        {"$currentDate": {INGESTED_AT_FIELD: True}})
+        return result.modified_count
+
+
+    def get_max_ingested_at(self, collection_name, database_name : Optional [str] = None) -> Optional[datetime]:
+        """
+        This method is responsible for returning the newest ingestion stamp, None when nothing is stamped
+        """
+        collection = self.get_collection(collection_name, database_name)
+        document = next(collection.find({INGESTED_AT_FIELD: {"$exists": True}}, {INGESTED_AT_FIELD: 1})
+                        .sort(INGESTED_AT_FIELD, -1).limit(1), None)
+        return None if document is None else document[INGESTED_AT_FIELD]
+
+
+    @staticmethod
+    def encode_watermark(ingested_at: Optional[datetime]) -> Optional[dict]:
+        if ingested_at is None:
+            return None
+        return {"last_ingested_at": ingested_at.isoformat()}
+
+
+    @staticmethod
+    def decode_watermark(watermark: Optional[dict]) -> Optional[datetime]:
+        if not watermark or watermark.get("last_ingested_at") is None:
+            return None
+        return datetime.fromisoformat(watermark["last_ingested_at"])
+
+
+    def export_delta_as_dataframe(self, collection_name, last_ingested_at: Optional[datetime] = None,
+                                  exported_ids: Optional[set] = None, database_name : Optional [str] = None,
+                                  n_workers: int = DATA_INGESTION_EXPORT_WORKERS,
+                                  batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                  drop_columns: Optional[List[str]] = None,
+                                  safety_seconds: int = DATA_INGESTION_WATERMARK_SAFETY_SECONDS
+                                  ) -> Tuple[pd.DataFrame, Optional[datetime]]:
+        """
+        This method is responsible for exporting only the documents stamped after last_ingested_at.
+        New documents are stamped with the server time first and the newest stamp is returned as the next
+        watermark, documents inserted after stamping are not stamped yet and go to the next run.
+        Stamps up to safety_seconds older than the watermark are read again and the rows whose _id is
+        in exported_ids dropped, a document stamped behind the watermark (after a primary with a slower
+        clock took over) is not skipped. Without a watermark the whole collection is exported,
+        over n_workers _id range partitions when n_workers > 1.
+        Updates and deletes of already exported documents are not tracked.
+        """
+        try:
+            start_time = time.perf_counter()
+            n_stamped = self.stamp_new_documents(collection_name, database_name)
+            max_ingested_at = self.get_max_ingested_at(collection_name, database_name)
+            if max_ingested_at is None:
+                logging.info(f"No documents in collection: {collection_name}")
+                return pd.DataFrame(), last_ingested_at
+
+            # a document stamped by a concurrent export after max_ingested_at was read is exported now
+            # and deduplicated by the next run, it falls within its safety window
+            ingested_at_filter = {"$exists": True}
+            if last_ingested_at is not None:
+                ingested_at_filter = {"$gt": last_ingested_at - timedelta(seconds=safety_seconds)}
+                max_ingested_at = max(max_ingested_at, last_ingested_at)
+            query = {INGESTED_AT_FIELD: ingested_at_filter}
+
+            if n_workers > 1:
+                df = self.export_collection_as_dataframe_parallel(collection_name, database_name, n_workers,
+                                                                  batch_size, drop_columns, query=query)
+            else:
+                columns, values = self.export_query_as_columns(collection_name, database_name, batch_size,
+                                                               drop_columns, query=query, sort_by_id=True)
+                df = pd.DataFrame(values, columns=columns)
+
+            if exported_ids and len(df) > 0:
+                df = df[~df[DATA_INGESTION_ID_COLUMN].isin(exported_ids)].reset_index(drop=True)
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(f"Exported {len(df)} new documents ({n_stamped} stamped in this run) from collection: "
+                         f"{collection_name} in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/sec)")
+            return df, max_ingested_at
+
+        except Exception as e:
+            raise SensorException(f"Error while exporting new documents to DataFrame: {str(e)}", sys)
+
+
+    def export_collection_to_csv(self, collection_name, file_path: str, database_name : Optional [str] = None,
+                                 batch_size: int = DATA_INGESTION_EXPORT_BATCH_SIZE,
+                                 drop_columns: Optional[List[str]] = None) -> int:
+        """
+        This method is responsible for writing the collection straight to a csv file batch by batch,
+        only one batch is held in memory at a time
+        """
+        try:
+            categorical_columns = self.get_categorical_columns()
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            columns: List[str] = []
+            rows = 0
+            with open(file_path, 'w', newline='') as file:
+                for batch in self.iter_collection_batches(collection_name, database_name, batch_size, drop_columns):
+                    if not columns:
+                        columns = list(batch[0].keys())
+                    frame = pd.DataFrame(self.batch_to_columns(batch, columns, categorical_columns),
+                                         columns=columns + [DATA_INGESTION_UNPARSEABLE_COLUMN])
+                    frame.to_csv(file, index=False, header=(rows == 0))
+                    rows += len(batch)
+
+            logging.info(f"Exported {rows} documents from collection: {collection_name} to {file_path}")
+            return rows
+
+        except Exception as e:
+            raise SensorException(f"Error while exporting data to csv: {str(e)}", sys)
+
+
+    def get_categorical_columns(self) -> List[str]:
+        """
+        This method is responsible for listing the schema columns that are not numeric
+        """
+        schema = read_yaml_file(SCHEMA_FILE_PATH)
+        return [list(data.keys())[0] for data in schema.get('columns', []) if list(data.values())[0] == 'category']
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
     train_data_file_path: str
     test_data_file_path: str
+    delta_file_path: Optional[str] = None
     
 
 @dataclass
@@ -14,6 +16,7 @@ class DataValidationArtifact:
     invalid_train_file_path: str
     invalid_test_file_path: str
     drift_report_file_path: str
+    column_profile_file_path: Optional[str] = None
 
 
 @dataclass
@@ -21,6 +24,9 @@ class DataTransformationArtifact:
     transformed_train_file_path: str
     transformed_test_file_path: str
     transformed_object_file_path: str
+    resampling_strategy: Optional[str] = None
+    transformed_train_target_file_path: Optional[str] = None
+    transformed_test_target_file_path: Optional[str] = None
 
 @dataclass
 class ClassificationMetricArtifact:
@@ -34,6 +40,8 @@ class ModelTrainerArtifact:
     trained_model_file_path: str
     train_metric_artifact: ClassificationMetricArtifact
     test_metric_artifact: ClassificationMetricArtifact
+    training_report_file_path: Optional[str] = None
+    model_zoo_report_file_path: Optional[str] = None
 
 
 @dataclass
@@ -44,11 +52,14 @@ class ModelEvaluationArtifact:
     trained_model_path: str
     train_model_metric_artifact: ClassificationMetricArtifact
     best_model_metric_artifact: ClassificationMetricArtifact
+    training_report_file_path: Optional[str] = None
 
 
 @dataclass
 class ModelPusherArtifact:
     saved_model_path:str   
     model_file_path:str
+    model_version:str
+    manifest_file_path:str
 
     
\ No newline at end of file
@@ -21,7 +21,7 @@ class DataIngestionConfig:
             training_pipeline_config.artifact_dir, training_pipeline.DATA_INGESTION_DIR_NAME
         )
 
-        # data file path (feature store -> sensor.csv)
+        # data file path (feature store -> sensor.feather)
         self.feature_store_file_path: str = os.path.join(
             self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
         )
@@ -36,6 +36,18 @@ class DataIngestionConfig:
         
         self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        self.export_batch_size: int = training_pipeline.DATA_INGESTION_EXPORT_BATCH_SIZE
+        self.export_workers: int = training_pipeline.DATA_INGESTION_EXPORT_WORKERS
+
+        # persistent feature store shared by all runs (feature_store/<collection>/part-*.feather)
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.feature_store_dir: str = os.path.join(
+            training_pipeline.FEATURE_STORE_DIR, self.collection_name
+        )
+        self.watermark_file_path: str = os.path.join(
+            self.feature_store_dir, training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
+        )
+        self.watermark_safety_seconds: int = training_pipeline.DATA_INGESTION_WATERMARK_SAFETY_SECONDS
 
 
 class DataValidationConfig:
@@ -79,6 +91,30 @@ class DataValidationConfig:
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE
         )
 
+        self.drift_method: str = training_pipeline.DATA_VALIDATION_DRIFT_METHOD
+        self.drift_threshold: float = training_pipeline.DATA_VALIDATION_DRIFT_THRESHOLDS[self.drift_method]
+        self.drift_bins: int = training_pipeline.DATA_VALIDATION_DRIFT_BINS
+        self.drift_workers: int = training_pipeline.DATA_VALIDATION_DRIFT_WORKERS
+        self.drift_engine: str = training_pipeline.DATA_VALIDATION_DRIFT_ENGINE
+        self.chunk_rows: int = training_pipeline.DATA_VALIDATION_CHUNK_ROWS
+        self.max_invalid_ratio: float = training_pipeline.DATA_VALIDATION_MAX_INVALID_RATIO
+
+        # one pass summary of the train split reused by transformation and evaluation
+        self.column_profile_file_path: str = os.path.join(
+            self.data_validation_dir, training_pipeline.DATA_VALIDATION_COLUMN_PROFILE_FILE_NAME
+        )
+
+        # sketch of the data new in this run, kept with the run and in the persistent profile store
+        self.profile_file_path: str = os.path.join(
+            self.drift_report_dir, training_pipeline.DATA_VALIDATION_PROFILE_FILE_NAME
+        )
+        self.profile_dir: str = training_pipeline.DRIFT_PROFILE_DIR
+        self.profile_window: int = training_pipeline.DATA_VALIDATION_PROFILE_WINDOW
+        run_time = datetime.strptime(training_pipeline_config.timestamp, "%m_%d_%Y_%H_%M_%S")
+        self.history_profile_file_path: str = os.path.join(
+            self.profile_dir, f"{run_time.strftime('%Y_%m_%d_%H_%M_%S')}.npz"
+        )
+
         self.schema_file_path: str = training_pipeline.SCHEMA_FILE_PATH
         self.drop_columns: list = training_pipeline.SCHEMA_DROP_COLS
 
@@ -100,17 +136,37 @@ class DataTransformationConfig:
         )
 
         self.transformed_train_file_path: str = os.path.join(
-            self.transformed_data_dir, training_pipeline.TRAINING_DATA_FILE.replace("csv", "npy")
+            self.transformed_data_dir, training_pipeline.TRAINING_DATA_FILE.replace("feather", "npy")
         )
 
         self.transformed_test_file_path: str = os.path.join(
-            self.transformed_data_dir, training_pipeline.TESTING_DATA_FILE.replace("csv", "npy")
+            self.transformed_data_dir, training_pipeline.TESTING_DATA_FILE.replace("feather", "npy")
+        )
+
+        self.transformed_train_target_file_path: str = os.path.join(
+            self.transformed_data_dir, training_pipeline.TRAINING_DATA_FILE.replace(
+                ".feather", f"{training_pipeline.DATA_TRANSFORMATION_TARGET_FILE_SUFFIX}.npy"
+            )
+        )
+
+        self.transformed_test_target_file_path: str = os.path.join(
+            self.transformed_data_dir, training_pipeline.TESTING_DATA_FILE.replace(
+                ".feather", f"{training_pipeline.DATA_TRANSFORMATION_TARGET_FILE_SUFFIX}.npy"
+            )
         )
 
         self.transformed_object_file_path: str = os.path.join(
             self.transformed_object_dir, training_pipeline.PREPROCESSING_OBJECT_FILE_NAME
         )
 
+        self.resampling_strategy: str = training_pipeline.DATA_TRANSFORMATION_RESAMPLING_STRATEGY
+        self.resampling_workers: int = training_pipeline.DATA_TRANSFORMATION_RESAMPLING_WORKERS
+        self.resampling_chunk_mb: int = training_pipeline.DATA_TRANSFORMATION_RESAMPLING_CHUNK_MB
+        self.random_state: int = training_pipeline.DATA_TRANSFORMATION_RANDOM_STATE
+        self.fit_mode: str = training_pipeline.DATA_TRANSFORMATION_FIT_MODE
+        self.chunk_rows: int = training_pipeline.DATA_TRANSFORMATION_CHUNK_ROWS
+        self.sketch_relative_accuracy: float = training_pipeline.DATA_TRANSFORMATION_SKETCH_RELATIVE_ACCURACY
+
 
 class ModelTrainerConfig:
 
@@ -131,6 +187,51 @@ class ModelTrainerConfig:
         self.expected_accuracy: float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
         self.overfitting_underfitting_threshold: float = training_pipeline.MODER_TRAINER_UNDER_FITTING_OVER_FITTING_THRESHOLD
 
+        self.hyperparameter_search: bool = training_pipeline.MODEL_TRAINER_HYPERPARAMETER_SEARCH
+        self.search_dir: str = training_pipeline.HYPERPARAMETER_SEARCH_DIR
+        self.search_space: dict = training_pipeline.MODEL_TRAINER_SEARCH_SPACE
+        self.search_trials: int = training_pipeline.MODEL_TRAINER_SEARCH_TRIALS
+        self.search_eta: int = training_pipeline.MODEL_TRAINER_SEARCH_ETA
+        self.search_min_rounds: int = training_pipeline.MODEL_TRAINER_SEARCH_MIN_ROUNDS
+        self.search_max_rounds: int = training_pipeline.MODEL_TRAINER_SEARCH_MAX_ROUNDS
+        self.search_workers: int = training_pipeline.MODEL_TRAINER_SEARCH_WORKERS
+        self.early_stopping_rounds: int = training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
+        self.validation_ratio: float = training_pipeline.MODEL_TRAINER_VALIDATION_RATIO
+        self.random_state: int = training_pipeline.MODEL_TRAINER_RANDOM_STATE
+
+        self.training_mode: str = training_pipeline.MODEL_TRAINER_TRAINING_MODE
+        self.num_boost_round: int = training_pipeline.MODEL_TRAINER_NUM_BOOST_ROUND
+        self.max_bin: int = training_pipeline.MODEL_TRAINER_MAX_BIN
+        self.nthread: int = training_pipeline.MODEL_TRAINER_NTHREAD
+        self.batch_rows: int = training_pipeline.MODEL_TRAINER_BATCH_ROWS
+        self.cache_dir: str = os.path.join(self.model_trainer_dir, training_pipeline.MODEL_TRAINER_CACHE_DIR)
+        self.training_report_file_path: str = os.path.join(
+            self.model_trainer_dir, training_pipeline.MODEL_TRAINER_REPORT_FILE_NAME
+        )
+
+        self.incremental: bool = training_pipeline.MODEL_TRAINER_INCREMENTAL
+        self.incremental_strategy: str = training_pipeline.MODEL_TRAINER_INCREMENTAL_STRATEGY
+        self.incremental_rounds: int = training_pipeline.MODEL_TRAINER_INCREMENTAL_ROUNDS
+        self.max_incremental_runs: int = training_pipeline.MODEL_TRAINER_MAX_INCREMENTAL_RUNS
+        self.feature_store_dir: str = os.path.join(
+            training_pipeline.FEATURE_STORE_DIR, training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        )
+        self.watermark_file_path: str = os.path.join(
+            self.feature_store_dir, training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
+        )
+        self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
+
+        self.model_zoo: bool = training_pipeline.MODEL_TRAINER_MODEL_ZOO
+        self.model_zoo_dir: str = os.path.join(self.model_trainer_dir, training_pipeline.MODEL_TRAINER_MODEL_ZOO_DIR)
+        self.model_zoo_report_file_path: str = os.path.join(
+            self.model_trainer_dir, training_pipeline.MODEL_TRAINER_MODEL_ZOO_REPORT_FILE_NAME
+        )
+        self.candidates: list = training_pipeline.MODEL_TRAINER_CANDIDATES
+        self.model_zoo_workers: int = training_pipeline.MODEL_TRAINER_MODEL_ZOO_WORKERS
+        self.latency_budget_us: float = training_pipeline.MODEL_TRAINER_LATENCY_BUDGET_US
+        self.false_positive_cost: float = training_pipeline.MODEL_TRAINER_FALSE_POSITIVE_COST
+        self.false_negative_cost: float = training_pipeline.MODEL_TRAINER_FALSE_NEGATIVE_COST
+
 
 class ModelEvaluationConfig:
 
@@ -160,13 +261,24 @@ class ModelPusherConfig:
         ) 
 
         timestamp = round(datetime.now().timestamp())
+
+        self.model_version: str = f"{timestamp}"
+
+        self.saved_model_dir: str = os.path.join(
+            training_pipeline.SAVED_MODEL_DIR,
+            self.model_version
+        )
         
         self.saved_model_path: str = os.path.join(
-            training_pipeline.SAVED_MODEL_DIR,
-            f"{timestamp}",
+            self.saved_model_dir,
             training_pipeline.MODEL_FILE_NAME
         )
 
+        self.saved_manifest_file_path: str = os.path.join(
+            self.saved_model_dir,
+            training_pipeline.MODEL_MANIFEST_FILE_NAME
+        )
+
 
 
   
\ No newline at end of file
@@ -2,6 +2,7 @@ from sensor.entity.artifact_entity import ClassificationMetricArtifact
 from sensor.exception import SensorException
 from sklearn.metrics import f1_score,precision_score,recall_score
 import os,sys
+import numpy as np
 
 def get_classification_score(y_true,y_pred)->ClassificationMetricArtifact:
     try:
@@ -15,4 +16,19 @@ def get_classification_score(y_true,y_pred)->ClassificationMetricArtifact:
         return classsification_metric
     
     except Exception as e:
-        raise SensorException(f"Error while calculating classification score: {str(e)}", sys)
\ No newline at end of file
+        raise SensorException(f"Error while calculating classification score: {str(e)}", sys)
+
+def get_misclassification_cost(y_true, y_pred, false_positive_cost: float = 10, false_negative_cost: float = 500) -> float:
+    """
+    This function is responsible for the APS misclassification cost, a missed failure (false negative)
+    costs a breakdown while a false alarm (false positive) only costs an unnecessary check
+    """
+    try:
+        y_true = np.asarray(y_true)
+        y_pred = np.asarray(y_pred)
+        false_positives = int(np.sum((y_pred == 1) & (y_true == 0)))
+        false_negatives = int(np.sum((y_pred == 0) & (y_true == 1)))
+        return float(false_positive_cost * false_positives + false_negative_cost * false_negatives)
+
+    except Exception as e:
+        raise SensorException(f"Error while calculating misclassification cost: {str(e)}", sys)
@@ -0,0 +1,126 @@
+import sys
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sensor.exception import SensorException
+
+PROFILE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+# RobustScaler's default quantile_range
+PROFILE_SCALER_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def sorted_quantiles(sorted_values: np.ndarray, n_valid: np.ndarray, q: List[float],
+                     fill_value: Optional[float] = None) -> np.ndarray:
+    """
+    This function is responsible for linear quantiles (as np.nanpercentile) of every row of a
+    (columns, rows) array sorted with NaN last. With fill_value the missing values are counted as
+    fill_value instead of being skipped, which gives the quantiles of the imputed column without imputing it.
+    """
+    n_columns, n_rows = sorted_values.shape
+    n_missing = n_rows - n_valid if fill_value is not None else np.zeros_like(n_valid)
+    n_total = n_valid + n_missing
+
+    if fill_value is not None:
+        # position the block of fill values would take in each sorted row
+        insert_at = np.sum(sorted_values < fill_value, axis=1)
+    else:
+        insert_at = n_valid
+
+    position = np.asarray(q, dtype=np.float64)[None, :] * np.maximum(n_total - 1, 0)[:, None]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(n_total - 1, 0)[:, None])
+
+    def value_at(rank: np.ndarray) -> np.ndarray:
+        in_fill = (rank >= insert_at[:, None]) & (rank < (insert_at + n_missing)[:, None])
+        index = np.where(rank >= (insert_at + n_missing)[:, None], rank - n_missing[:, None], rank)
+        values = np.take_along_axis(sorted_values, np.clip(index, 0, max(n_rows - 1, 0)), axis=1).astype(np.float64)
+        return np.where(in_fill, fill_value if fill_value is not None else np.nan, values)
+
+    lower_values = value_at(lower)
+    upper_values = value_at(upper)
+    quantiles = lower_values + (upper_values - lower_values) * (position - lower)
+    quantiles[n_total == 0] = np.nan
+    return quantiles.T
+
+
+def profile_dataframe(df: pd.DataFrame, fill_value: float = 0.0) -> dict:
+    """
+    This function is responsible for profiling every column of df in one vectorised pass.
+    Numeric columns are sorted once (as float32, NaN last) and null ratio, min/max, mean, variance,
+    distinct count, zero fraction and quantiles are all read from that sort. scaler_quantiles are the
+    quantiles after imputing missing values with fill_value, what the RobustScaler is fitted on.
+    Other columns get null ratio, distinct count and value counts.
+    """
+    try:
+        n_rows = len(df)
+        numeric_columns = [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])]
+        other_columns = [column for column in df.columns if column not in numeric_columns]
+
+        values = np.ascontiguousarray(df[numeric_columns].to_numpy(dtype=np.float32).T)
+        sorted_values = np.sort(values, axis=1)
+        n_valid = np.sum(~np.isnan(sorted_values), axis=1)
+        last_valid = np.maximum(n_valid - 1, 0)[:, None]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total = np.nansum(values, axis=1, dtype=np.float64)
+            mean = total / n_valid
+            variance = np.nansum((values - mean[:, None].astype(np.float32)) ** 2, axis=1, dtype=np.float64) / n_valid
+            zero_fraction = np.sum(values == 0, axis=1) / n_valid
+
+        distinct = np.zeros(len(numeric_columns), dtype=np.int64)
+        if n_rows > 0:
+            changes = sorted_values[:, 1:] != sorted_values[:, :-1]
+            changes &= np.arange(1, n_rows)[None, :] < n_valid[:, None]
+            distinct = np.where(n_valid > 0, changes.sum(axis=1) + 1, 0)
+
+        minimum = np.where(n_valid > 0, sorted_values[:, 0] if n_rows else np.nan, np.nan)
+        maximum = np.where(n_valid > 0, np.take_along_axis(sorted_values, last_valid, axis=1)[:, 0]
+                           if n_rows else np.nan, np.nan)
+
+        def to_list(array: np.ndarray) -> list:
+            return [None if np.isnan(value) else round(float(value), 6) for value in np.asarray(array, dtype=np.float64)]
+
+        quantiles = sorted_quantiles(sorted_values, n_valid, PROFILE_QUANTILES)
+        scaler_quantiles = sorted_quantiles(sorted_values, n_valid, PROFILE_SCALER_QUANTILES, fill_value=fill_value)
+
+        profile = {
+            "rows": n_rows,
+            "columns": list(map(str, df.columns)),
+            "numeric_columns": list(map(str, numeric_columns)),
+            "null_ratio": to_list((n_rows - n_valid) / max(n_rows, 1)),
+            "min": to_list(minimum),
+            "max": to_list(maximum),
+            "mean": to_list(mean),
+            "variance": to_list(variance),
+            "distinct_count": distinct.tolist(),
+            "zero_fraction": to_list(zero_fraction),
+            "quantiles": {str(q): to_list(row) for q, row in zip(PROFILE_QUANTILES, quantiles)},
+            "fill_value": float(fill_value),
+            # full precision, the scaler is fitted from these
+            "scaler_quantiles": {str(q): [float(value) for value in row]
+                                 for q, row in zip(PROFILE_SCALER_QUANTILES, scaler_quantiles)},
+            "categorical": {
+                str(column): {
+                    "null_ratio": round(float(df[column].isna().mean()), 6) if n_rows else None,
+                    "value_counts": {str(key): int(count) for key, count in df[column].value_counts().items()},
+                }
+                for column in other_columns
+            },
+        }
+        return profile
+
+    except Exception as e:
+        raise SensorException(f"Error while profiling dataframe: {str(e)}", sys)
+
+
+def get_zero_variance_columns(profile: dict) -> List[str]:
+    """
+    This function is responsible for listing the columns holding exactly one distinct value, as nunique() == 1
+    """
+    return [
+        column for column, distinct in zip(profile["numeric_columns"], profile["distinct_count"]) if distinct == 1
+    ] + [
+        column for column, summary in profile["categorical"].items() if len(summary["value_counts"]) == 1
+    ]
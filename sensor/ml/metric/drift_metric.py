@@ -0,0 +1,188 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+from scipy.stats import kstwobign
+
+from sensor.exception import SensorException
+
+# floor for empty bins so PSI and JS stay finite
+DRIFT_BIN_EPSILON = 1e-4
+# sortable key of float32 +inf, larger keys are NaN
+SORTABLE_POSITIVE_INFINITY = np.uint64(0xFF800000)
+
+
+def ks_p_value(statistic: np.ndarray, n_ref: np.ndarray, n_cur: np.ndarray) -> np.ndarray:
+    """
+    This function is responsible for the asymptotic two sided KS p-value of every column
+    """
+    has_data = (n_ref > 0) & (n_cur > 0)
+    effective_n = np.round(n_ref * n_cur / np.maximum(n_ref + n_cur, 1))
+    p_value = np.where(has_data, kstwobign.sf(np.sqrt(effective_n) * np.nan_to_num(statistic)), np.nan)
+    return np.clip(p_value, 0.0, 1.0)
+
+
+def sortable_keys(values: np.ndarray, is_current: np.ndarray) -> np.ndarray:
+    """
+    This function is responsible for packing float32 values and their sample label into uint64 keys
+    that sort in value order, so one plain sort replaces an argsort. NaN and +0/-0 are canonicalised first,
+    NaN ends up after +inf.
+    """
+    values = np.where(np.isnan(values), np.float32(np.nan), values + np.float32(0.0)).astype(np.float32)
+    bits = values.view(np.uint32)
+    bits = np.where(bits & np.uint32(0x80000000), ~bits, bits | np.uint32(0x80000000))
+    return (bits.astype(np.uint64) << np.uint64(1)) | is_current.astype(np.uint64)
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray):
+    """
+    This function is responsible for the two sample KS test of every column at once.
+    Both samples are packed into sortable keys and sorted once per column, the statistic is the largest
+    ECDF gap measured at the end of each run of tied values. NaN is ignored and values are compared as float32.
+    p-values use the limiting Kolmogorov distribution, which is vectorised and close to
+    scipy.stats.ks_2samp(method='asymp') at the sample sizes validated here.
+    """
+    try:
+        n_ref = np.sum(~np.isnan(reference), axis=0)
+        n_cur = np.sum(~np.isnan(current), axis=0)
+
+        # one contiguous row per column
+        values = np.ascontiguousarray(np.concatenate([reference, current], axis=0).T)
+        is_current = np.zeros(values.shape, dtype=bool)
+        is_current[:, reference.shape[0]:] = True
+
+        keys = np.sort(sortable_keys(values, is_current), axis=1)
+        sorted_is_current = (keys & np.uint64(1)).astype(bool)
+        sorted_values = keys >> np.uint64(1)
+
+        # the ECDF gap |cum_ref / n_ref - cum_cur / n_cur| is kept in integers until the maximum is taken
+        cum_cur = np.cumsum(sorted_is_current, axis=1, dtype=np.int64)
+        cum_ref = np.arange(1, values.shape[1] + 1, dtype=np.int64)[None, :] - cum_cur
+        scaled_gap = np.abs(cum_ref * n_cur[:, None] - cum_cur * n_ref[:, None])
+
+        run_end = np.ones(values.shape, dtype=bool)
+        run_end[:, :-1] = sorted_values[:, 1:] != sorted_values[:, :-1]
+        run_end &= sorted_values <= SORTABLE_POSITIVE_INFINITY
+
+        scaled_gap[~run_end] = 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            statistic = scaled_gap.max(axis=1, initial=0) / (n_ref * n_cur)
+
+        statistic = np.where((n_ref > 0) & (n_cur > 0), statistic, np.nan)
+        return statistic, ks_p_value(statistic, n_ref, n_cur)
+
+    except Exception as e:
+        raise SensorException(f"Error while calculating KS statistic: {str(e)}", sys)
+
+
+def reference_quantiles(reference: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """
+    This function is responsible for the linear quantiles of every column ignoring NaN,
+    read from one row-wise sort instead of np.nanquantile
+    """
+    sorted_reference = np.sort(reference.T, axis=1)
+    n_valid = np.sum(~np.isnan(sorted_reference), axis=1)
+    position = quantiles[None, :] * np.maximum(n_valid - 1, 0)[:, None]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(n_valid - 1, 0)[:, None])
+    fraction = position - lower
+    lower_values = np.take_along_axis(sorted_reference, lower, axis=1)
+    upper_values = np.take_along_axis(sorted_reference, upper, axis=1)
+    edges = lower_values + (upper_values - lower_values) * fraction
+    edges[n_valid == 0] = np.nan
+    return edges.T
+
+
+def bin_proportions(reference: np.ndarray, current: np.ndarray, n_bins: int):
+    """
+    This function is responsible for binning both samples on the reference quantiles of every column.
+    Missing values are left out of the bins.
+    """
+    if reference.shape[0] == 0:
+        edges = np.full((n_bins - 1, reference.shape[1]), np.nan)
+    else:
+        edges = reference_quantiles(reference, np.linspace(0, 1, n_bins + 1)[1:-1])
+
+    def proportions(sample: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(sample)
+        bin_index = np.zeros(sample.shape, dtype=np.int16)
+        for edge in edges:
+            bin_index += sample >= edge
+        # invalid values go to an extra bin that is dropped, one bincount covers every column
+        bin_index[~valid] = n_bins
+        offsets = np.arange(sample.shape[1]) * (n_bins + 1)
+        counts = np.bincount((bin_index + offsets).ravel(), minlength=sample.shape[1] * (n_bins + 1))
+        counts = counts.reshape(sample.shape[1], n_bins + 1)[:, :n_bins].T
+        return np.maximum(counts / np.maximum(valid.sum(axis=0), 1), DRIFT_BIN_EPSILON)
+
+    return proportions(reference), proportions(current)
+
+
+def psi_and_js_from_proportions(p_ref: np.ndarray, p_cur: np.ndarray):
+    """
+    This function is responsible for PSI and JS distance from (bins, columns) proportions floored at DRIFT_BIN_EPSILON
+    """
+    psi = np.sum((p_cur - p_ref) * np.log(p_cur / p_ref), axis=0)
+
+    mixture = (p_ref + p_cur) / 2
+    divergence = 0.5 * np.sum(p_ref * np.log2(p_ref / mixture), axis=0) + \
+        0.5 * np.sum(p_cur * np.log2(p_cur / mixture), axis=0)
+    return psi, np.sqrt(np.maximum(divergence, 0.0))
+
+
+def psi_and_js(reference: np.ndarray, current: np.ndarray, n_bins: int = 10):
+    """
+    This function is responsible for the population stability index and the Jensen-Shannon distance
+    (base 2, between 0 and 1) of every column
+    """
+    try:
+        return psi_and_js_from_proportions(*bin_proportions(reference, current, n_bins))
+
+    except Exception as e:
+        raise SensorException(f"Error while calculating PSI and JS distance: {str(e)}", sys)
+
+
+def compute_drift_block(reference: np.ndarray, current: np.ndarray, n_bins: int = 10) -> dict:
+    """
+    This function is responsible for every drift metric of a block of columns
+    """
+    statistic, p_value = ks_statistic(reference, current)
+    psi, js = psi_and_js(reference, current, n_bins)
+    return {
+        "ks_statistic": statistic,
+        "p_value": p_value,
+        "psi": psi,
+        "js_distance": js,
+        "reference_missing_rate": np.isnan(reference).sum(axis=0) / max(reference.shape[0], 1),
+        "current_missing_rate": np.isnan(current).sum(axis=0) / max(current.shape[0], 1),
+    }
+
+
+def compute_drift(reference: np.ndarray, current: np.ndarray, n_bins: int = 10, n_workers: int = 1) -> dict:
+    """
+    This function is responsible for the drift metrics of every column of two 2D float arrays.
+    With n_workers > 1 the columns are split into blocks computed on a process pool.
+    """
+    try:
+        # float32 feature arrays are used as they are, sorting them needs no upcast
+        dtype = np.result_type(reference, current, np.float32)
+        reference = np.asarray(reference, dtype=dtype)
+        current = np.asarray(current, dtype=dtype)
+        n_columns = reference.shape[1]
+
+        if n_workers <= 1 or n_columns < 2:
+            return compute_drift_block(reference, current, n_bins)
+
+        blocks: List[np.ndarray] = [block for block in np.array_split(np.arange(n_columns), n_workers) if len(block)]
+        with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+            results = list(executor.map(
+                compute_drift_block,
+                [reference[:, block] for block in blocks],
+                [current[:, block] for block in blocks],
+                [n_bins] * len(blocks)
+            ))
+        return {metric: np.concatenate([result[metric] for result in results]) for metric in results[0]}
+
+    except Exception as e:
+        raise SensorException(f"Error while calculating drift: {str(e)}", sys)
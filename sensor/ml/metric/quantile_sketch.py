@@ -0,0 +1,257 @@
+import os
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from sensor.exception import SensorException
+from sensor.ml.metric.drift_metric import DRIFT_BIN_EPSILON, ks_p_value, psi_and_js_from_proportions
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_MIN_VALUE = 1e-6
+SKETCH_MAX_VALUE = 1e15
+SKETCH_UPDATE_CHUNK_ROWS = 16384
+
+
+class QuantileSketch:
+
+    """
+    This class is responsible for a mergeable quantile sketch of every numeric column.
+    Values are counted in fixed logarithmic buckets (as in DDSketch), so any quantile is returned
+    within relative_accuracy of the true value. The bucket grid only depends on the parameters,
+    which makes merging two sketches a sum of their counts and keeps memory constant in the number of rows.
+    Counts are laid out in value order: negative buckets, the zero bucket, positive buckets.
+    """
+
+    def __init__(self, columns: List[str], relative_accuracy: float = SKETCH_RELATIVE_ACCURACY,
+                 min_value: float = SKETCH_MIN_VALUE, max_value: float = SKETCH_MAX_VALUE) -> None:
+        try:
+            self.columns = list(columns)
+            self.relative_accuracy = relative_accuracy
+            self.min_value = min_value
+            self.max_value = max_value
+
+            self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+            self.log_gamma = np.log(self.gamma)
+            self.min_index = int(np.ceil(np.log(min_value) / self.log_gamma))
+            self.n_buckets = int(np.ceil(np.log(max_value) / self.log_gamma)) - self.min_index + 1
+
+            n_columns = len(self.columns)
+            self.counts = np.zeros((n_columns, 2 * self.n_buckets + 1), dtype=np.int64)
+            self.nan_counts = np.zeros(n_columns, dtype=np.int64)
+            self.min = np.full(n_columns, np.inf)
+            self.max = np.full(n_columns, -np.inf)
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing QuantileSketch: {str(e)}", sys)
+
+
+    @property
+    def count(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+
+    def get_positions(self, values: np.ndarray) -> np.ndarray:
+        """
+        This method is responsible for mapping values to their bucket position in the value ordered counts
+        """
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.ceil(np.log(np.maximum(magnitude, self.min_value)) / self.log_gamma) - self.min_index
+        index = np.clip(np.nan_to_num(index), 0, self.n_buckets - 1).astype(np.int64)
+
+        positions = np.where(values > 0, self.n_buckets + 1 + index, self.n_buckets - 1 - index)
+        return np.where(magnitude < self.min_value, self.n_buckets, positions)
+
+
+    def get_values(self, positions: np.ndarray) -> np.ndarray:
+        """
+        This method is responsible for the representative value of bucket positions
+        """
+        offset = positions - self.n_buckets
+        index = np.abs(offset) - 1 + self.min_index
+        magnitude = 2 * np.power(self.gamma, index.astype(np.float64)) / (self.gamma + 1)
+        return np.sign(offset) * magnitude
+
+
+    def update(self, values: np.ndarray) -> "QuantileSketch":
+        """
+        This method is responsible for adding a (rows, columns) block of values, NaN is counted separately
+        """
+        try:
+            values = np.asarray(values)
+            if values.ndim != 2 or values.shape[1] != len(self.columns):
+                raise ValueError(f"Expected {len(self.columns)} columns, got shape {values.shape}")
+
+            width = self.counts.shape[1]
+            offsets = np.arange(len(self.columns), dtype=np.int64) * width
+            for start in range(0, values.shape[0], SKETCH_UPDATE_CHUNK_ROWS):
+                chunk = values[start:start + SKETCH_UPDATE_CHUNK_ROWS].astype(np.float64)
+                valid = ~np.isnan(chunk)
+                self.nan_counts += (~valid).sum(axis=0)
+                if not valid.any():
+                    continue
+
+                positions = (self.get_positions(chunk) + offsets)[valid]
+                self.counts += np.bincount(positions, minlength=self.counts.size).reshape(self.counts.shape)
+                with np.errstate(invalid='ignore'):
+                    self.min = np.fmin(self.min, np.nanmin(np.where(valid, chunk, np.inf), axis=0))
+                    self.max = np.fmax(self.max, np.nanmax(np.where(valid, chunk, -np.inf), axis=0))
+            return self
+
+        except Exception as e:
+            raise SensorException(f"Error while updating QuantileSketch: {str(e)}", sys)
+
+
+    def is_compatible(self, other: "QuantileSketch") -> bool:
+        return (self.relative_accuracy, self.min_value, self.max_value) == \
+            (other.relative_accuracy, other.min_value, other.max_value)
+
+
+    def select(self, columns: List[str]) -> "QuantileSketch":
+        """
+        This method is responsible for a copy restricted to columns, in that order
+        """
+        try:
+            index = [self.columns.index(column) for column in columns]
+            sketch = QuantileSketch(columns, self.relative_accuracy, self.min_value, self.max_value)
+            sketch.counts = self.counts[index].copy()
+            sketch.nan_counts = self.nan_counts[index].copy()
+            sketch.min = self.min[index].copy()
+            sketch.max = self.max[index].copy()
+            return sketch
+
+        except Exception as e:
+            raise SensorException(f"Error while selecting sketch columns: {str(e)}", sys)
+
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        This method is responsible for folding other into this sketch, both must cover the same columns
+        """
+        try:
+            if not self.is_compatible(other):
+                raise ValueError("Sketches were built with different parameters")
+            if other.columns != self.columns:
+                other = other.select(self.columns)
+
+            self.counts += other.counts
+            self.nan_counts += other.nan_counts
+            self.min = np.fmin(self.min, other.min)
+            self.max = np.fmax(self.max, other.max)
+            return self
+
+        except Exception as e:
+            raise SensorException(f"Error while merging sketches: {str(e)}", sys)
+
+
+    def quantiles(self, q) -> np.ndarray:
+        """
+        This method is responsible for the (len(q), columns) quantiles, NaN for empty columns
+        """
+        try:
+            q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+            cumulative = np.cumsum(self.counts, axis=1)
+            count = cumulative[:, -1]
+            rank = q[None, :] * np.maximum(count - 1, 0)[:, None]
+
+            positions = np.stack([np.argmax(cumulative > rank[:, [k]], axis=1) for k in range(len(q))], axis=1)
+            values = np.clip(self.get_values(positions), self.min[:, None], self.max[:, None])
+            values[count == 0] = np.nan
+            return values.T
+
+        except Exception as e:
+            raise SensorException(f"Error while reading sketch quantiles: {str(e)}", sys)
+
+
+    def save(self, file_path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            np.savez_compressed(
+                file_path, columns=np.array(self.columns), counts=self.counts, nan_counts=self.nan_counts,
+                min=self.min, max=self.max,
+                parameters=np.array([self.relative_accuracy, self.min_value, self.max_value])
+            )
+
+        except Exception as e:
+            raise SensorException(f"Error while saving sketch: {str(e)}", sys)
+
+
+    @classmethod
+    def load(cls, file_path: str) -> "QuantileSketch":
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                relative_accuracy, min_value, max_value = data["parameters"].tolist()
+                sketch = cls(data["columns"].tolist(), relative_accuracy, min_value, max_value)
+                sketch.counts = data["counts"]
+                sketch.nan_counts = data["nan_counts"]
+                sketch.min = data["min"]
+                sketch.max = data["max"]
+            return sketch
+
+        except Exception as e:
+            raise SensorException(f"Error while loading sketch: {str(e)}", sys)
+
+
+    @classmethod
+    def from_array(cls, values: np.ndarray, columns: List[str], **kwargs) -> "QuantileSketch":
+        return cls(columns, **kwargs).update(values)
+
+
+def merge_sketches(sketches: List[QuantileSketch]) -> Optional[QuantileSketch]:
+    """
+    This function is responsible for merging sketches over the columns they all share
+    """
+    if len(sketches) == 0:
+        return None
+
+    columns = [column for column in sketches[0].columns if all(column in sketch.columns for sketch in sketches[1:])]
+    merged = sketches[0].select(columns)
+    for sketch in sketches[1:]:
+        merged.merge(sketch.select(columns))
+    return merged
+
+
+def compare_sketches(reference: QuantileSketch, current: QuantileSketch, n_bins: int = 10) -> dict:
+    """
+    This function is responsible for KS, PSI and JS drift between two sketches of the same columns.
+    Both share one bucket grid, so the KS statistic is the largest gap of the bucketed CDFs
+    and the PSI/JS bins are the reference deciles snapped to buckets.
+    """
+    try:
+        if not reference.is_compatible(current):
+            raise ValueError("Sketches were built with different parameters")
+        if current.columns != reference.columns:
+            current = current.select(reference.columns)
+
+        n_ref, n_cur = reference.count, current.count
+        cum_ref = np.cumsum(reference.counts, axis=1)
+        cum_cur = np.cumsum(current.counts, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            statistic = np.abs(cum_ref / n_ref[:, None] - cum_cur / n_cur[:, None]).max(axis=1)
+        statistic = np.where((n_ref > 0) & (n_cur > 0), statistic, np.nan)
+
+        # values below an edge are the counts before its bucket, as in the exact engine
+        edges = reference.quantiles(np.linspace(0, 1, n_bins + 1)[1:-1])
+        edge_positions = reference.get_positions(np.nan_to_num(edges)).T
+
+        def proportions(sketch: QuantileSketch, cumulative: np.ndarray, count: np.ndarray) -> np.ndarray:
+            below = np.take_along_axis(cumulative, edge_positions, axis=1) - \
+                np.take_along_axis(sketch.counts, edge_positions, axis=1)
+            bounds = np.concatenate([np.zeros((len(count), 1)), below, count[:, None]], axis=1)
+            return np.maximum(np.diff(bounds, axis=1).T / np.maximum(count, 1), DRIFT_BIN_EPSILON)
+
+        psi, js = psi_and_js_from_proportions(proportions(reference, cum_ref, n_ref),
+                                              proportions(current, cum_cur, n_cur))
+
+        return {
+            "ks_statistic": statistic,
+            "p_value": ks_p_value(statistic, n_ref, n_cur),
+            "psi": psi,
+            "js_distance": js,
+            "reference_missing_rate": reference.nan_counts / np.maximum(n_ref + reference.nan_counts, 1),
+            "current_missing_rate": current.nan_counts / np.maximum(n_cur + current.nan_counts, 1),
+        }
+
+    except Exception as e:
+        raise SensorException(f"Error while comparing sketches: {str(e)}", sys)
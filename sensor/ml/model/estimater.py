@@ -1,7 +1,11 @@
 import os
 import sys
+from typing import Optional
 from sensor.exception import SensorException
-from sensor.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME
+from sensor.logger import logging
+from sensor.ml.model.fused_preprocessor import FusedPreprocessor
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME, MODEL_MANIFEST_FILE_NAME, MODEL_REGISTRY_FILE_NAME
+from sensor.utils.main_utils import read_yaml_file, write_yaml_file
 
 class TargetValueMapping:
 
@@ -29,9 +33,37 @@ class SensorModel:
             raise SensorException(f"Error while initializing SensorModel: {str(e)}", sys)
         
     
+    def compile(self) -> bool:
+        """
+        This method is responsible for switching predict to the fused float32 preprocessing kernel
+        when it reproduces the sklearn preprocessor, otherwise the sklearn pipeline keeps being used.
+        The trainer compiles the model before saving it, so the parity check runs once per trained model
+        and bundles loaded for serving only pay for it when they were saved uncompiled.
+        """
+        try:
+            if getattr(self, "fused_preprocessor", None) is not None:
+                return True
+
+            fused_preprocessor = FusedPreprocessor.from_pipeline(self.preprocesser)
+            if not fused_preprocessor.check_parity(self.preprocesser, fused_preprocessor.make_parity_sample()):
+                logging.error("Fused preprocessor does not match the sklearn pipeline, keeping sklearn transform")
+                return False
+
+            self.fused_preprocessor = fused_preprocessor
+            return True
+
+        except Exception as e:
+            logging.error(f"Unable to compile preprocessor, keeping sklearn transform: {str(e)}")
+            return False
+
+
     def predict(self, data):
         try:
-            x_transform = self.preprocesser.transform(data)
+            fused_preprocessor = getattr(self, "fused_preprocessor", None)
+            if fused_preprocessor is not None:
+                x_transform = fused_preprocessor.transform(data)
+            else:
+                x_transform = self.preprocesser.transform(data)
             y_hat = self.model.predict(x_transform)
             return y_hat
         
@@ -44,6 +76,59 @@ class ModelResolver:
         def __init__(self, model_dir=SAVED_MODEL_DIR) -> None:
             try:
                 self.model_dir = model_dir
+                self.registry_file_path = os.path.join(model_dir, MODEL_REGISTRY_FILE_NAME)
+
+            except Exception as e:
+                raise e
+
+
+        def get_registry(self)->dict:
+            """
+            This method is responsible for reading the registry index, an empty registry is returned if it is missing
+            """
+            try:
+                if not os.path.exists(self.registry_file_path):
+                    return {"current_version": None, "versions": []}
+                return read_yaml_file(self.registry_file_path)
+
+            except Exception as e:
+                raise e
+
+
+        def get_current_version(self)->Optional[str]:
+            """
+            This method is responsible for returning the served version from the registry,
+            falling back to the newest timestamp directory for bundles pushed before the registry existed
+            """
+            try:
+                current_version = self.get_registry().get("current_version")
+                if current_version is not None:
+                    return str(current_version)
+
+                if not os.path.exists(self.model_dir):
+                    return None
+
+                timestamps = [int(name) for name in os.listdir(self.model_dir) if name.isdigit()]
+                if len(timestamps) == 0:
+                    return None
+                return str(max(timestamps))
+
+            except Exception as e:
+                raise e
+
+
+        def register(self, version:str)->None:
+            """
+            This method is responsible for making version the current one in the registry
+            """
+            try:
+                registry = self.get_registry()
+                versions = [str(v) for v in registry.get("versions", [])]
+                if str(version) not in versions:
+                    versions.append(str(version))
+
+                write_yaml_file(self.registry_file_path,
+                                {"current_version": str(version), "versions": versions}, atomic=True)
 
             except Exception as e:
                 raise e
@@ -51,23 +136,30 @@ class ModelResolver:
 
         def get_best_model_path(self)->str:
             try:
-                timestamps = list(map(int, os.listdir(self.model_dir)))
-                latest_timestamp = max(timestamps)
-
-                latest_model_path = os.path.join(self.model_dir, f"{latest_timestamp}", MODEL_FILE_NAME)
+                latest_model_path = os.path.join(self.model_dir, f"{self.get_current_version()}", MODEL_FILE_NAME)
                 return latest_model_path
             
             except Exception as e:
                 raise e
+
+
+        def get_manifest(self, model_path:str)->Optional[dict]:
+            """
+            This method is responsible for reading the manifest stored next to a saved model
+            """
+            try:
+                manifest_file_path = os.path.join(os.path.dirname(model_path), MODEL_MANIFEST_FILE_NAME)
+                if not os.path.exists(manifest_file_path):
+                    return None
+                return read_yaml_file(manifest_file_path)
+
+            except Exception as e:
+                raise e
         
 
         def is_model_exists(self)->bool:
             try:
-                if not os.path.exists(self.model_dir):
-                    return False
-
-                timestamp = os.listdir(self.model_dir)
-                if len(timestamp) == 0:
+                if self.get_current_version() is None:
                     return False
                 
                 latest_model_path = self.get_best_model_path()
@@ -79,6 +171,3 @@ class ModelResolver:
         
             except Exception as e:
                 raise e
-        
-    
-        
\ No newline at end of file
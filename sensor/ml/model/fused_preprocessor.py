@@ -0,0 +1,110 @@
+import sys
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import RobustScaler
+
+from sensor.exception import SensorException
+
+
+class FusedPreprocessor:
+
+    """
+    This class is responsible for applying a fitted SimpleImputer + RobustScaler pipeline
+    as one precomputed float32 kernel, in place on a contiguous array.
+    Missing values are imputed after scaling with the pre-scaled fill value, which gives
+    the same result as imputing first because NaN propagates through the arithmetic.
+    """
+
+    def __init__(self, columns: Optional[List[str]], center: np.ndarray, scale: np.ndarray,
+                 fill_values: np.ndarray) -> None:
+        try:
+            self.columns = columns
+            self.center = np.ascontiguousarray(center, dtype=np.float32)
+            self.inverse_scale = np.ascontiguousarray(1.0 / scale, dtype=np.float32)
+            self.scaled_fill_values = ((fill_values - center) / scale).astype(np.float32)
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing FusedPreprocessor: {str(e)}", sys)
+
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Pipeline) -> "FusedPreprocessor":
+        """
+        This method is responsible for pulling the fitted parameters out of the sklearn pipeline
+        """
+        try:
+            steps = [step for _, step in pipeline.steps]
+            if len(steps) != 2 or not isinstance(steps[0], SimpleImputer) or not isinstance(steps[1], RobustScaler):
+                raise ValueError(f"Unsupported preprocessing steps: {pipeline.steps}")
+
+            imputer, scaler = steps
+            if imputer.add_indicator:
+                raise ValueError("Imputer missing indicators are not supported")
+
+            n_features = imputer.statistics_.shape[0]
+            fill_values = imputer.statistics_.astype(np.float64)
+            center = scaler.center_ if scaler.with_centering else np.zeros(n_features)
+            scale = scaler.scale_ if scaler.with_scaling else np.ones(n_features)
+            columns = list(imputer.feature_names_in_) if hasattr(imputer, "feature_names_in_") else None
+
+            return cls(columns=columns, center=center, scale=scale, fill_values=fill_values)
+
+        except Exception as e:
+            raise SensorException(f"Error while compiling preprocessor: {str(e)}", sys)
+
+
+    def transform(self, X) -> np.ndarray:
+        """
+        This method is responsible for imputing and scaling X into a new float32 array.
+        A frame is converted once, its array is column major when pandas had to gather it.
+        """
+        try:
+            if isinstance(X, pd.DataFrame):
+                if self.columns is not None and list(X.columns) != self.columns:
+                    X = X[self.columns]
+                x = X.to_numpy(dtype=np.float32)
+                # to_numpy returns a view of a single float32 block, only then is a copy needed
+                if X.shape[1] > 0 and np.shares_memory(x, X.iloc[:, 0].to_numpy()):
+                    x = np.array(x, dtype=np.float32, order='C', copy=True)
+                elif not x.flags.writeable:
+                    # a gathered or cast array is new, copy on write pandas still flags it read only
+                    x.flags.writeable = True
+            else:
+                # the only copy: input -> contiguous float32, everything after runs in place
+                x = np.array(X, dtype=np.float32, order='C', copy=True)
+
+            np.subtract(x, self.center, out=x)
+            np.multiply(x, self.inverse_scale, out=x)
+            np.copyto(x, np.broadcast_to(self.scaled_fill_values, x.shape), where=np.isnan(x))
+            return x
+
+        except Exception as e:
+            raise SensorException(f"Error while applying fused preprocessor: {str(e)}", sys)
+
+
+    def check_parity(self, pipeline: Pipeline, X, rtol: float = 1e-4, atol: float = 1e-4) -> bool:
+        """
+        This method is responsible for checking that the kernel matches the sklearn pipeline on X
+        """
+        try:
+            expected = pipeline.transform(X)
+            actual = self.transform(X)
+            return expected.shape == actual.shape and bool(np.allclose(actual, expected, rtol=rtol, atol=atol))
+
+        except Exception as e:
+            raise SensorException(f"Error while checking preprocessor parity: {str(e)}", sys)
+
+
+    def make_parity_sample(self, n_rows: int = 64, random_state: int = 42) -> pd.DataFrame:
+        """
+        This method is responsible for building a synthetic sample around the fitted centers, with missing values
+        """
+        rng = np.random.default_rng(random_state)
+        scale = 1.0 / self.inverse_scale.astype(np.float64)
+        sample = self.center + rng.standard_normal((n_rows, self.center.shape[0])) * scale * 3
+        sample[rng.random(sample.shape) < 0.1] = np.nan
+        return pd.DataFrame(sample, columns=self.columns)
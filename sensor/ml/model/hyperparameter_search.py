@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.ml.model.training_engine import build_dmatrix, get_validation_split
+from sensor.utils.main_utils import get_file_hash, load_numpy_array_data, read_yaml_file, write_yaml_file
+
+SEARCH_EVAL_METRIC = 'logloss'
+
+# train and validation DMatrix of each worker process, built on its first trial and reused by the next ones
+_worker_data: Dict[tuple, Tuple[xgb.DMatrix, xgb.DMatrix]] = {}
+
+
+def get_available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_worker_data(feature_file_path: str, target_file_path: str, validation_ratio: float,
+                    random_state: int) -> Tuple[xgb.DMatrix, xgb.DMatrix]:
+    key = (feature_file_path, target_file_path, validation_ratio, random_state)
+    if key not in _worker_data:
+        # the arrays are memory mapped, rows are quantised batch by batch into the DMatrix
+        features = load_numpy_array_data(feature_file_path, mmap_mode='r')
+        target = load_numpy_array_data(target_file_path, mmap_mode='r')
+        train_index, validation_index = get_validation_split(np.asarray(target), validation_ratio, random_state)
+        _worker_data.clear()
+        dtrain = build_dmatrix(features, target, train_index)
+        _worker_data[key] = (dtrain, build_dmatrix(features, target, validation_index, ref=dtrain))
+    return _worker_data[key]
+
+
+def run_trial(params: dict, num_boost_round: int, early_stopping_rounds: int, nthread: int,
+              feature_file_path: str, target_file_path: str, validation_ratio: float, random_state: int) -> dict:
+    """
+    This function is responsible for training one configuration with early stopping on the validation fold,
+    it runs inside a pool worker and only receives file paths, never the arrays
+    """
+    start_time = time.perf_counter()
+    dtrain, dvalidation = get_worker_data(feature_file_path, target_file_path, validation_ratio, random_state)
+    booster = xgb.train(
+        {**params, "objective": "binary:logistic", "eval_metric": SEARCH_EVAL_METRIC,
+         "tree_method": "hist", "nthread": nthread, "seed": random_state},
+        dtrain,
+        num_boost_round=num_boost_round,
+        evals=[(dvalidation, "validation")],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False
+    )
+    return {
+        "score": float(booster.best_score),
+        "best_iteration": int(booster.best_iteration),
+        "seconds": round(time.perf_counter() - start_time, 3),
+    }
+
+
+class SuccessiveHalvingSearch:
+
+    """
+    This class is responsible for tuning XGBoost parameters with successive halving.
+    n_trials configurations are drawn from the search space and trained for min_rounds boosting rounds,
+    the best 1/eta of them go on with eta times more rounds, until max_rounds. Every trial early stops
+    on a validation fold held out of the train split.
+    Trials run on one process pool created for the whole search, so every worker builds its DMatrix once and
+    reuses it in every rung. Threads per trial are sized so that running trials x threads never exceeds the cores.
+    With a positive class weight every trial trains with it as scale_pos_weight.
+    Every finished trial is written to trials_dir, keyed by the data and the search settings,
+    so an interrupted search resumes from the trials already done.
+    """
+
+    def __init__(self, search_space: Dict[str, list], trials_dir: str, n_trials: int = 27, eta: int = 3,
+                 min_rounds: int = 25, max_rounds: int = 225, early_stopping_rounds: int = 20,
+                 validation_ratio: float = 0.2, n_workers: int = 0, random_state: int = 42) -> None:
+        try:
+            self.search_space = search_space
+            self.trials_dir = trials_dir
+            self.n_trials = n_trials
+            self.eta = eta
+            self.min_rounds = min_rounds
+            self.max_rounds = max_rounds
+            self.early_stopping_rounds = early_stopping_rounds
+            self.validation_ratio = validation_ratio
+            self.n_cores = get_available_cores()
+            self.n_workers = min(n_workers, self.n_cores) if n_workers > 0 else self.n_cores
+            self.random_state = random_state
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing SuccessiveHalvingSearch: {str(e)}", sys)
+
+
+    def get_rungs(self) -> List[int]:
+        rungs = [self.min_rounds]
+        while rungs[-1] * self.eta <= self.max_rounds:
+            rungs.append(rungs[-1] * self.eta)
+        return rungs
+
+
+    def sample_configurations(self) -> List[dict]:
+        """
+        This method is responsible for drawing n_trials distinct configurations from the search space,
+        the draw only depends on random_state so a resumed search sees the same configurations
+        """
+        rng = np.random.default_rng(self.random_state)
+        names = sorted(self.search_space)
+        n_combinations = int(np.prod([len(self.search_space[name]) for name in names]))
+        configurations = []
+        for combination in rng.permutation(n_combinations)[:self.n_trials]:
+            configuration = {}
+            for name in names:
+                combination, position = divmod(int(combination), len(self.search_space[name]))
+                configuration[name] = self.search_space[name][position]
+            configurations.append(configuration)
+        return configurations
+
+
+    def get_trials_file_path(self, feature_file_path: str, target_file_path: str,
+                             positive_weight: Optional[float] = None) -> str:
+        settings = json.dumps({
+            "data": [get_file_hash(feature_file_path), get_file_hash(target_file_path)],
+            "search_space": self.search_space, "n_trials": self.n_trials, "rungs": self.get_rungs(),
+            "early_stopping_rounds": self.early_stopping_rounds, "validation_ratio": self.validation_ratio,
+            "random_state": self.random_state, "positive_weight": positive_weight,
+        }, sort_keys=True)
+        return os.path.join(self.trials_dir, f"{hashlib.sha256(settings.encode()).hexdigest()[:16]}.yaml")
+
+
+    def run_rung(self, rung: int, candidates: List[int], configurations: List[dict], trials: dict,
+                 trials_file_path: str, feature_file_path: str, target_file_path: str,
+                 executor: Optional[ProcessPoolExecutor] = None, positive_weight: Optional[float] = None) -> None:
+        """
+        This method is responsible for running the trials of one rung that are not persisted yet,
+        on the search's executor or in this process when there is none
+        """
+        pending = [index for index in candidates if f"{rung}-{index}" not in trials]
+        if not pending:
+            return
+
+        n_workers = 1 if executor is None else min(self.n_workers, len(pending))
+        nthread = max(1, self.n_cores // n_workers)
+        logging.info(f"Rung {rung} rounds: {len(pending)} trials on {n_workers} workers x {nthread} threads")
+
+        def record(index: int, result: dict) -> None:
+            trials[f"{rung}-{index}"] = {"rung": rung, "configuration": index, "params": dict(configurations[index]), **result}
+            write_yaml_file(trials_file_path, trials, atomic=True)
+
+        def get_trial_params(index: int) -> dict:
+            if positive_weight is None:
+                return configurations[index]
+            return {**configurations[index], "scale_pos_weight": positive_weight}
+
+        trial_arguments = (self.early_stopping_rounds, nthread, feature_file_path, target_file_path,
+                           self.validation_ratio, self.random_state)
+        if executor is None:
+            for index in pending:
+                record(index, run_trial(get_trial_params(index), rung, *trial_arguments))
+            return
+
+        futures = {
+            executor.submit(run_trial, get_trial_params(index), rung, *trial_arguments): index for index in pending
+        }
+        for future in as_completed(futures):
+            record(futures[future], future.result())
+
+
+    def run(self, feature_file_path: str, target_file_path: str, positive_weight: Optional[float] = None) -> dict:
+        """
+        This method is responsible for the whole search, returns the best parameters with the number of
+        boosting rounds that early stopping kept for them
+        """
+        try:
+            start_time = time.perf_counter()
+            configurations = self.sample_configurations()
+            trials_file_path = self.get_trials_file_path(feature_file_path, target_file_path, positive_weight)
+            trials = read_yaml_file(trials_file_path) if os.path.exists(trials_file_path) else {}
+            if trials:
+                logging.info(f"Resuming search with {len(trials)} finished trials from: {trials_file_path}")
+
+            n_workers = min(self.n_workers, len(configurations))
+            executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+            try:
+                candidates = list(range(len(configurations)))
+                for rung in self.get_rungs():
+                    self.run_rung(rung, candidates, configurations, trials, trials_file_path,
+                                  feature_file_path, target_file_path, executor=executor,
+                                  positive_weight=positive_weight)
+                    candidates = sorted(candidates, key=lambda index: trials[f"{rung}-{index}"]["score"])
+                    best_rung, best_index = rung, candidates[0]
+                    candidates = candidates[:max(1, len(candidates) // self.eta)]
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+            best_trial = trials[f"{best_rung}-{best_index}"]
+            logging.info(f"Search finished in {time.perf_counter() - start_time:.2f}s, best {SEARCH_EVAL_METRIC} "
+                         f"{best_trial['score']:.5f} with {best_trial['params']}")
+            return {
+                "params": best_trial["params"],
+                "n_estimators": best_trial["best_iteration"] + 1,
+                "score": best_trial["score"],
+                "trials_file_path": trials_file_path,
+            }
+
+        except Exception as e:
+            logging.error(f"Error while running hyperparameter search: {str(e)}")
+            raise SensorException(f"Error while running hyperparameter search: {str(e)}", sys)
@@ -0,0 +1,150 @@
+import sys
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sensor.constant.application import MODEL_CACHE_REFRESH_INTERVAL_SECONDS
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, SCHEMA_FILE_PATH
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.ml.model.estimater import ModelResolver, SensorModel
+from sensor.utils.main_utils import get_file_hash, load_object, read_yaml_file
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model_path: str
+    model: SensorModel
+    preprocessor: object
+    required_columns: List[str]
+    manifest: Optional[dict] = None
+
+
+class ModelCache:
+
+    """
+    This class is responsible for keeping the latest saved model resident in memory
+    and swapping in newer saved models from a background thread
+    """
+
+    def __init__(self, model_dir: str = SAVED_MODEL_DIR, schema_file_path: str = SCHEMA_FILE_PATH,
+                 refresh_interval: float = MODEL_CACHE_REFRESH_INTERVAL_SECONDS) -> None:
+        try:
+            self.model_resolver = ModelResolver(model_dir=model_dir)
+            self.schema_file_path = schema_file_path
+            self.refresh_interval = refresh_interval
+
+            self._required_columns: Optional[List[str]] = None
+            self._loaded_model: Optional[LoadedModel] = None
+            self._reload_lock = threading.Lock()
+            self._stop_event = threading.Event()
+            self._watcher: Optional[threading.Thread] = None
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing ModelCache: {str(e)}", sys)
+
+
+    def get(self) -> Optional[LoadedModel]:
+        """
+        This method is responsible for returning the currently served model without touching disk
+        """
+        return self._loaded_model
+
+
+    def get_required_columns(self) -> List[str]:
+        """
+        This method is responsible for reading the schema once and returning the feature columns
+        """
+        try:
+            if self._required_columns is None:
+                schema = read_yaml_file(self.schema_file_path)
+                self._required_columns = [
+                    list(data.keys())[0] for data in schema.get('columns', []) if list(data.values())[0] != 'category'
+                ]
+            return self._required_columns
+
+        except Exception as e:
+            raise SensorException(f"Error while reading required columns: {str(e)}", sys)
+
+
+    def refresh(self) -> bool:
+        """
+        This method is responsible for loading the latest saved model if it is newer than the served one.
+        The new model is fully unpickled before the reference is swapped, so readers never see a partial load.
+        """
+        try:
+            with self._reload_lock:
+                if not self.model_resolver.is_model_exists():
+                    return False
+
+                best_model_path = self.model_resolver.get_best_model_path()
+                current = self._loaded_model
+                if current is not None and current.model_path == best_model_path:
+                    return False
+
+                logging.info(f"Loading model into cache from: {best_model_path}")
+                manifest = self.model_resolver.get_manifest(best_model_path)
+                model = load_object(file_path=best_model_path)
+                if isinstance(model, SensorModel) and model.compile():
+                    logging.info("Serving with the fused preprocessing kernel")
+
+                # the bundle manifest records the exact column order the preprocessor was fitted on
+                required_columns = self.get_required_columns()
+                if manifest is not None:
+                    if manifest.get("columns"):
+                        required_columns = manifest["columns"]
+                    if manifest.get("schema_sha256") != get_file_hash(self.schema_file_path):
+                        logging.warning(f"Model {manifest.get('version')} was trained against a different schema file")
+
+                self._loaded_model = LoadedModel(
+                    model_path=best_model_path,
+                    model=model,
+                    preprocessor=model.preprocesser,
+                    required_columns=required_columns,
+                    manifest=manifest
+                )
+                logging.info(f"Model cache now serving: {best_model_path}")
+                return True
+
+        except Exception as e:
+            logging.error(f"Error while refreshing model cache: {str(e)}")
+            raise SensorException(f"Error while refreshing model cache: {str(e)}", sys)
+
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep serving the previous model, the next poll will retry
+                logging.error(f"Model cache reload failed: {str(e)}")
+
+
+    def start(self) -> None:
+        """
+        This method is responsible for the initial load and for starting the background reload thread
+        """
+        try:
+            self.get_required_columns()
+            try:
+                self.refresh()
+            except SensorException as e:
+                logging.error(f"Initial model load failed, will retry in background: {str(e)}")
+
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stop_event.clear()
+                self._watcher = threading.Thread(target=self._watch, name="model-cache-watcher", daemon=True)
+                self._watcher.start()
+
+        except Exception as e:
+            raise SensorException(f"Error while starting model cache: {str(e)}", sys)
+
+
+    def stop(self) -> None:
+        """
+        This method is responsible for stopping the background reload thread
+        """
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.refresh_interval)
+            self._watcher = None
@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from threadpoolctl import threadpool_limits
+
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.ml.metric.classification_metric import get_classification_score, get_misclassification_cost
+from sensor.ml.model.hyperparameter_search import get_available_cores
+from sensor.ml.model.training_engine import train_booster, get_validation_split
+from sensor.utils.main_utils import load_numpy_array_data, load_object, save_object, write_yaml_file
+
+LATENCY_SAMPLE_ROWS = 1000
+LATENCY_REPEATS = 5
+
+
+def fit_candidate(candidate: dict, features: np.ndarray, target: np.ndarray, nthread: int,
+                  positive_weight: Optional[float], engine_settings: dict, random_state: int):
+    """
+    This function is responsible for fitting one candidate on the (memory mapped) train split.
+    xgboost candidates go through the training engine, the sklearn ones get the positive class weight as sample weights.
+    """
+    estimator, params = candidate["estimator"], dict(candidate.get("params") or {})
+
+    if estimator == 'xgboost':
+        if positive_weight is not None:
+            params["scale_pos_weight"] = positive_weight
+        engine_settings = dict(engine_settings)
+        # candidates train at the same time, each one caches its external memory pages apart
+        if engine_settings.get("cache_dir") is not None:
+            engine_settings["cache_dir"] = os.path.join(engine_settings["cache_dir"], candidate["name"])
+        model, _ = train_booster(features, target, params, nthread=nthread, random_state=random_state,
+                                 **engine_settings)
+        return model
+
+    if estimator == 'hist_gradient_boosting':
+        model = HistGradientBoostingClassifier(random_state=random_state, **params)
+    elif estimator == 'logistic_regression':
+        model = LogisticRegression(random_state=random_state, **params)
+    else:
+        raise ValueError(f"Unsupported candidate estimator: {estimator}")
+
+    sample_weight = None
+    if positive_weight is not None:
+        sample_weight = np.where(np.asarray(target) == 1, positive_weight, 1.0)
+    with threadpool_limits(limits=nthread):
+        model.fit(features, target, sample_weight=sample_weight)
+    return model
+
+
+def run_candidate(candidate: dict, model_file_path: str, nthread: int, positive_weight: Optional[float],
+                  engine_settings: dict, random_state: int, false_positive_cost: float, false_negative_cost: float,
+                  validation_ratio: float, train_feature_file_path: str, train_target_file_path: str) -> dict:
+    """
+    This function is responsible for fitting one candidate on the train fold of the train split and scoring it
+    on the validation fold held out of it. It runs inside a pool worker and only receives file paths,
+    the fitted model is written to model_file_path
+    """
+    start_time = time.perf_counter()
+    x_train = load_numpy_array_data(train_feature_file_path, mmap_mode='r')
+    y_train = np.asarray(load_numpy_array_data(train_target_file_path, mmap_mode='r'))
+    train_index, validation_index = get_validation_split(y_train, validation_ratio, random_state)
+    model = fit_candidate(candidate, x_train[train_index], y_train[train_index], nthread, positive_weight,
+                          engine_settings, random_state)
+    fit_seconds = time.perf_counter() - start_time
+
+    y_validation = y_train[validation_index]
+    with threadpool_limits(limits=nthread):
+        y_pred = np.asarray(model.predict(x_train[validation_index]))
+    save_object(model_file_path, obj=model)
+
+    metric = get_classification_score(y_true=y_validation, y_pred=y_pred)
+    return {
+        "name": candidate["name"],
+        "estimator": candidate["estimator"],
+        "params": dict(candidate.get("params") or {}),
+        "cost": get_misclassification_cost(y_validation, y_pred, false_positive_cost, false_negative_cost),
+        "false_positives": int(np.sum((y_pred == 1) & (y_validation == 0))),
+        "false_negatives": int(np.sum((y_pred == 0) & (y_validation == 1))),
+        "f1_score": float(metric.f1_score),
+        "fit_seconds": round(fit_seconds, 3),
+        "model_file_path": model_file_path,
+    }
+
+
+def measure_latency(model, features: np.ndarray, nthread: int = 1, repeats: int = LATENCY_REPEATS) -> float:
+    """
+    This function is responsible for the per row inference latency of model in microseconds,
+    the median over repeats of predicting one batch of rows divided by the batch size
+    """
+    features = np.ascontiguousarray(features)
+    timings = []
+    with threadpool_limits(limits=nthread):
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            model.predict(features)
+            timings.append(time.perf_counter() - start_time)
+    return float(np.median(timings) / max(len(features), 1) * 1e6)
+
+
+class ModelZoo:
+
+    """
+    This class is responsible for training several candidate estimators concurrently and picking one.
+    Candidates are fitted on a process pool sized so that workers x threads per worker never exceeds the cores,
+    every worker maps the same train split from disk. A validation fold of validation_ratio is held out of the
+    train split, candidates are fitted on the rest and scored on it with the APS misclassification cost, then their
+    per row latency is measured one at a time so they do not compete for cores. The test split is left to the final
+    report. The cheapest candidate within latency_budget_us is selected, the fastest one when none is,
+    and refitted on the whole train split.
+    """
+
+    def __init__(self, candidates: List[dict], models_dir: str, latency_budget_us: float,
+                 false_positive_cost: float = 10, false_negative_cost: float = 500, n_workers: int = 0,
+                 validation_ratio: float = 0.2, engine_settings: Optional[dict] = None,
+                 random_state: int = 42) -> None:
+        try:
+            self.candidates = candidates
+            self.models_dir = models_dir
+            self.latency_budget_us = latency_budget_us
+            self.false_positive_cost = false_positive_cost
+            self.false_negative_cost = false_negative_cost
+            self.n_cores = get_available_cores()
+            self.n_workers = min(n_workers, self.n_cores) if n_workers > 0 else self.n_cores
+            self.validation_ratio = validation_ratio
+            self.engine_settings = engine_settings or {}
+            self.random_state = random_state
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing ModelZoo: {str(e)}", sys)
+
+
+    def fit_candidates(self, positive_weight: Optional[float], train_feature_file_path: str,
+                       train_target_file_path: str) -> List[dict]:
+        n_workers = min(self.n_workers, len(self.candidates))
+        nthread = max(1, self.n_cores // n_workers)
+        logging.info(f"Training {len(self.candidates)} candidates on {n_workers} workers x {nthread} threads")
+
+        candidate_arguments = [
+            (candidate, os.path.join(self.models_dir, f"{candidate['name']}.pkl"), nthread, positive_weight,
+             self.engine_settings, self.random_state, self.false_positive_cost, self.false_negative_cost,
+             self.validation_ratio, train_feature_file_path, train_target_file_path)
+            for candidate in self.candidates
+        ]
+        if n_workers == 1:
+            return [run_candidate(*arguments) for arguments in candidate_arguments]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(run_candidate, *arguments) for arguments in candidate_arguments]
+            for future in as_completed(futures):
+                results.append(future.result())
+                logging.info(f"Candidate {results[-1]['name']} cost: {results[-1]['cost']:.0f} "
+                             f"in {results[-1]['fit_seconds']}s")
+        return results
+
+
+    def refit_selected(self, selected: dict, positive_weight: Optional[float], train_feature_file_path: str,
+                       train_target_file_path: str) -> None:
+        """
+        This method is responsible for refitting the selected candidate on the whole train split with every core,
+        it replaces the fold model at the selected model_file_path
+        """
+        x_train = load_numpy_array_data(train_feature_file_path, mmap_mode='r')
+        y_train = load_numpy_array_data(train_target_file_path, mmap_mode='r')
+        candidate = next(candidate for candidate in self.candidates if candidate["name"] == selected["name"])
+        model = fit_candidate(candidate, x_train, y_train, self.n_cores, positive_weight, self.engine_settings,
+                              self.random_state)
+        save_object(selected["model_file_path"], obj=model)
+
+
+    def rank(self, results: List[dict]) -> List[dict]:
+        """
+        This method is responsible for ordering candidates within the latency budget first, each group by cost
+        then latency, and flagging the selected one
+        """
+        ranked = sorted(results, key=lambda result: (not result["within_latency_budget"], result["cost"],
+                                                     result["latency_us_per_row"]))
+        if not ranked[0]["within_latency_budget"]:
+            logging.warning(f"No candidate within the latency budget of {self.latency_budget_us}us per row, "
+                            "selecting the fastest one")
+            ranked = sorted(ranked, key=lambda result: result["latency_us_per_row"])
+        for position, result in enumerate(ranked):
+            result["rank"] = position + 1
+            result["selected"] = position == 0
+        return ranked
+
+
+    def run(self, train_feature_file_path: str, train_target_file_path: str, positive_weight: Optional[float] = None,
+            report_file_path: Optional[str] = None) -> List[dict]:
+        """
+        This method is responsible for fitting, scoring and ranking every candidate on the train split, returns
+        the ranked candidates with the selected one first
+        """
+        try:
+            start_time = time.perf_counter()
+            results = self.fit_candidates(positive_weight, train_feature_file_path, train_target_file_path)
+
+            x_train = load_numpy_array_data(train_feature_file_path, mmap_mode='r')
+            y_train = np.asarray(load_numpy_array_data(train_target_file_path, mmap_mode='r'))
+            _, validation_index = get_validation_split(y_train, self.validation_ratio, self.random_state)
+            latency_sample = np.asarray(x_train[validation_index[:LATENCY_SAMPLE_ROWS]])
+            for result in results:
+                model = load_object(result["model_file_path"])
+                result["latency_us_per_row"] = round(measure_latency(model, latency_sample), 3)
+                result["within_latency_budget"] = result["latency_us_per_row"] <= self.latency_budget_us
+
+            ranked = self.rank(results)
+            self.refit_selected(ranked[0], positive_weight, train_feature_file_path, train_target_file_path)
+            logging.info(f"Model zoo finished in {time.perf_counter() - start_time:.2f}s, selected {ranked[0]['name']} "
+                         f"with cost {ranked[0]['cost']:.0f} at {ranked[0]['latency_us_per_row']}us per row")
+            if report_file_path is not None:
+                write_yaml_file(report_file_path, {"latency_budget_us": self.latency_budget_us,
+                                                   "candidates": ranked}, replace=True)
+            return ranked
+
+        except Exception as e:
+            logging.error(f"Error while running model zoo: {str(e)}")
+            raise SensorException(f"Error while running model zoo: {str(e)}", sys)
@@ -0,0 +1,257 @@
+import os
+import shutil
+import sys
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import xgboost as xgb
+
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.utils.main_utils import get_peak_memory_mb
+
+TRAINING_EVAL_METRIC = 'logloss'
+PREDICT_BATCH_ROWS = 100000
+
+
+def get_validation_split(y: np.ndarray, validation_ratio: float, random_state: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function is responsible for a stratified, shuffled split of row indices into train and validation
+    """
+    rng = np.random.default_rng(random_state)
+    validation_index = []
+    for label in np.unique(y):
+        rows = rng.permutation(np.flatnonzero(y == label))
+        validation_index.append(rows[:int(round(len(rows) * validation_ratio))])
+    validation_index = np.sort(np.concatenate(validation_index))
+    is_validation = np.zeros(len(y), dtype=bool)
+    is_validation[validation_index] = True
+    return np.flatnonzero(~is_validation), validation_index
+
+
+class ArrayBatchIter(xgb.DataIter):
+
+    """
+    This class is responsible for feeding the rows at index of (memory mapped) features and target
+    to XGBoost in batches of batch_rows, so only one gathered batch is in memory at a time
+    """
+
+    def __init__(self, features: np.ndarray, target: np.ndarray, index: np.ndarray, batch_rows: int,
+                 cache_prefix: Optional[str] = None) -> None:
+        self.features = features
+        self.target = target
+        self.index = index
+        self.batch_rows = batch_rows
+        self._position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+
+    def next(self, input_data) -> int:
+        if self._position >= len(self.index):
+            return 0
+        rows = self.index[self._position:self._position + self.batch_rows]
+        input_data(data=np.asarray(self.features[rows]), label=np.asarray(self.target[rows]))
+        self._position += self.batch_rows
+        return 1
+
+
+    def reset(self) -> None:
+        self._position = 0
+
+
+def build_dmatrix(features: np.ndarray, target: np.ndarray, index: np.ndarray, mode: str = 'in_memory',
+                  nthread: int = 1, max_bin: int = 256, batch_rows: int = 100000, cache_dir: Optional[str] = None,
+                  ref: Optional[xgb.DMatrix] = None) -> xgb.DMatrix:
+    """
+    This function is responsible for building the training matrix of the rows at index.
+    in_memory builds a QuantileDMatrix from batches, the features are quantised to max_bin bins as they stream in
+    and never gathered at full precision. external_memory builds a DMatrix whose pages are cached under cache_dir.
+    XGBoost releases without QuantileDMatrix get a plain DMatrix of the gathered rows.
+    """
+    try:
+        if mode == 'external_memory':
+            os.makedirs(cache_dir, exist_ok=True)
+            iterator = ArrayBatchIter(features, target, index, batch_rows, cache_prefix=os.path.join(cache_dir, "cache"))
+            return xgb.DMatrix(iterator, nthread=nthread)
+
+        if mode != 'in_memory':
+            raise ValueError(f"Unsupported training mode: {mode}")
+
+        # a validation matrix is quantised with the bins of its training matrix, or kept plain when that is not quantised
+        if hasattr(xgb, "QuantileDMatrix") and (ref is None or isinstance(ref, xgb.QuantileDMatrix)):
+            iterator = ArrayBatchIter(features, target, index, batch_rows)
+            return xgb.QuantileDMatrix(iterator, max_bin=max_bin, nthread=nthread, ref=ref)
+        return xgb.DMatrix(np.asarray(features[index]), label=np.asarray(target[index]), nthread=nthread)
+
+    except Exception as e:
+        raise SensorException(f"Error while building DMatrix: {str(e)}", sys)
+
+
+class BoosterClassifier:
+
+    """
+    This class is responsible for serving a trained booster with the predict interface SensorModel expects.
+    The booster is cut at the best iteration, predictions are made in batches of PREDICT_BATCH_ROWS.
+    """
+
+    def __init__(self, booster: xgb.Booster, threshold: float = 0.5) -> None:
+        self.booster = booster
+        self.threshold = threshold
+
+
+    def get_booster(self) -> xgb.Booster:
+        return self.booster
+
+
+    def predict_proba(self, x) -> np.ndarray:
+        x = np.asarray(x) if not hasattr(x, "iloc") else x.to_numpy()
+        positive = np.concatenate([
+            self.booster.predict(xgb.DMatrix(np.asarray(x[start:start + PREDICT_BATCH_ROWS])))
+            for start in range(0, len(x), PREDICT_BATCH_ROWS)
+        ]) if len(x) else np.empty(0, dtype=np.float32)
+        return np.stack([1 - positive, positive], axis=1)
+
+
+    def predict(self, x) -> np.ndarray:
+        return (self.predict_proba(x)[:, 1] >= self.threshold).astype(np.int64)
+
+
+def train_booster(features: np.ndarray, target: np.ndarray, params: dict, num_boost_round: int = 500,
+                  early_stopping_rounds: int = 20, validation_ratio: float = 0.2, mode: str = 'in_memory',
+                  nthread: int = 1, max_bin: int = 256, batch_rows: int = 100000, cache_dir: Optional[str] = None,
+                  random_state: int = 42) -> Tuple[BoosterClassifier, dict]:
+    """
+    This function is responsible for training a hist booster that early stops on a validation fold
+    held out of features, the matrices are built once. Returns the classifier and a report of
+    the time spent building matrices and training and of the peak memory.
+    """
+    try:
+        start_time = time.perf_counter()
+        train_index, validation_index = get_validation_split(np.asarray(target), validation_ratio, random_state)
+
+        dtrain = build_dmatrix(features, target, train_index, mode=mode, nthread=nthread, max_bin=max_bin,
+                               batch_rows=batch_rows, cache_dir=cache_dir)
+        # the validation fold is small, it is always held in memory
+        dvalidation = build_dmatrix(features, target, validation_index, nthread=nthread, max_bin=max_bin,
+                                    batch_rows=batch_rows, ref=dtrain)
+        dmatrix_seconds = time.perf_counter() - start_time
+
+        booster = xgb.train(
+            {**params, "objective": "binary:logistic", "eval_metric": TRAINING_EVAL_METRIC,
+             "tree_method": "hist", "max_bin": max_bin, "nthread": nthread, "seed": random_state},
+            dtrain,
+            num_boost_round=num_boost_round,
+            evals=[(dvalidation, "validation")],
+            early_stopping_rounds=early_stopping_rounds,
+            verbose_eval=False
+        )
+        best_iteration = int(booster.best_iteration)
+        best_score = float(booster.best_score)
+        booster = booster[:best_iteration + 1]
+        # the external memory pages are only released with the matrices
+        del dtrain, dvalidation
+
+        report = {
+            "mode": mode,
+            "xgboost_version": xgb.__version__,
+            "train_rows": int(len(train_index)),
+            "validation_rows": int(len(validation_index)),
+            "nthread": nthread,
+            "max_bin": max_bin,
+            "best_iteration": best_iteration,
+            f"validation_{TRAINING_EVAL_METRIC}": best_score,
+            "dmatrix_seconds": round(dmatrix_seconds, 3),
+            "train_seconds": round(time.perf_counter() - start_time - dmatrix_seconds, 3),
+            "peak_memory_mb": round(get_peak_memory_mb(), 1),
+        }
+        logging.info(f"Training report: {report}")
+        return BoosterClassifier(booster), report
+
+    except Exception as e:
+        raise SensorException(f"Error while training booster: {str(e)}", sys)
+
+    finally:
+        if mode == 'external_memory' and cache_dir is not None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def update_booster(booster: xgb.Booster, features: np.ndarray, target: np.ndarray, params: dict,
+                   strategy: str = 'continue', num_boost_round: int = 50, early_stopping_rounds: int = 20,
+                   validation_ratio: float = 0.2, nthread: int = 1, max_bin: int = 256, batch_rows: int = 100000,
+                   random_state: int = 42) -> Tuple[BoosterClassifier, dict]:
+    """
+    This function is responsible for warm starting a trained booster on new rows only.
+    continue adds up to num_boost_round trees that early stop on a validation fold held out of the new rows,
+    refresh keeps the trees and only refits their leaf values on the new rows.
+    The validation fold is split as in train_booster so callers can score it with get_validation_split.
+    """
+    try:
+        start_time = time.perf_counter()
+        base_rounds = int(booster.num_boosted_rounds())
+        train_index, validation_index = get_validation_split(np.asarray(target), validation_ratio, random_state)
+        train_params = {**params, "objective": "binary:logistic", "eval_metric": TRAINING_EVAL_METRIC,
+                        "nthread": nthread, "seed": random_state}
+
+        if strategy == 'continue':
+            dtrain = build_dmatrix(features, target, train_index, nthread=nthread, max_bin=max_bin, batch_rows=batch_rows)
+            dvalidation = build_dmatrix(features, target, validation_index, nthread=nthread, max_bin=max_bin,
+                                        batch_rows=batch_rows, ref=dtrain)
+            dmatrix_seconds = time.perf_counter() - start_time
+            booster = xgb.train(
+                {**train_params, "tree_method": "hist", "max_bin": max_bin},
+                dtrain,
+                num_boost_round=num_boost_round,
+                evals=[(dvalidation, "validation")],
+                early_stopping_rounds=early_stopping_rounds,
+                xgb_model=booster,
+                verbose_eval=False
+            )
+            # best_iteration counts the trees of the base booster too
+            best_iteration = int(booster.best_iteration)
+            best_score = float(booster.best_score)
+            booster = booster[:best_iteration + 1]
+
+        elif strategy == 'refresh':
+            # the refresh updater reads raw values, it is not implemented for quantised matrices
+            dtrain = xgb.DMatrix(np.asarray(features[train_index]), label=np.asarray(target[train_index]), nthread=nthread)
+            dvalidation = xgb.DMatrix(np.asarray(features[validation_index]),
+                                      label=np.asarray(target[validation_index]), nthread=nthread)
+            dmatrix_seconds = time.perf_counter() - start_time
+            evals_result = {}
+            booster = xgb.train(
+                {**train_params, "process_type": "update", "updater": "refresh", "refresh_leaf": True},
+                dtrain,
+                num_boost_round=base_rounds,
+                evals=[(dvalidation, "validation")],
+                evals_result=evals_result,
+                xgb_model=booster,
+                verbose_eval=False
+            )
+            best_iteration = base_rounds - 1
+            best_score = float(evals_result["validation"][TRAINING_EVAL_METRIC][-1])
+
+        else:
+            raise ValueError(f"Unsupported incremental strategy: {strategy}")
+
+        del dtrain, dvalidation
+
+        report = {
+            "mode": strategy,
+            "xgboost_version": xgb.__version__,
+            "train_rows": int(len(train_index)),
+            "validation_rows": int(len(validation_index)),
+            "nthread": nthread,
+            "max_bin": max_bin,
+            "base_rounds": base_rounds,
+            "best_iteration": best_iteration,
+            f"validation_{TRAINING_EVAL_METRIC}": best_score,
+            "dmatrix_seconds": round(dmatrix_seconds, 3),
+            "train_seconds": round(time.perf_counter() - start_time - dmatrix_seconds, 3),
+            "peak_memory_mb": round(get_peak_memory_mb(), 1),
+        }
+        logging.info(f"Incremental training report: {report}")
+        return BoosterClassifier(booster), report
+
+    except Exception as e:
+        raise SensorException(f"Error while updating booster: {str(e)}", sys)
@@ -0,0 +1,185 @@
+import sys
+from functools import partial
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from sensor.exception import SensorException
+
+RESAMPLING_STRATEGIES = ['smote_tomek', 'chunked_smote_tomek', 'approximate_smote_tomek', 'class_weight', 'none']
+SMOTE_K_NEIGHBORS = 5
+APPROXIMATE_KNN_PROBES = 16
+APPROXIMATE_KNN_SAMPLE_PER_LIST = 32
+APPROXIMATE_KNN_KMEANS_ITERATIONS = 5
+
+
+def chunked_kneighbors(X: np.ndarray, n_neighbors: int, chunk_mb: int = 64, Y: Optional[np.ndarray] = None,
+                       query_index: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    This function is responsible for the exact n_neighbors nearest neighbours of every row of X among the rows of Y
+    (X itself by default, each row excluded from its own neighbours). Rows are ranked by |y|^2 - 2 x.y, the squared
+    euclidean distance without the constant |x|^2, so each block of query rows costs one multithreaded matrix product
+    and one pass over its distances, and every block stays within chunk_mb.
+    With Y given, query_index holds the position of each X row in Y so it can still be excluded.
+    """
+    try:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if Y is None:
+            Y, query_index = X, np.arange(len(X))
+        n_neighbors = min(n_neighbors, len(Y) - (query_index is not None))
+        scaled_Y = -2 * np.ascontiguousarray(Y, dtype=np.float32)
+        squared_norms = np.einsum('ij,ij->i', scaled_Y, scaled_Y) / 4
+        indices = np.empty((len(X), n_neighbors), dtype=np.int64)
+        chunk_rows = max(1, chunk_mb * 1024 ** 2 // (4 * len(Y)))
+
+        for start in range(0, len(X), chunk_rows):
+            stop = min(start + chunk_rows, len(X))
+            distances = X[start:stop] @ scaled_Y.T
+            distances += squared_norms
+            if query_index is not None:
+                distances[np.arange(stop - start), query_index[start:stop]] = np.inf
+
+            if n_neighbors == 1:
+                indices[start:stop, 0] = np.argmin(distances, axis=1)
+                continue
+            nearest = np.argpartition(distances, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            order = np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+            indices[start:stop] = np.take_along_axis(nearest, order, axis=1)
+        return indices
+
+    except Exception as e:
+        raise SensorException(f"Error while searching nearest neighbours: {str(e)}", sys)
+
+
+def approximate_kneighbors(X: np.ndarray, n_neighbors: int, n_probe: int = APPROXIMATE_KNN_PROBES,
+                           chunk_mb: int = 64, random_state: Optional[int] = None) -> np.ndarray:
+    """
+    This function is responsible for approximate nearest neighbours of every row of X, itself excluded.
+    Rows are clustered into about sqrt(rows) cells with a few k-means steps on a sample (an inverted file index),
+    each row is then compared exactly with the rows of the n_probe cells closest to its own,
+    which brings the search from rows^2 to about rows^1.5 distance computations.
+    """
+    try:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = len(X)
+        n_lists = int(np.sqrt(n_rows))
+        if n_lists <= n_probe:
+            return chunked_kneighbors(X, n_neighbors, chunk_mb)
+
+        rng = np.random.default_rng(random_state)
+        sample = X[rng.choice(n_rows, size=min(n_rows, n_lists * APPROXIMATE_KNN_SAMPLE_PER_LIST), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(APPROXIMATE_KNN_KMEANS_ITERATIONS):
+            assignment = chunked_kneighbors(sample, 1, chunk_mb, Y=centroids)[:, 0]
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            centroids[counts > 0] = sums[counts > 0] / counts[counts > 0, None]
+
+        assignment = chunked_kneighbors(X, 1, chunk_mb, Y=centroids)[:, 0]
+        probes = np.concatenate([
+            np.arange(n_lists)[:, None], chunked_kneighbors(centroids, n_probe - 1, chunk_mb)
+        ], axis=1) if n_probe > 1 else np.arange(n_lists)[:, None]
+
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        members = [order[bounds[cell]:bounds[cell + 1]] for cell in range(n_lists)]
+
+        indices = np.empty((n_rows, min(n_neighbors, n_rows - 1)), dtype=np.int64)
+        for cell in range(n_lists):
+            queries = members[cell]
+            if len(queries) == 0:
+                continue
+            candidates = np.concatenate([members[probe] for probe in probes[cell]])
+            if len(candidates) <= indices.shape[1]:
+                candidates = np.arange(n_rows)
+            # the queries are the first rows of their own cell's candidates
+            query_index = np.arange(len(queries)) if len(candidates) < n_rows else queries
+            indices[queries] = candidates[
+                chunked_kneighbors(X[queries], indices.shape[1], chunk_mb, Y=X[candidates], query_index=query_index)
+            ]
+        return indices
+
+    except Exception as e:
+        raise SensorException(f"Error while searching approximate nearest neighbours: {str(e)}", sys)
+
+
+def smote(X: np.ndarray, y: np.ndarray, kneighbors: Callable = chunked_kneighbors,
+          random_state: Optional[int] = None, k_neighbors: int = SMOTE_K_NEIGHBORS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function is responsible for oversampling the minority class up to the majority count,
+    as SMOTE(sampling_strategy='minority'): every new row lies between a random minority row
+    and one of its k nearest minority neighbours, as found by kneighbors
+    """
+    try:
+        classes, counts = np.unique(y, return_counts=True)
+        minority = classes[np.argmin(counts)]
+        n_new = counts.max() - counts.min()
+        minority_rows = X[y == minority]
+        if n_new == 0 or len(minority_rows) < 2:
+            return X, y
+
+        rng = np.random.default_rng(random_state)
+        neighbors = kneighbors(minority_rows, k_neighbors)
+        base = rng.integers(0, len(minority_rows), size=n_new)
+        neighbor = neighbors[base, rng.integers(0, neighbors.shape[1], size=n_new)]
+        gap = rng.random((n_new, 1), dtype=np.float32)
+
+        new_rows = minority_rows[base] + gap * (minority_rows[neighbor] - minority_rows[base])
+        return np.concatenate([X, new_rows.astype(X.dtype)]), np.concatenate([y, np.full(n_new, minority, dtype=y.dtype)])
+
+    except Exception as e:
+        raise SensorException(f"Error while oversampling with SMOTE: {str(e)}", sys)
+
+
+def tomek_links(X: np.ndarray, y: np.ndarray, kneighbors: Callable = chunked_kneighbors) -> np.ndarray:
+    """
+    This function is responsible for flagging the rows in a Tomek link,
+    pairs of rows from different classes that are each other's nearest neighbour
+    """
+    nearest = kneighbors(X, 1)[:, 0]
+    return (y[nearest] != y) & (nearest[nearest] == np.arange(len(y)))
+
+
+def resample(X: np.ndarray, y: np.ndarray, strategy: str, n_jobs: Optional[int] = None,
+             random_state: Optional[int] = None, chunk_mb: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function is responsible for rebalancing the train split with the configured strategy.
+    smote_tomek is imblearn's exact SMOTETomek with its neighbour searches on n_jobs workers,
+    chunked_smote_tomek is the same combination on chunked BLAS neighbour search in float32,
+    approximate_smote_tomek runs it on the inverted file search of approximate_kneighbors,
+    class_weight and none return the data unchanged, the imbalance is then left to the model.
+    """
+    try:
+        y = np.asarray(y)
+        if strategy == 'smote_tomek':
+            from imblearn.combine import SMOTETomek
+            from imblearn.over_sampling import SMOTE
+            from imblearn.under_sampling import TomekLinks
+            from sklearn.neighbors import NearestNeighbors
+
+            smt = SMOTETomek(
+                sampling_strategy='minority',
+                smote=SMOTE(sampling_strategy='minority', random_state=random_state,
+                            k_neighbors=NearestNeighbors(n_neighbors=SMOTE_K_NEIGHBORS + 1, n_jobs=n_jobs)),
+                tomek=TomekLinks(sampling_strategy='all', n_jobs=n_jobs),
+                random_state=random_state
+            )
+            return smt.fit_resample(X, y)
+
+        if strategy in ('chunked_smote_tomek', 'approximate_smote_tomek'):
+            if strategy == 'chunked_smote_tomek':
+                kneighbors = partial(chunked_kneighbors, chunk_mb=chunk_mb)
+            else:
+                kneighbors = partial(approximate_kneighbors, chunk_mb=chunk_mb, random_state=random_state)
+            X, y = smote(X, y, kneighbors=kneighbors, random_state=random_state)
+            keep = ~tomek_links(X, y, kneighbors=kneighbors)
+            return X[keep], y[keep]
+
+        if strategy in ('class_weight', 'none'):
+            return X, y
+
+        raise ValueError(f"Unsupported resampling strategy: {strategy}, expected one of {RESAMPLING_STRATEGIES}")
+
+    except Exception as e:
+        raise SensorException(f"Error while resampling: {str(e)}", sys)
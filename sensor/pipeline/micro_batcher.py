@@ -0,0 +1,119 @@
+import asyncio
+import sys
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from sensor.constant.application import MICRO_BATCH_MAX_BATCH_ROWS, MICRO_BATCH_MAX_WAIT_MS
+from sensor.exception import SensorException
+from sensor.logger import logging
+
+
+class MicroBatcher:
+
+    """
+    This class is responsible for gathering concurrent small prediction requests into one model call.
+    A batch is flushed once it holds max_batch_rows rows or max_wait_ms has passed since its first request.
+    """
+
+    def __init__(self, predict_fn: Callable[[pd.DataFrame], np.ndarray],
+                 max_batch_rows: int = MICRO_BATCH_MAX_BATCH_ROWS,
+                 max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS,
+                 executor: Optional[Executor] = None) -> None:
+        try:
+            self.predict_fn = predict_fn
+            self.executor = executor
+            self.max_batch_rows = max_batch_rows
+            self.max_wait = max_wait_ms / 1000.0
+
+            self._queue: Optional[asyncio.Queue] = None
+            self._worker: Optional[asyncio.Task] = None
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing MicroBatcher: {str(e)}", sys)
+
+
+    async def start(self) -> None:
+        """
+        This method is responsible for starting the batching task on the running event loop if it is not running
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+
+    async def stop(self) -> None:
+        """
+        This method is responsible for cancelling the batching task
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+    async def submit(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        This method is responsible for queueing one prepared frame and waiting for its slice of the batch result
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((df, future))
+        return await future
+
+
+    async def _collect(self) -> List[Tuple[pd.DataFrame, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+
+        while rows < self.max_batch_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+
+        return batch
+
+
+    def predict_batch(self, frames: List[pd.DataFrame]) -> np.ndarray:
+        """
+        This method is responsible for stacking the frames of a batch and predicting them in one call,
+        it runs on the executor so the copy of the concat does not block the event loop
+        """
+        return self.predict_fn(pd.concat(frames, axis=0, ignore_index=True))
+
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            futures = [future for _, future in batch]
+            try:
+                frames = [df for df, _ in batch]
+                y_pred = await loop.run_in_executor(self.executor, self.predict_batch, frames)
+
+                offset = 0
+                for df, future in batch:
+                    if not future.done():
+                        future.set_result(y_pred[offset:offset + len(df)])
+                    offset += len(df)
+
+                logging.info(f"Micro batch predicted {len(batch)} requests with {offset} rows")
+
+            except Exception as e:
+                logging.error(f"Error while predicting micro batch: {str(e)}")
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(SensorException(f"Error while predicting micro batch: {str(e)}", sys))
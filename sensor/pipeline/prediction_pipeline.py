@@ -0,0 +1,109 @@
+import sys
+from typing import IO, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from sensor.constant.application import PREDICTION_CHUNK_SIZE, PREDICTION_COLUMN_NAME
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.ml.model.estimater import TargetValueMapping
+from sensor.ml.model.model_cache import LoadedModel
+
+
+class PredictionPipeline:
+
+    """
+    This class is responsible for running a cached model over uploaded sensor data
+    """
+
+    def __init__(self, loaded_model: LoadedModel, chunk_size: int = PREDICTION_CHUNK_SIZE) -> None:
+        try:
+            self.loaded_model = loaded_model
+            self.chunk_size = chunk_size
+            self.target_mapping = TargetValueMapping().reverse_mapping()
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing PredictionPipeline: {str(e)}", sys)
+
+
+    def get_missing_columns(self, columns) -> List[str]:
+        """
+        This method is responsible for listing the required columns absent from the input
+        """
+        return [col for col in self.loaded_model.required_columns if col not in columns]
+
+
+    def prepare_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        This method is responsible for selecting the schema columns and replacing the 'na' sentinel
+        """
+        try:
+            required_columns = self.loaded_model.required_columns
+            if list(df.columns) != required_columns:
+                df = df.reindex(columns=required_columns)
+
+            if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+                # only text payloads carry the 'na' sentinel
+                df = df.replace('na', np.nan)
+            return df
+
+        except Exception as e:
+            raise SensorException(f"Error while preparing dataframe: {str(e)}", sys)
+
+
+    def attach_predictions(self, df: pd.DataFrame, y_pred) -> pd.DataFrame:
+        """
+        This method is responsible for attaching mapped predictions to a prepared frame
+        """
+        try:
+            df[PREDICTION_COLUMN_NAME] = pd.Series(y_pred, index=df.index).map(self.target_mapping)
+            return df
+
+        except Exception as e:
+            raise SensorException(f"Error while attaching predictions: {str(e)}", sys)
+
+
+    def predict_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        This method is responsible for predicting one frame and attaching the mapped predictions
+        """
+        try:
+            df = self.prepare_dataframe(df)
+            y_pred = self.loaded_model.model.predict(df)
+            return self.attach_predictions(df, y_pred)
+
+        except Exception as e:
+            raise SensorException(f"Error while predicting dataframe: {str(e)}", sys)
+
+
+    def read_csv_chunks(self, file_obj: IO) -> Iterator[pd.DataFrame]:
+        """
+        This method is responsible for reading an uploaded csv in bounded row chunks
+        """
+        try:
+            return iter(pd.read_csv(file_obj, chunksize=self.chunk_size))
+
+        except Exception as e:
+            raise SensorException(f"Error while reading csv chunks: {str(e)}", sys)
+
+
+    def stream_csv(self, first_chunk: pd.DataFrame, chunks: Iterator[pd.DataFrame]) -> Iterator[str]:
+        """
+        This method is responsible for yielding csv text for every chunk as soon as it is predicted,
+        so peak memory depends on the chunk size and not on the upload size
+        """
+        try:
+            rows = 0
+            yield self.predict_dataframe(first_chunk).to_csv(index=False, header=True)
+            rows += len(first_chunk)
+
+            for chunk in chunks:
+                yield self.predict_dataframe(chunk).to_csv(index=False, header=False)
+                rows += len(chunk)
+
+            logging.info(f"Streamed predictions for {rows} rows")
+
+        except Exception as e:
+            logging.error(f"Error while streaming predictions: {str(e)}")
+            raise SensorException(f"Error while streaming predictions: {str(e)}", sys)
@@ -0,0 +1,247 @@
+import fcntl
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sensor.constant.training_pipeline import (TRAINING_JOB_DIR, TRAINING_JOB_LOCK_FILE_NAME,
+                                               TRAINING_JOB_STATUS_FAILED, TRAINING_JOB_STATUS_QUEUED,
+                                               TRAINING_JOB_STATUS_REJECTED, TRAINING_JOB_STATUS_RUNNING,
+                                               TRAINING_JOB_STATUS_SUCCEEDED, TRAINING_PIPELINE_STAGES)
+from sensor.exception import SensorException
+from sensor.logger import logging
+from sensor.pipeline.training_pipeline import TrainPipeline
+from sensor.utils.main_utils import read_yaml_file, write_yaml_file
+
+
+class TrainingJobManager:
+
+    """
+    This class is responsible for running the training pipeline as a background job.
+    Every job runs in its own worker process which holds an exclusive file lock for the whole run,
+    so only one pipeline runs at a time across all api workers sharing the job directory.
+    """
+
+    def __init__(self, job_dir: str = TRAINING_JOB_DIR) -> None:
+        try:
+            self.job_dir = job_dir
+            self.lock_file_path = os.path.join(job_dir, TRAINING_JOB_LOCK_FILE_NAME)
+            self._processes: Dict[str, subprocess.Popen] = {}
+            os.makedirs(job_dir, exist_ok=True)
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing TrainingJobManager: {str(e)}", sys)
+
+
+    def get_job_file_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.yaml")
+
+
+    def write_job(self, job: dict) -> None:
+        """
+        This method is responsible for writing job state atomically so readers never see a partial file
+        """
+        write_yaml_file(self.get_job_file_path(job["job_id"]), job, atomic=True)
+
+
+    def update_job(self, job_id: str, **fields) -> dict:
+        job = read_yaml_file(self.get_job_file_path(job_id))
+        job.update(fields)
+        self.write_job(job)
+        return job
+
+
+    def get_running_job_id(self) -> Optional[str]:
+        """
+        This method is responsible for returning the job holding the training lock, if any
+        """
+        try:
+            if not os.path.exists(self.lock_file_path):
+                return None
+
+            with open(self.lock_file_path, 'r') as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return lock_file.read().strip() or None
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return None
+
+        except Exception as e:
+            raise SensorException(f"Error while checking training lock: {str(e)}", sys)
+
+
+    def submit(self) -> dict:
+        """
+        This method is responsible for starting a training job and returning immediately.
+        If a job already holds the lock, that job is returned instead of starting a new one.
+        """
+        try:
+            self._reap_processes()
+
+            lock_file = open(self.lock_file_path, 'a+')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                running_job_id = self.get_running_job_id()
+                logging.info(f"Training job {running_job_id} is already running")
+                return self.get_job(running_job_id) or {"job_id": running_job_id, "status": TRAINING_JOB_STATUS_RUNNING}
+
+            try:
+                job_id = uuid.uuid4().hex
+                job = {
+                    "job_id": job_id,
+                    "status": TRAINING_JOB_STATUS_QUEUED,
+                    "stage": None,
+                    "completed_stages": [],
+                    "submitted_at": datetime.now().isoformat(),
+                    "started_at": None,
+                    "finished_at": None,
+                    "error": None,
+                }
+                self.write_job(job)
+                write_lock_owner(lock_file, job_id)
+
+                # the worker inherits the locked descriptor, so the lock is held from submission until it exits
+                lock_fd = lock_file.fileno()
+                self._processes[job_id] = subprocess.Popen(
+                    [sys.executable, "-m", "sensor.pipeline.training_job", job_id, self.job_dir, str(lock_fd)],
+                    pass_fds=(lock_fd,)
+                )
+                logging.info(f"Submitted training job: {job_id}")
+                return job
+
+            except Exception:
+                write_lock_owner(lock_file, "")
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                raise
+
+            finally:
+                lock_file.close()
+
+        except Exception as e:
+            logging.error(f"Error while submitting training job: {str(e)}")
+            raise SensorException(f"Error while submitting training job: {str(e)}", sys)
+
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        This method is responsible for reading job state, a running job whose worker died is reported as failed
+        """
+        try:
+            job_file_path = self.get_job_file_path(job_id)
+            if not os.path.exists(job_file_path):
+                return None
+
+            self._reap_processes()
+            job = read_yaml_file(job_file_path)
+
+            is_active = job["status"] in (TRAINING_JOB_STATUS_QUEUED, TRAINING_JOB_STATUS_RUNNING)
+            if is_active and self.get_running_job_id() != job_id:
+                job = self.update_job(job_id, status=TRAINING_JOB_STATUS_FAILED,
+                                      finished_at=datetime.now().isoformat(),
+                                      error="Training worker exited unexpectedly")
+            return job
+
+        except Exception as e:
+            raise SensorException(f"Error while reading training job: {str(e)}", sys)
+
+
+    def get_progress(self, job_id: str) -> Optional[dict]:
+        """
+        This method is responsible for summarising stage level progress of a job
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+
+        completed_stages = job.get("completed_stages", [])
+        # a succeeded job is done even when stages were skipped, as the pusher is for a rejected model
+        is_succeeded = job["status"] == TRAINING_JOB_STATUS_SUCCEEDED
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "stage": job.get("stage"),
+            "stages": [
+                {"stage": stage, "completed": stage in completed_stages,
+                 "skipped": is_succeeded and stage not in completed_stages}
+                for stage in TRAINING_PIPELINE_STAGES
+            ],
+            "progress": 1.0 if is_succeeded else round(len(completed_stages) / len(TRAINING_PIPELINE_STAGES), 2),
+        }
+
+
+    def list_jobs(self) -> List[dict]:
+        jobs = []
+        for file_name in sorted(os.listdir(self.job_dir)):
+            if file_name.endswith(".yaml"):
+                jobs.append(self.get_job(file_name[:-len(".yaml")]))
+        return sorted(jobs, key=lambda job: job["submitted_at"], reverse=True)
+
+
+    def _reap_processes(self) -> None:
+        for job_id, process in list(self._processes.items()):
+            if process.poll() is not None:
+                del self._processes[job_id]
+
+
+def write_lock_owner(lock_file, job_id: str) -> None:
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(job_id)
+    lock_file.flush()
+
+
+def run_training_job(job_id: str, job_dir: str = TRAINING_JOB_DIR, lock_fd: Optional[str] = None) -> None:
+    """
+    This function is responsible for running one training job inside the worker process.
+    lock_fd is the descriptor locked by TrainingJobManager.submit, without it the lock is taken here.
+    """
+    job_manager = TrainingJobManager(job_dir=job_dir)
+
+    if lock_fd is not None:
+        lock_file = os.fdopen(int(lock_fd), 'a+')
+    else:
+        lock_file = open(job_manager.lock_file_path, 'a+')
+
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            job_manager.update_job(job_id, status=TRAINING_JOB_STATUS_REJECTED,
+                                   finished_at=datetime.now().isoformat(),
+                                   error="Another training job is already running")
+            return
+
+        write_lock_owner(lock_file, job_id)
+
+        job_manager.update_job(job_id, status=TRAINING_JOB_STATUS_RUNNING, started_at=datetime.now().isoformat())
+        completed_stages = []
+
+        def on_stage(stage: str) -> None:
+            # model training is entered again when the warm start falls back to training from scratch
+            if stage in completed_stages:
+                completed_stages.remove(stage)
+            job = job_manager.update_job(job_id, stage=stage, completed_stages=list(completed_stages))
+            completed_stages.append(job["stage"])
+
+        try:
+            TrainPipeline(progress_callback=on_stage).run_pipeline()
+            job_manager.update_job(job_id, status=TRAINING_JOB_STATUS_SUCCEEDED, stage=None,
+                                   completed_stages=completed_stages, finished_at=datetime.now().isoformat())
+
+        except Exception as e:
+            logging.exception(e)
+            job_manager.update_job(job_id, status=TRAINING_JOB_STATUS_FAILED,
+                                   finished_at=datetime.now().isoformat(), error=str(e))
+
+        finally:
+            write_lock_owner(lock_file, "")
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+if __name__ == "__main__":
+    run_training_job(*sys.argv[1:])
@@ -11,16 +11,27 @@ from sensor.components.model_evaluation import ModelEvaluation
 from sensor.components.model_pusher import ModelPusher
 
 from sensor.constant.s3_bucket import TRAINING_BUCKET_NAME
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR
 from sensor.cloud_storage.s3_syncer import S3Sync
+from typing import Callable, Optional
 
 
 class TrainPipeline:
 
     is_pipeline_running = False
-    self.s3_sync = S3Sync()
 
-    def __init__(self):
+    def __init__(self, progress_callback: Optional[Callable[[str], None]] = None):
         self.training_pipeline_config = TrainingPipelineConfig()
+        self.s3_sync = S3Sync()
+        self.progress_callback = progress_callback
+
+
+    def report_progress(self, stage: str) -> None:
+        """
+        This method is responsible for telling the caller which stage is about to start
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(stage)
 
 
     def start_data_ingestion(self)->DataIngestionArtifact:
@@ -76,7 +87,24 @@ class TrainPipeline:
             return data_transformation_artifact
         
         except Exception as e:
-            SensorException(f"Error while starting data transformation: {str(e)}", sys)
+            logging.error(f"Error while starting data transformation: {str(e)}")
+            raise SensorException(f"Error while starting data transformation: {str(e)}", sys)
+
+
+    def start_incremental_model_training(self)-> Optional[ModelTrainerArtifact]:
+
+        try:
+            logging.info("Starting Incremental Model Training")
+            model_trainer_config = ModelTrainerConfig(training_pipeline_config=self.training_pipeline_config)
+            model_trainer = ModelTrainer(model_trainer_config=model_trainer_config)
+
+            model_trainer_artifact = model_trainer.initiate_incremental_model_trainer()
+            logging.info(f"Incremental Model Training Completed: {model_trainer_artifact is not None}")
+            return model_trainer_artifact
+
+        except Exception as e:
+            logging.error(f"Error while starting incremental model training: {str(e)}")
+            raise SensorException(f"Error while starting incremental model training: {str(e)}", sys)
 
 
     def start_model_training(self, data_transformation_artifact: DataTransformationArtifact)-> ModelTrainerArtifact:
@@ -94,7 +122,8 @@ class TrainPipeline:
             return model_trainer_artifact
 
         except Exception as e:
-            SensorException(f"Error while starting model training: {str(e)}", sys)
+            logging.error(f"Error while starting model training: {str(e)}")
+            raise SensorException(f"Error while starting model training: {str(e)}", sys)
 
 
     def start_model_evaluation(self, model_trainer_artifact: ModelTrainerArtifact,  data_validation_artifact: DataValidationArtifact)-> ModelEvaluationArtifact:
@@ -115,7 +144,8 @@ class TrainPipeline:
             return model_evaluation_artifact
 
         except Exception as e:
-            SensorException(f"Error while starting model evaluation: {str(e)}", sys)
+            logging.error(f"Error while starting model evaluation: {str(e)}")
+            raise SensorException(f"Error while starting model evaluation: {str(e)}", sys)
 
 
     def start_model_pusher(self,model_eval_artifact:ModelEvaluationArtifact):
@@ -156,18 +186,28 @@ class TrainPipeline:
             TrainPipeline.is_pipeline_running = True
             
             # Start the data ingestion process
+            self.report_progress("data_ingestion")
             data_ingestion_artifact: DataIngestionArtifact = self.start_data_ingestion()
             
             # Validate the ingested data
+            self.report_progress("data_validation")
             data_validation_artifact = self.start_data_validaton(data_ingestion_artifact=data_ingestion_artifact)
             
-            # Transform the validated data
-            data_transformation_artifact: DataTransformationArtifact = self.start_data_transformation(data_validation_artifact)
-            
-            # Train the model using the transformed data
-            model_trainer_artifact: ModelTrainerArtifact = self.start_model_training(data_transformation_artifact)
+            # Warm start the production model on the new data, this needs no transformation
+            self.report_progress("model_trainer")
+            model_trainer_artifact: Optional[ModelTrainerArtifact] = self.start_incremental_model_training()
+
+            if model_trainer_artifact is None:
+                # Transform the validated data
+                self.report_progress("data_transformation")
+                data_transformation_artifact: DataTransformationArtifact = self.start_data_transformation(data_validation_artifact)
+
+                # Train the model from scratch using the transformed data
+                self.report_progress("model_trainer")
+                model_trainer_artifact = self.start_model_training(data_transformation_artifact)
             
             # Evaluate the trained model
+            self.report_progress("model_evaluation")
             model_evaluation_artifact: ModelEvaluationArtifact = self.start_model_evaluation(model_trainer_artifact, data_validation_artifact)
 
             # Check if the new model is accepted
@@ -179,11 +219,13 @@ class TrainPipeline:
                 # Log that the model is accepted
                 logging.info("Model is accepted")
                 # Push the accepted model to deployment
+                self.report_progress("model_pusher")
                 model_pusher_artifact: ModelPusherArtifact = self.start_model_pusher(model_evaluation_artifact)
 
             # Reset the pipeline running flag to False
             TrainPipeline.is_pipeline_running = False
 
+            self.report_progress("s3_sync")
             self.sync_artifact_dir_to_s3()
             self.sync_saved_model_dir_to_s3()
 
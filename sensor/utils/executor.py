@@ -0,0 +1,68 @@
+import asyncio
+import functools
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from sensor.constant.application import EXECUTOR_INFERENCE_THREADS, EXECUTOR_MAX_QUEUE_SIZE
+from sensor.exception import SensorException
+from sensor.logger import logging
+
+
+class BoundedExecutor:
+
+    """
+    This class is responsible for running blocking callables on a pool without blocking the event loop.
+    At most max_workers + max_queue_size calls are admitted, further callers wait on the loop.
+    """
+
+    def __init__(self, executor: Executor, max_workers: int, max_queue_size: int = EXECUTOR_MAX_QUEUE_SIZE) -> None:
+        self.executor = executor
+        self.max_pending = max_workers + max_queue_size
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        This method is responsible for running fn(*args, **kwargs) on the pool and awaiting its result
+        """
+        if self._semaphore is None:
+            # created lazily so it binds to the serving event loop
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(fn, *args, **kwargs)
+            )
+
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+class ServingExecutors:
+
+    """
+    This class is responsible for the pool used by the api: threads for GIL releasing
+    payload parsing (pyarrow) and numpy/XGBoost inference. A process pool would pickle every
+    upload and parsed frame across processes, which costs more than the GIL contention it avoids.
+    """
+
+    def __init__(self, inference_threads: int = EXECUTOR_INFERENCE_THREADS,
+                 max_queue_size: int = EXECUTOR_MAX_QUEUE_SIZE) -> None:
+        try:
+            self.inference = BoundedExecutor(
+                ThreadPoolExecutor(max_workers=inference_threads, thread_name_prefix="inference"),
+                max_workers=inference_threads, max_queue_size=max_queue_size
+            )
+            logging.info(f"Serving executors: {inference_threads} inference threads")
+
+        except Exception as e:
+            raise SensorException(f"Error while initializing ServingExecutors: {str(e)}", sys)
+
+
+    def shutdown(self) -> None:
+        """
+        This method is responsible for shutting every pool down
+        """
+        self.inference.shutdown()
@@ -4,8 +4,13 @@ import numpy as np
 import os
 import sys
 import dill
-import glob
+import hashlib
+import resource
+import pyarrow as pa
+import pyarrow.feather as feather
+from typing import Iterator, List, Optional
 from sensor.exception import SensorException
+from sensor.constant.training_pipeline import FEATURE_DTYPE
 import logging
 
 
@@ -21,9 +26,11 @@ def read_yaml_file(file_path:str)->dict:
         raise SensorException(f"Error while reading YAML file: {str(e)}", sys)
     
 
-def write_yaml_file(file_path:str, content:object, replace:bool = False)-> None:
+def write_yaml_file(file_path:str, content:object, replace:bool = False, atomic:bool = False)-> None:
     """
-    This method is responsible for creating yaml file
+    This method is responsible for creating yaml file.
+    With atomic=True the content is written to a temporary file and renamed over file_path,
+    so concurrent readers see either the old or the new file.
     """
     try:
         if replace:
@@ -31,14 +38,36 @@ def write_yaml_file(file_path:str, content:object, replace:bool = False)-> None:
                 os.remove(file_path)
         
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w') as file:
-            yaml.dump(content, file)
+        if atomic:
+            tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(tmp_file_path, 'w') as file:
+                yaml.dump(content, file)
+            os.replace(tmp_file_path, file_path)
+        else:
+            with open(file_path, 'w') as file:
+                yaml.dump(content, file)
 
     except Exception as e:
         logging.error(f"Error while writing YAML file: {str(e)}")
         raise SensorException(f"Error while writing YAML file: {str(e)}", sys)
     
 
+def get_file_hash(file_path:str)-> str:
+    """
+    This method is responsible for returning the sha256 of a file
+    """
+    try:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    except Exception as e:
+        logging.error(f"Error while hashing file: {str(e)}")
+        raise SensorException(f"Error while hashing file: {str(e)}", sys)
+
+
 def save_numpy_array_data(file_path:str, data:np.array)-> None:
     """
     This method is responsible for saving numpy array data
@@ -51,84 +80,247 @@ def save_numpy_array_data(file_path:str, data:np.array)-> None:
         logging.error(f"Error while saving numpy array data: {str(e)}")
         raise SensorException(f"Error while saving numpy array data: {str(e)}", sys)
     
-def load_numpy_array_data(file_path:str)-> np.array:
+def load_numpy_array_data(file_path:str, mmap_mode: Optional[str] = None)-> np.array:
     """
-    This method is responsible for loading numpy array data
+    This method is responsible for loading numpy array data, with mmap_mode the file is mapped instead of read
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file:
             return np.load(file)
     except Exception as e:
         logging.error(f"Error while loading numpy array data: {str(e)}")
         raise SensorException(f"Error while loading numpy array data: {str(e)}", sys)
+
+
+def get_peak_memory_mb()-> float:
+    """
+    This method is responsible for the peak resident memory of this process so far, in MB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux and in bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
     
 
-def save_object(file_path: str, obj: object):
+def get_schema_dtypes(schema_file_path: str)-> dict:
+    """
+    This method is responsible for mapping every schema column to its arrow type,
+    category columns are stored as strings and every other column as FEATURE_DTYPE so missing values fit
+    """
     try:
-        logging.info("Entered in save_object method of main_utils.py file")
+        schema = read_yaml_file(schema_file_path)
+        feature_dtype = pa.from_numpy_dtype(np.dtype(FEATURE_DTYPE))
+        return {
+            list(data.keys())[0]: pa.string() if list(data.values())[0] == 'category' else feature_dtype
+            for data in schema.get('columns', [])
+        }
+    except Exception as e:
+        logging.error(f"Error while reading schema dtypes: {str(e)}")
+        raise SensorException(f"Error while reading schema dtypes: {str(e)}", sys)
+
+
+def dataframe_to_table(df: pd.DataFrame, dtypes: Optional[dict] = None)-> pa.Table:
+    """
+    This method is responsible for converting a DataFrame to an arrow table with the schema dtypes.
+    Numeric columns keep NaN as a value instead of an arrow null, so load_dataframe can map them without copying.
+    """
+    dtypes = dtypes or {}
+    arrays = []
+    for column in df.columns:
+        dtype = dtypes.get(column)
+        if dtype == pa.string() or (dtype is None and not pd.api.types.is_numeric_dtype(df[column])):
+            arrays.append(pa.array(df[column].astype(object).where(df[column].notna(), None), type=pa.string()))
+        else:
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=dtype.to_pandas_dtype() if dtype else None)
+            arrays.append(pa.array(values, from_pandas=False))
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in df.columns])
+
+
+def save_dataframe(file_path: str, df: pd.DataFrame, schema_file_path: Optional[str] = None)-> None:
+    """
+    This method is responsible for saving a DataFrame as an uncompressed feather (arrow ipc) file
+    """
+    try:
+        dtypes = get_schema_dtypes(schema_file_path) if schema_file_path is not None else {}
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'wb') as file_obj:
-            dill.dump(obj, file_obj)
-        logging.info("object saved successfully")
-    
+        feather.write_feather(dataframe_to_table(df, dtypes), file_path, compression='uncompressed')
+
     except Exception as e:
-        logging.error(f"Error while saving object: {str(e)}")
-        raise SensorException(f"Error while saving object: {str(e)}", sys)
+        logging.error(f"Error while saving dataframe: {str(e)}")
+        raise SensorException(f"Error while saving dataframe: {str(e)}", sys)
 
 
-def load_object(file_path: str):
+class DataFrameChunkWriter:
+
+    """
+    This class is responsible for appending DataFrame chunks to one feather file without holding them all,
+    the file is only created once the first chunk is written and every later chunk is cast to its schema
+    """
+
+    def __init__(self, file_path: str, schema_file_path: Optional[str] = None) -> None:
+        self.file_path = file_path
+        self.dtypes = get_schema_dtypes(schema_file_path) if schema_file_path is not None else {}
+        self.rows = 0
+        self.schema = None
+        self._writer = None
+
+
+    def write(self, df: pd.DataFrame) -> None:
+        try:
+            table = dataframe_to_table(df, self.dtypes)
+            if self._writer is None:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                self.schema = table.schema
+                self._writer = pa.ipc.new_file(self.file_path, self.schema)
+            self._writer.write_table(table.cast(self.schema))
+            self.rows += len(df)
+
+        except Exception as e:
+            logging.error(f"Error while writing dataframe chunk: {str(e)}")
+            raise SensorException(f"Error while writing dataframe chunk: {str(e)}", sys)
+
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+    def __enter__(self) -> "DataFrameChunkWriter":
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def append_dataframe(file_path: str, df: pd.DataFrame, source_file_path: Optional[str] = None,
+                     schema_file_path: Optional[str] = None)-> int:
+    """
+    This method is responsible for writing the record batches of source_file_path followed by df to file_path.
+    Source batches are copied as they are, df is cast to the source schema column by column.
+    Returns the number of rows written.
+    """
     try:
-        logging.info("Entered in load_object method of main_utils.py file")
-        with open(file_path, 'rb') as file_obj:
-            return dill.load(file_obj)
-        logging.info("object loaded successfully")
-    
+        tmp_file_path = f"{file_path}.tmp"
+        table = dataframe_to_table(df, get_schema_dtypes(schema_file_path) if schema_file_path is not None else {})
+        rows = 0
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if source_file_path is None:
+            feather.write_feather(table, tmp_file_path, compression='uncompressed')
+            rows = table.num_rows
+        else:
+            with pa.memory_map(source_file_path, 'r') as source:
+                reader = pa.ipc.open_file(source)
+                with pa.ipc.new_file(tmp_file_path, reader.schema) as writer:
+                    for index in range(reader.num_record_batches):
+                        batch = reader.get_batch(index)
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+                    writer.write_table(table.select(reader.schema.names).cast(reader.schema))
+                    rows += table.num_rows
+        os.replace(tmp_file_path, file_path)
+        return rows
+
     except Exception as e:
-        logging.error(f"Error while loading object: {str(e)}")
-        raise SensorException(f"Error while loading object: {str(e)}", sys) 
-        
+        logging.error(f"Error while appending dataframe: {str(e)}")
+        raise SensorException(f"Error while appending dataframe: {str(e)}", sys)
 
-def get_latest_preprocessor_path(artifact_dir='artifact', sub_dir='data_transformation/transformed_object', file_name='preprocessing.pkl'):
+
+def get_test_split_mask(ids: pd.Series, test_ratio: float)-> np.ndarray:
+    """
+    This method is responsible for assigning rows to the test split from a hash of their id,
+    a row lands in the same split whichever run or frame it is read in
+    """
+    hashes = pd.util.hash_pandas_object(ids.astype(str), index=False).to_numpy()
+    return hashes < np.uint64(test_ratio * np.iinfo(np.uint64).max)
+
+
+def iter_dataframe_chunks(file_path: str, chunk_rows: int, columns: Optional[List[str]] = None)-> Iterator[pd.DataFrame]:
+    """
+    This method is responsible for reading a feather file as DataFrames of at most chunk_rows rows,
+    only the current chunk is materialised
+    """
     try:
-        # Get the root directory of the project
-        current_dir = os.path.abspath(os.path.dirname(__file__))
-        project_root = os.path.abspath(os.path.join(current_dir, os.pardir, os.pardir))
+        with pa.memory_map(file_path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                if columns is not None:
+                    batch = pa.RecordBatch.from_arrays([batch.column(column) for column in columns], names=columns)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    yield batch.slice(start, chunk_rows).to_pandas()
 
-        # Build the full path to the artifact directory
-        artifact_path = os.path.join(project_root, artifact_dir)
+    except Exception as e:
+        logging.error(f"Error while reading dataframe chunks: {str(e)}")
+        raise SensorException(f"Error while reading dataframe chunks: {str(e)}", sys)
 
-        logging.info(f"Artifact path: {artifact_path}")
 
-        # Check if artifact directory exists
-        if not os.path.exists(artifact_path):
-            raise FileNotFoundError(f"Artifact directory not found at path: {artifact_path}")
+def load_dataframe(file_path: str, columns: Optional[List[str]] = None)-> pd.DataFrame:
+    """
+    This method is responsible for loading a feather file written by save_dataframe.
+    The file is memory mapped and only the requested columns are read, numeric columns are zero-copy views.
+    """
+    try:
+        with pa.memory_map(file_path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas(split_blocks=True, self_destruct=True)
 
-        logging.info('Artifact directory found')
+    except Exception as e:
+        logging.error(f"Error while loading dataframe: {str(e)}")
+        raise SensorException(f"Error while loading dataframe: {str(e)}", sys)
 
-        # Find all timestamp directories in the artifact directory
-        timestamp_dirs = glob.glob(os.path.join(artifact_path, '*'))
 
-        logging.info(f"Found timestamp directories: {timestamp_dirs}")
+def get_dataframe_num_rows(file_path: str)-> int:
+    """
+    This method is responsible for counting the rows of a feather file from its record batch metadata
+    """
+    try:
+        with pa.memory_map(file_path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(index).num_rows for index in range(reader.num_record_batches))
 
-        # Ensure that there are timestamp directories available
-        if not timestamp_dirs:
-            raise FileNotFoundError("No timestamp directories found in artifact directory")
+    except Exception as e:
+        logging.error(f"Error while counting dataframe rows: {str(e)}")
+        raise SensorException(f"Error while counting dataframe rows: {str(e)}", sys)
 
-        # Get the latest timestamp directory
-        latest_timestamp_dir = max(timestamp_dirs, key=os.path.getctime)
 
-        logging.info(f"Latest timestamp directory: {latest_timestamp_dir}")
+def get_dataframe_columns(file_path: str)-> List[str]:
+    """
+    This method is responsible for reading the column names of a feather file without loading any data
+    """
+    try:
+        with pa.memory_map(file_path, 'r') as source:
+            return pa.ipc.open_file(source).schema.names
 
-        # Build the preprocessor path
-        preprocessor_path = os.path.join(latest_timestamp_dir, sub_dir, file_name)
+    except Exception as e:
+        logging.error(f"Error while reading dataframe columns: {str(e)}")
+        raise SensorException(f"Error while reading dataframe columns: {str(e)}", sys)
 
-        logging.info(f"Preprocessor path: {preprocessor_path}")
 
-        if not os.path.exists(preprocessor_path):
-            raise FileNotFoundError(f"Preprocessor file not found at path: {preprocessor_path}")
+def save_object(file_path: str, obj: object):
+    try:
+        logging.info("Entered in save_object method of main_utils.py file")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file_obj:
+            dill.dump(obj, file_obj)
+        logging.info("object saved successfully")
+    
+    except Exception as e:
+        logging.error(f"Error while saving object: {str(e)}")
+        raise SensorException(f"Error while saving object: {str(e)}", sys)
 
-        return preprocessor_path
 
+def load_object(file_path: str):
+    try:
+        logging.info("Entered in load_object method of main_utils.py file")
+        with open(file_path, 'rb') as file_obj:
+            return dill.load(file_obj)
+        logging.info("object loaded successfully")
+    
     except Exception as e:
-        logging.error(f"Error while getting preprocessor path: {str(e)}")
-        raise SensorException(e, sys)
+        logging.error(f"Error while loading object: {str(e)}")
+        raise SensorException(f"Error while loading object: {str(e)}", sys)
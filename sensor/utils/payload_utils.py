@@ -0,0 +1,129 @@
+import io
+import os
+import sys
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sensor.constant.application import (PAYLOAD_CONTENT_TYPES, PAYLOAD_FILE_EXTENSIONS, PAYLOAD_FORMAT_ARROW,
+                                         PAYLOAD_FORMAT_CSV, PAYLOAD_FORMAT_NPY, PAYLOAD_FORMAT_NPZ,
+                                         PAYLOAD_FORMAT_PARQUET, PREDICTION_COLUMN_NAME)
+from sensor.exception import SensorException
+
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def get_payload_format(content_type: Optional[str], file_name: Optional[str] = None) -> str:
+    """
+    This function is responsible for choosing the payload format from the content type,
+    falling back to the file extension and then to csv
+    """
+    if content_type:
+        payload_format = PAYLOAD_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if payload_format is not None:
+            return payload_format
+
+    if file_name:
+        payload_format = PAYLOAD_FILE_EXTENSIONS.get(os.path.splitext(file_name)[1].lower())
+        if payload_format is not None:
+            return payload_format
+
+    return PAYLOAD_FORMAT_CSV
+
+
+def read_arrow_table(content: bytes) -> pa.Table:
+    buffer = pa.py_buffer(content)
+    if content[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+        return pa.ipc.open_file(buffer).read_all()
+    return pa.ipc.open_stream(buffer).read_all()
+
+
+def read_numpy_payload(content: bytes, payload_format: str, columns: List[str]) -> pd.DataFrame:
+    """
+    This function is responsible for mapping npy/npz arrays to the schema columns.
+    A 2D array is read in schema column order, an npz may instead hold one 1D array per column.
+    """
+    if payload_format == PAYLOAD_FORMAT_NPY:
+        arrays = {"data": np.load(io.BytesIO(content), allow_pickle=False)}
+    else:
+        with np.load(io.BytesIO(content), allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+
+    if len(arrays) == 1:
+        matrix = next(iter(arrays.values()))
+        if matrix.ndim == 2:
+            if matrix.shape[1] == len(columns):
+                # wraps the array as a single block without copying
+                return pd.DataFrame(matrix, columns=columns, copy=False)
+            # positional names let the missing column check report the mismatch
+            return pd.DataFrame(matrix).add_prefix("column_")
+
+    return pd.DataFrame(arrays)
+
+
+def read_payload(content: bytes, payload_format: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    This function is responsible for decoding an uploaded payload into a DataFrame.
+    Columnar formats only materialise the requested columns.
+    """
+    try:
+        if payload_format == PAYLOAD_FORMAT_CSV:
+            # the pyarrow engine parses on its own threads without holding the GIL
+            return pd.read_csv(io.BytesIO(content), engine="pyarrow")
+
+        if payload_format == PAYLOAD_FORMAT_PARQUET:
+            parquet_file = pq.ParquetFile(pa.BufferReader(content))
+            available = set(parquet_file.schema_arrow.names)
+            read_columns = [col for col in columns if col in available] if columns is not None else None
+            return parquet_file.read(columns=read_columns).to_pandas()
+
+        if payload_format == PAYLOAD_FORMAT_ARROW:
+            table = read_arrow_table(content)
+            if columns is not None:
+                table = table.select([col for col in columns if col in table.column_names])
+            return table.to_pandas()
+
+        if payload_format in (PAYLOAD_FORMAT_NPY, PAYLOAD_FORMAT_NPZ):
+            return read_numpy_payload(content, payload_format, columns or [])
+
+        raise ValueError(f"Unsupported payload format: {payload_format}")
+
+    except Exception as e:
+        raise SensorException(f"Error while reading {payload_format} payload: {str(e)}", sys)
+
+
+def write_payload(df: pd.DataFrame, payload_format: str) -> bytes:
+    """
+    This function is responsible for encoding predictions in the requested format.
+    Tabular formats return the input columns plus predictions, npy/npz return only the predictions.
+    """
+    try:
+        if payload_format == PAYLOAD_FORMAT_CSV:
+            return df.to_csv(index=False).encode()
+
+        buffer = io.BytesIO()
+
+        if payload_format == PAYLOAD_FORMAT_ARROW:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.ipc.new_stream(buffer, table.schema) as writer:
+                writer.write_table(table)
+
+        elif payload_format == PAYLOAD_FORMAT_PARQUET:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+
+        elif payload_format == PAYLOAD_FORMAT_NPY:
+            np.save(buffer, df[PREDICTION_COLUMN_NAME].to_numpy(dtype=str), allow_pickle=False)
+
+        elif payload_format == PAYLOAD_FORMAT_NPZ:
+            np.savez(buffer, **{PREDICTION_COLUMN_NAME: df[PREDICTION_COLUMN_NAME].to_numpy(dtype=str)})
+
+        else:
+            raise ValueError(f"Unsupported payload format: {payload_format}")
+
+        return buffer.getvalue()
+
+    except Exception as e:
+        raise SensorException(f"Error while writing {payload_format} payload: {str(e)}", sys)
@@ -1,16 +1,10 @@
-import pandas as pd
-import numpy as np
-import logging
-import json
-from sensor.config import mongo_client 
+from sensor.data_access.sensor_data import SensorData
 
 def dumb_csv_file_to_mongodb_collection(file_path:str, database_name:str, collection_name:str) -> None:
     try:
-        df = pd.read_csv(file_path)
-        df.reset_index(drop=True, inplace=True)
-        json_records = list(json.loads(df.T.to_json()).values())
-        mongo_client[database_name][collection_name].insert_many(json_records)
+        SensorData().export_csv_as_collection(
+            file_path=file_path, collection_name=collection_name, database_name=database_name
+        )
 
     except Exception as e:
         print(e)
-    
@@ -0,0 +1,44 @@
+"""
+Parity of the fused float32 kernel with the SimpleImputer + RobustScaler pipeline it is compiled from,
+on data with missing values and a zero IQR column, fed with its columns in another order.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import SimpleImputer
+
+from sensor.components.data_transformation import DataTransformation
+from sensor.ml.model.fused_preprocessor import FusedPreprocessor
+
+ROWS, COLUMNS = 2000, 12
+
+
+def make_frame(random_state: int) -> pd.DataFrame:
+    rng = np.random.default_rng(random_state)
+    values = rng.standard_normal((ROWS, COLUMNS)) * rng.uniform(1, 1000, COLUMNS) + rng.uniform(-500, 500, COLUMNS)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    # zero IQR, RobustScaler leaves it unscaled
+    values[:, 3] = 7.0
+    values[rng.random(ROWS) < 0.05, 3] = np.nan
+    return pd.DataFrame(values, columns=[f"sensor_{column:03d}" for column in range(COLUMNS)])
+
+
+@pytest.mark.parametrize("strategy", ["constant", "median"])
+def test_fused_preprocessor_matches_pipeline(strategy):
+    pipeline = DataTransformation.get_data_transformer_object()
+    if strategy != "constant":
+        pipeline.steps[0] = ("Imputer", SimpleImputer(strategy=strategy))
+    pipeline.fit(make_frame(random_state=0))
+    assert pipeline.steps[-1][1].scale_[3] == 1.0
+
+    fused_preprocessor = FusedPreprocessor.from_pipeline(pipeline)
+    frame = make_frame(random_state=1)
+    expected = pipeline.transform(frame)
+
+    shuffled_columns = list(np.random.default_rng(2).permutation(frame.columns))
+    assert shuffled_columns != list(frame.columns)
+    actual = fused_preprocessor.transform(frame[shuffled_columns])
+
+    assert actual.dtype == np.float32 and actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(fused_preprocessor.transform(frame.to_numpy()), expected, rtol=1e-5, atol=1e-5)
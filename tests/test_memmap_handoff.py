@@ -0,0 +1,67 @@
+"""
+Peak memory of the transformed array handoff from DataTransformation to ModelTrainer.
+The arrays are mapped and streamed to XGBoost batch by batch in a fresh interpreter whose peak RSS
+(VmHWM) is reset once its imports are done, so only the handoff is measured.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from sensor.components.data_transformation import DataTransformation
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS, COLUMNS, BATCH_ROWS = 100000, 160, 10000
+
+HANDOFF = r"""
+import json, re, sys
+import numpy as np
+from sensor.ml.model.training_engine import ArrayBatchIter
+from sensor.utils.main_utils import load_numpy_array_data
+
+def get_peak_rss_mb():
+    with open('/proc/self/status') as status:
+        return int(re.search(r'VmHWM:\s+(\d+)', status.read()).group(1)) / 1024
+
+with open('/proc/self/clear_refs', 'w') as clear_refs:
+    clear_refs.write('5')
+baseline = get_peak_rss_mb()
+features = load_numpy_array_data(sys.argv[1], mmap_mode='r')
+target = load_numpy_array_data(sys.argv[2], mmap_mode='r')
+load_mb = get_peak_rss_mb() - baseline
+
+iterator = ArrayBatchIter(features, target, np.arange(len(target)), int(sys.argv[3]))
+while iterator.next(lambda data, label: None):
+    pass
+print(json.dumps({"load_mb": load_mb, "feed_mb": get_peak_rss_mb() - baseline}))
+"""
+
+
+def run_handoff(feature_file_path: str, target_file_path: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", HANDOFF, feature_file_path, target_file_path, str(BATCH_ROWS)],
+        cwd=REPO_ROOT, env={**os.environ, "PYTHONPATH": REPO_ROOT}, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="peak RSS reset needs linux procfs")
+def test_memmap_handoff_stays_under_peak_rss_bound(tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(ROWS, COLUMNS)).astype(np.float32)
+    target = (rng.random(ROWS) < 0.05).astype(np.float32)
+    feature_file_path, target_file_path = str(tmp_path / "train.npy"), str(tmp_path / "train_target.npy")
+    DataTransformation.save_feature_and_target(features, target, feature_file_path, target_file_path)
+    array_mb = features.nbytes / 1024 ** 2
+    batch_mb = array_mb * BATCH_ROWS / ROWS
+    del features, target
+
+    peak = run_handoff(feature_file_path, target_file_path)
+
+    # mapping reads nothing
+    assert peak["load_mb"] < 0.05 * array_mb
+    # the mapped pages plus a few gathered batches, any full copy of the array would at least double it
+    assert peak["feed_mb"] < array_mb + 4 * batch_mb